@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+    # IPV4 Address and Network subnetting library
+    # Copyright (C) 2013  Jason Carnevale
+
+    # This program is free software: you can redistribute it and/or modify
+    # it under the terms of the GNU General Public License as published by
+    # the Free Software Foundation, either version 3 of the License, or
+    # (at your option) any later version.
+
+    # This program is distributed in the hope that it will be useful,
+    # but WITHOUT ANY WARRANTY; without even the implied warranty of
+    # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    # GNU General Public License for more details.
+
+    # You should have received a copy of the GNU General Public License
+    # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Streaming log annotator; tags every IPv4 address found in a log line with the
+network it belongs to and its special purpose category.
+
+    annotate.py -n networks.txt access.log > access.annotated.log
+
+Each output line is the input line followed by a tab and one addr:network:category
+entry for every address on the line, ex.
+
+    GET /index.html from 10.1.2.3<TAB>10.1.2.3:office-lan:private
+
+The networks file holds one network per line in any notation ipv4Addr() accepts,
+optionally followed by whitespace and a label; the label defaults to the network.
+Input is read, and output written, in chunks of --buffer-size bytes so memory use
+does not grow with the size of the log.
+'''
+
+import argparse
+import io
+import re
+import sys
+import time
+
+import ipaddr
+
+# match pattern for a dotted decimal address inside a line of text; a trailing
+# period ends the address unless a digit follows it
+_addrToken = re.compile(r'(?<![\d.])(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})(?!\d|\.\d)')
+
+def _isAddrMask(fields):
+    ''' True if the first two fields of a network definition are an address and a mask '''
+    if len(fields) < 2 or '/' in fields[0]:
+        return False
+    try:
+        ipaddr._parseNotation(fields[0], fields[1])
+    except ValueError:
+        return False
+    return True
+
+def loadNetworks(lines):
+    '''
+    Build a PrefixTable from network definitions
+
+    Args:
+        lines: an iterable of lines; '10.1.0.0/16 office-lan', '192.168.0.0 255.255.0.0'
+               or '0x0A000000 0xFF000000 corp'; the second field is only taken as a
+               mask when the first has no '/' and the two parse as address and mask
+    Returns:
+        A PrefixTable mapping each network to its label
+    '''
+    table = ipaddr.PrefixTable()
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        fields = line.split()
+        if _isAddrMask(fields):
+            # address and mask notation; 192.168.0.0 255.255.0.0 [label]
+            network = ipaddr.ipv4Addr(addr=fields[0], mask=fields[1])
+            label = ' '.join(fields[2:]) or '%s/%d' % (network.networkAddress, network.maskLen)
+        else:
+            network = ipaddr.ipv4Addr(addr=fields[0])
+            label = ' '.join(fields[1:]) or fields[0]
+        table.insert(network, label)
+    return table
+
+def readLines(stream, bufferSize=1 << 20):
+    '''
+    Yield the lines of a stream, reading it bufferSize characters at a time. Lines
+    keep their line ending; only the last line may be without one.
+    '''
+    pending = ''
+    while True:
+        chunk = stream.read(bufferSize)
+        if not chunk:
+            break
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    if pending:
+        yield pending
+
+def annotateLines(lines, table=None, cacheSize=65536):
+    '''
+    Yield each line with the addresses it holds annotated
+
+    Args:
+        lines: an iterable of lines
+        table: (optional) a PrefixTable of labelled networks, see loadNetworks()
+        cacheSize: the number of distinct addresses to remember annotations for; the
+                   cache is emptied whenever it fills so memory stays bounded
+    Returns:
+        A generator of annotated lines
+    '''
+    cache = {}
+    for line in lines:
+        tokens = _addrToken.findall(line)
+        if not tokens:
+            yield line
+            continue
+        notes = []
+        for token in tokens:
+            note = cache.get(token)
+            if note is None:
+                try:
+                    addr = ipaddr.IPv4Utils.dotDec2Int(token)
+                except ValueError:
+                    # an octet over 255; not an address
+                    continue
+                match = table.longestMatch(addr) if table is not None else None
+                category = ipaddr.addrCategoryNames[ipaddr.IPv4Utils.classifyAddr(addr)]
+                note = '%s:%s:%s' % (token, match[1] if match else '-', category)
+                if len(cache) >= cacheSize:
+                    cache.clear()
+                cache[token] = note
+            notes.append(note)
+        if not notes:
+            yield line
+        elif line.endswith('\n'):
+            yield '%s\t%s\n' % (line[:-1], ' '.join(notes))
+        else:
+            yield '%s\t%s' % (line, ' '.join(notes))
+
+def annotateStream(instream, outstream, table=None, bufferSize=1 << 20):
+    '''
+    Annotate every line of instream and write the result to outstream, reading and
+    writing bufferSize characters at a time
+
+    Returns:
+        Throughput statistics as a dictionary;
+        {'lines': 1000000, 'seconds': 2.5, 'linesPerSecond': 400000.0}
+    '''
+    started = time.time()
+    count = 0
+    pending = []
+    pendingSize = 0
+    for line in annotateLines(readLines(instream, bufferSize), table):
+        count += 1
+        pending.append(line)
+        pendingSize += len(line)
+        if pendingSize >= bufferSize:
+            outstream.write(''.join(pending))
+            pending = []
+            pendingSize = 0
+    outstream.write(''.join(pending))
+    outstream.flush()
+    seconds = time.time() - started
+    return {'lines': count, 'seconds': seconds, 'linesPerSecond': count / seconds if seconds else 0.0}
+
+def _open(path, mode):
+    ''' open a file, or stdin/stdout for '-', for reading or writing native strings '''
+    if path == '-':
+        stream = sys.stdin if mode == 'r' else sys.stdout
+        # python 3 keeps the byte stream underneath the text layer
+        stream = getattr(stream, 'buffer', stream)
+    else:
+        stream = io.open(path, mode + 'b')
+    if str is bytes:
+        return stream
+    # latin-1 maps every byte to one character so any input passes through unchanged
+    return io.TextIOWrapper(stream, encoding='latin-1', newline='')
+
+def _close(stream, path):
+    ''' close a stream from _open(); stdin and stdout are only detached from the text
+    layer, as closing it would close them as well '''
+    if path != '-':
+        stream.close()
+    elif hasattr(stream, 'detach'):
+        stream.flush()
+        stream.detach()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Annotate IPv4 addresses in log files with network membership and category')
+    parser.add_argument('files', nargs='*', default=['-'], help="log files to annotate; '-' or none reads stdin")
+    parser.add_argument('-n', '--networks', help='file of networks with optional labels, one per line')
+    parser.add_argument('-o', '--output', default='-', help="file to write; '-' writes stdout")
+    parser.add_argument('-b', '--buffer-size', type=int, default=1 << 20, help='read and write size in bytes')
+    parser.add_argument('-q', '--quiet', action='store_true', help='do not report throughput on stderr')
+    args = parser.parse_args(argv)
+
+    table = None
+    if args.networks:
+        networks = _open(args.networks, 'r')
+        try:
+            table = loadNetworks(networks)
+        finally:
+            _close(networks, args.networks)
+
+    outstream = _open(args.output, 'w')
+    for path in args.files:
+        instream = _open(path, 'r')
+        stats = annotateStream(instream, outstream, table, args.buffer_size)
+        _close(instream, path)
+        if not args.quiet:
+            sys.stderr.write('%s: %d lines in %.2f seconds, %.0f lines/s\n' %
+                             (path, stats['lines'], stats['seconds'], stats['linesPerSecond']))
+    _close(outstream, args.output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+    # IPV4 Address and Network subnetting library
+    # Copyright (C) 2013  Jason Carnevale
+
+    # This program is free software: you can redistribute it and/or modify
+    # it under the terms of the GNU General Public License as published by
+    # the Free Software Foundation, either version 3 of the License, or
+    # (at your option) any later version.
+
+    # This program is distributed in the hope that it will be useful,
+    # but WITHOUT ANY WARRANTY; without even the implied warranty of
+    # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    # GNU General Public License for more details.
+
+    # You should have received a copy of the GNU General Public License
+    # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+asyncio interface to address classification and prefix lookup; python 3.7 and later.
+
+classifyStream() consumes an async iterator of addresses, or of batches (lists) of
+addresses, and yields lists of (address, category code, value) results of at most
+batchSize entries, in input order. At most maxPending micro-batches are in flight;
+when the consumer falls behind the source is not read any further. Micro-batches
+larger than inlineLimit are classified in an executor so the event loop is never
+held for long.
+
+    async for results in classifyStream(readAddrs(reader), table):
+        for (addr, code, value) in results:
+            ...
+'''
+
+import asyncio
+
+import ipaddr
+
+def _classify(prefixes, table=None):
+    ''' classify a list of addresses; the synchronous work done for one micro-batch '''
+    parseAddr = ipaddr._parseAddr
+    classifyAddr = ipaddr.IPv4Utils.classifyAddr
+    results = []
+    for prefix in prefixes:
+        try:
+            addr = parseAddr(prefix)
+        except (ValueError, TypeError):
+            results.append((prefix, None, None))
+            continue
+        match = table.longestMatch(addr) if table is not None else None
+        results.append((prefix, classifyAddr(addr), match[1] if match is not None else None))
+    return results
+
+async def classifyBatch(prefixes, table=None, executor=None, inlineLimit=256):
+    '''
+    Classify a list of addresses
+
+    Args:
+        prefixes: addresses as unsigned ints or in dotted decimal or 0x prefixed
+                  hexadecimal notation
+        table: (optional) a PrefixTable or MappedPrefixTable to look every address up in
+        executor: the concurrent.futures executor for large batches; None is the
+                  event loop default executor
+        inlineLimit: batches of up to this many addresses are classified on the loop
+    Returns:
+        A list of (address, ADDR_* category code, value) tuples; the code and value are
+        None for an invalid address, the value is None if no network matched
+    '''
+    prefixes = list(prefixes)
+    if len(prefixes) <= inlineLimit:
+        return _classify(prefixes, table)
+    return await asyncio.get_running_loop().run_in_executor(executor, _classify, prefixes, table)
+
+async def classifyStream(source, table=None, batchSize=1024, maxPending=4, executor=None,
+                         inlineLimit=256, flushInterval=0.05):
+    '''
+    Classify a stream of addresses in micro-batches
+
+    Args:
+        source: an async iterator of addresses and/or lists or tuples of addresses
+        table: (optional) a PrefixTable or MappedPrefixTable to look every address up in;
+               it must not be changed while the stream runs
+        batchSize: the largest number of results yielded at once
+        maxPending: the number of micro-batches classified ahead of the consumer
+        executor: the concurrent.futures executor for large micro-batches; None is the
+                  event loop default executor
+        inlineLimit: micro-batches of up to this many addresses are classified on the loop
+        flushInterval: seconds single addresses wait for more to fill a micro-batch
+    Returns:
+        An async generator of lists of classifyBatch() results
+    '''
+    if batchSize < 1 or maxPending < 1:
+        raise ValueError('batchSize and maxPending must be at least 1')
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxPending)
+
+    async def submit(chunk):
+        if len(chunk) > inlineLimit:
+            future = loop.run_in_executor(executor, _classify, chunk, table)
+        else:
+            future = loop.create_future()
+            future.set_result(_classify(chunk, table))
+        # blocks while maxPending micro-batches wait for the consumer
+        await queue.put(future)
+        # give the loop a turn between inline micro-batches
+        await asyncio.sleep(0)
+
+    async def produce():
+        iterator = source.__aiter__()
+        nextItem = None
+        pending = []
+        try:
+            while True:
+                if nextItem is None:
+                    nextItem = asyncio.ensure_future(iterator.__anext__())
+                if pending:
+                    (done, notDone) = await asyncio.wait([nextItem], timeout=flushInterval)
+                    if not done:
+                        # the source is idle; hand over the addresses collected so far
+                        await submit(pending)
+                        pending = []
+                        continue
+                try:
+                    item = await nextItem
+                except StopAsyncIteration:
+                    break
+                nextItem = None
+                if isinstance(item, (list, tuple)):
+                    pending.extend(item)
+                    while pending:
+                        await submit(pending[:batchSize])
+                        pending = pending[batchSize:]
+                else:
+                    pending.append(item)
+                    if len(pending) >= batchSize:
+                        await submit(pending)
+                        pending = []
+            if pending:
+                await submit(pending)
+            await queue.put(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            failed = loop.create_future()
+            failed.set_exception(exc)
+            await queue.put(failed)
+        finally:
+            if nextItem is not None and not nextItem.done():
+                nextItem.cancel()
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            future = await queue.get()
+            if future is None:
+                break
+            yield await future
+    finally:
+        producer.cancel()
+
+async def readAddrs(reader):
+    '''
+    Yield the address on each non blank line of an asyncio StreamReader, such as one
+    from asyncio.open_connection() or one fed directly with feed_data()
+    '''
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        line = line.decode('latin-1').strip()
+        if line:
+            yield line
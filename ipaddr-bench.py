@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+
+'''
+Benchmarks for the IPv4Utils conversions, notation parsing, AddressSpace properties,
+host iteration, inNetwork() and VersionedPrefixTable update latency and snapshot
+lookups, timed on fixed seed synthetic data. Where the standard library ipaddress
+module is available the equivalent operation is timed alongside and every result is
+checked against it.
+
+    python ipaddr-bench.py -o bench-results.json
+    python ipaddr-bench.py --baseline bench-baseline.json --tolerance 0.2
+
+Results are written as JSON; nanoseconds per operation, best of --repeat runs. With
+--baseline the run fails (exit status 1) when any benchmark is slower than the stored
+baseline by more than --tolerance, or when any result disagrees with ipaddress.
+'''
+
+import argparse
+import json
+import operator
+import platform
+import random
+import re
+import sys
+import time
+import timeit
+
+import ipaddr
+
+try:
+    import ipaddress
+except ImportError:
+    # python 2 without the ipaddress backport; the comparisons are skipped
+    ipaddress = None
+
+_properties = ('networkAddress', 'networkMask', 'inverseMask', 'allSubnetsAddr', 'startHostAddr',
+               'endHostAddr', 'networkClass', 'networkInverseMask', 'maxPrefixLen', 'minPrefixLen',
+               'broadcastAddr', 'addressFamily', 'hostRange', 'maskLen')
+
+# ipaddress attribute giving the same result as an AddressSpace property, with the
+# conversion of the ipaddress result to the AddressSpace format
+_stdlibProperties = {
+    'networkAddress': lambda net: str(net.network_address),
+    'networkMask': lambda net: str(net.netmask),
+    'inverseMask': lambda net: str(net.hostmask),
+    'broadcastAddr': lambda net: str(net.broadcast_address),
+    'maskLen': lambda net: net.prefixlen,
+}
+
+def makeDataset(seed=2013, size=20000):
+    '''
+    Build the synthetic benchmark data; the same seed always gives the same data
+
+    Returns:
+        A dictionary of address ints, dotted decimal and hex addresses, notations in
+        each format ipv4Addr() accepts and (network int, mask length) pairs with the
+        host bits clear
+    '''
+    rand = random.Random(seed)
+    addrs = [rand.randint(0x01000000, 0xFFFFFFFF) for i in range(size)]
+    maskLens = [rand.randint(8, 30) for i in range(size)]
+    networks = [(addr & ipaddr._ipv4Masks[maskLen], maskLen) for (addr, maskLen) in zip(addrs, maskLens)]
+    dotted = [ipaddr.IPv4Utils.int2DotDec(addr) for addr in addrs]
+    notations = []
+    for (i, (addr, maskLen)) in enumerate(networks):
+        if i % 3 == 0:
+            notations.append(('%s/%d' % (ipaddr.IPv4Utils.int2DotDec(addr), maskLen),))
+        elif i % 3 == 1:
+            notations.append((ipaddr.IPv4Utils.int2DotDec(addr), ipaddr.IPv4Utils._cidrMask2DotDec(maskLen)))
+        else:
+            notations.append(('0x%08X' % addr, '0x%08X' % ipaddr._ipv4Masks[maskLen]))
+    return {
+        'addrs': addrs,
+        'dotted': dotted,
+        'hex': ['0x%08x' % addr for addr in addrs],
+        'notations': notations,
+        'networks': networks,
+    }
+
+def timeOps(func, makeItems, repeat):
+    ''' best time in nanoseconds per item of func(item) over every item; makeItems() is
+    called, untimed, before each run so cached state can be rebuilt '''
+    best = None
+    for i in range(repeat):
+        items = makeItems()
+        start = timeit.default_timer()
+        for item in items:
+            func(item)
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(items) * 1e9
+
+def timeIteration(network, repeat):
+    ''' best time in nanoseconds per host of iterating an iterable of hosts '''
+    best = None
+    for i in range(repeat):
+        start = timeit.default_timer()
+        count = 0
+        for host in network():
+            count += 1
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / max(count, 1) * 1e9
+
+def benchmarks(data):
+    '''
+    The benchmarks as (name, function, item factory, ipaddress function or None); the
+    function is timed on every item of a fresh list from the factory
+    '''
+    Utils = ipaddr.IPv4Utils
+    same = lambda items: (lambda: items)
+    fresh = lambda: [ipaddr.AddressSpace.fromInt(addr, maskLen) for (addr, maskLen) in data['networks']]
+    cidrs = [notation[0] for notation in data['notations'] if len(notation) == 1]
+
+    def uncached():
+        # every ipv4Addr() call parses; the cache is emptied and the inputs are distinct
+        ipaddr.parseCache.clear()
+        return cidrs
+
+    yield ('dotDec2Int', Utils.dotDec2Int, same(data['dotted']), lambda s: int(ipaddress.IPv4Address(s)))
+    yield ('int2DotDec', Utils.int2DotDec, same(data['addrs']), lambda i: str(ipaddress.IPv4Address(i)))
+    yield ('hex2DotDec', Utils.hex2DotDec, same(data['hex']), lambda h: str(ipaddress.IPv4Address(int(h, 16))))
+    yield ('_parseNotation', lambda args: ipaddr._parseNotation(*args), same(data['notations']), None)
+    yield ('ipv4Addr', lambda s: ipaddr.ipv4Addr(addr=s), uncached, lambda s: ipaddress.IPv4Network(s, strict=False))
+    yield ('ipv4Addr-cached', lambda s: ipaddr.ipv4Addr(addr=s), same(cidrs[:1000] * 10), None)
+    for name in _properties:
+        yield ('AddressSpace.' + name, operator.attrgetter(name), fresh, _stdlibProperties.get(name))
+    probes = [ipaddr.AddressSpace.fromInt(addr, maskLen) for (addr, maskLen) in data['networks']]
+    yield ('inNetwork', lambda pair: pair[0].inNetwork(pair[1]), same(list(zip(probes, data['addrs']))),
+           lambda pair: ipaddress.IPv4Address(pair[1]) in pair[0])
+
+    # update latency of a versioned table per batch of 100 inserted networks, and
+    # lookups in a snapshot holding every network
+    tables = {}
+
+    def batches():
+        tables['update'] = ipaddr.VersionedPrefixTable()
+        return [[(network, None) for network in probes[i:i + 100]] for i in range(0, len(probes), 100)]
+
+    def snapshotAddrs():
+        if 'snapshot' not in tables:
+            tables['snapshot'] = ipaddr.VersionedPrefixTable().update(inserts=[(network, None) for network in probes])
+        return data['addrs']
+
+    yield ('VersionedPrefixTable.update', lambda batch: tables['update'].update(inserts=batch), batches, None)
+    yield ('PrefixSnapshot.longestMatch', lambda addr: tables['snapshot'].longestMatch(addr), snapshotAddrs, None)
+
+def _stdlibItems(name, items):
+    ''' the ipaddress form of the benchmark items where it differs from ours '''
+    if name.startswith('AddressSpace.'):
+        return [ipaddress.IPv4Network((network._addr, network._maskLen)) for network in items]
+    if name == 'inNetwork':
+        return [(ipaddress.IPv4Network((network._addr, network._maskLen)), addr) for (network, addr) in items]
+    return items
+
+def checkResults(data):
+    ''' compare every result with ipaddress; returns a list of mismatch descriptions '''
+    mismatches = []
+    if ipaddress is None:
+        return mismatches
+    for (name, func, makeItems, stdlib) in benchmarks(data):
+        if stdlib is None or name == 'ipv4Addr':
+            # ipv4Addr() results are compared by network below
+            continue
+        items = makeItems()
+        for (item, stdlibItem) in zip(items, _stdlibItems(name, items)):
+            (ours, theirs) = (func(item), stdlib(stdlibItem))
+            if ours != theirs:
+                mismatches.append('%s(%r): %r != %r' % (name, item, ours, theirs))
+                break
+    for cidr in [notation[0] for notation in data['notations'] if len(notation) == 1]:
+        network = ipaddr.ipv4Addr(addr=cidr)
+        expected = ipaddress.IPv4Network(cidr, strict=False)
+        if (network._addr, network.maskLen) != (int(expected.network_address), expected.prefixlen):
+            mismatches.append('ipv4Addr(%r) != %s' % (cidr, expected))
+            break
+    return mismatches
+
+def run(data, repeat, pattern=None, stdlib=True, log=None):
+    ''' time every benchmark whose name matches pattern; returns {name: result} '''
+    results = {}
+
+    def record(name, ns, stdlibNs):
+        results[name] = {'ns': round(ns, 1), 'stdlibNs': None if stdlibNs is None else round(stdlibNs, 1)}
+        if log is not None:
+            log.write('%-32s %12.1f ns %s\n' % (name, ns, '' if stdlibNs is None else '(ipaddress %.1f ns)' % stdlibNs))
+
+    for (name, func, makeItems, stdlibFunc) in benchmarks(data):
+        if pattern and not re.search(pattern, name):
+            continue
+        ns = timeOps(func, makeItems, repeat)
+        stdlibNs = None
+        if stdlib and ipaddress is not None and stdlibFunc is not None:
+            stdlibNs = timeOps(stdlibFunc, lambda: _stdlibItems(name, makeItems()), repeat)
+        record(name, ns, stdlibNs)
+    for (name, maskLen) in (('iterate/16', 16), ('iterate/8', 8)):
+        if pattern and not re.search(pattern, name):
+            continue
+        network = ipaddr.AddressSpace.fromInt(0x0A000000, maskLen)
+        ns = timeIteration(lambda: network, repeat)
+        stdlibNs = None
+        if stdlib and ipaddress is not None:
+            stdlibNetwork = ipaddress.IPv4Network((0x0A000000, maskLen))
+            stdlibNs = timeIteration(stdlibNetwork.hosts, repeat)
+        record(name, ns, stdlibNs)
+    return results
+
+def compareBaseline(results, baseline, tolerance):
+    ''' returns a list of (name, baseline ns, ns) for benchmarks slower than baseline
+    by more than the tolerance fraction '''
+    regressions = []
+    for (name, result) in sorted(results.items()):
+        previous = baseline.get('results', {}).get(name)
+        if previous and result['ns'] > previous['ns'] * (1 + tolerance):
+            regressions.append((name, previous['ns'], result['ns']))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark ipaddr against fixed seed synthetic data')
+    parser.add_argument('-o', '--output', default='bench-results.json', help='JSON results file to write')
+    parser.add_argument('-b', '--baseline', help='JSON results file of an earlier run to check for regressions')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline; 0.25 is 25%%')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='runs per benchmark, the best is kept')
+    parser.add_argument('-n', '--size', type=int, default=20000, help='items per benchmark')
+    parser.add_argument('-s', '--seed', type=int, default=2013, help='dataset seed')
+    parser.add_argument('-k', '--filter', help='only run benchmarks whose name matches this regular expression')
+    parser.add_argument('--no-stdlib', action='store_true', help='do not time the ipaddress equivalents')
+    args = parser.parse_args(argv)
+
+    data = makeDataset(args.seed, args.size)
+    mismatches = checkResults(data)
+    results = run(data, args.repeat, args.filter, not args.no_stdlib, sys.stdout)
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seed': args.seed,
+        'size': args.size,
+        'repeat': args.repeat,
+        'results': results,
+        'mismatches': mismatches,
+    }
+    with open(args.output, 'w') as stream:
+        json.dump(report, stream, indent=1, sort_keys=True)
+
+    status = 0
+    for mismatch in mismatches:
+        sys.stdout.write('MISMATCH %s\n' % mismatch)
+        status = 1
+    if args.baseline:
+        with open(args.baseline) as stream:
+            baseline = json.load(stream)
+        for (name, before, after) in compareBaseline(results, baseline, args.tolerance):
+            sys.stdout.write('REGRESSION %s: %.1f ns -> %.1f ns (+%.0f%%)\n' % (name, before, after, (after / before - 1) * 100))
+            status = 1
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
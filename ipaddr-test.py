@@ -1,6 +1,14 @@
 #!/usr/bin/env python
 
-import unittest, random, ipaddr
+import unittest, random, itertools, io, os, gc, sys, tempfile, threading, time, ipaddr, annotate, parallel
+
+try:
+	import asyncio, asyncstream
+except (ImportError, SyntaxError):
+	asyncstream = None
+# the asyncio interface needs python 3.7 or later
+if sys.version_info < (3, 7):
+	asyncstream = None
 
 class TestSequenceFunctions(unittest.TestCase):
 
@@ -24,5 +32,1122 @@ class TestSequenceFunctions(unittest.TestCase):
 			host = host.split('.')[3]
 			self.assertEqual(host, str(testValue))
 
+class TestAddressSpace(unittest.TestCase):
+
+	def setUp(self):
+		self.network = ipaddr.ipv4Addr(addr='172.16.8.0/22')
+
+	def test_derivedProperties(self):
+		self.assertEqual('255.255.252.0', self.network.networkMask)
+		self.assertEqual('0.0.3.255', self.network.inverseMask)
+		self.assertEqual('172.16.11.255', self.network.broadcastAddr)
+		self.assertEqual('172.16.8.1 - 172.16.11.254', self.network.hostRange)
+		self.assertEqual('Class B', self.network.networkClass)
+		self.assertEqual(22, self.network.maskLen)
+
+	def test_fromInt(self):
+		network = ipaddr.AddressSpace.fromInt(ipaddr.IPv4Utils.dotDec2Int('172.16.8.0'), 22)
+		self.assertEqual(self.network._getNetData(), network._getNetData())
+
+	def test_slots(self):
+		self.assertFalse(hasattr(self.network, '__dict__'))
+
+	def test_invalidMask(self):
+		self.assertRaises(ValueError, ipaddr.AddressSpace, '10.0.0.0', '255.0.255.0')
+
+@unittest.skipIf(ipaddr.numpy is None, 'numpy is not installed')
+class TestParseMany(unittest.TestCase):
+
+	def test_notations(self):
+		values = ['192.168.1.0/24', '10.1.1.1', '192.168.2.0 255.255.255.0', '0xC0A80100 0xFFFFFF00', '0xc0a80101']
+		(addrs, maskLens, valid) = ipaddr.parseMany(values)
+		self.assertTrue(valid.all())
+		self.assertEqual([3232235776, 167837953, 3232236032, 3232235776, 3232235777], addrs.tolist())
+		self.assertEqual([24, 32, 24, 24, 32], maskLens.tolist())
+		self.assertEqual('uint32', addrs.dtype.name)
+		self.assertEqual('uint8', maskLens.dtype.name)
+
+	def test_invalidRows(self):
+		values = ['1.2.3', '256.1.1.1', '1.1.1.1/33', '1..1.1', '1.2.3.4 255.0.255.0', '0xZZ', '', '1.2.3.4/24/8', '10.0.0.1']
+		(addrs, maskLens, valid) = ipaddr.parseMany(values)
+		self.assertEqual([False] * 8 + [True], valid.tolist())
+		self.assertEqual([0] * 8, addrs[:8].tolist())
+
+	def test_longRows(self):
+		# 259 dots would wrap an 8 bit separator count back to 3
+		(addrs, maskLens, valid) = ipaddr.parseMany(['.'.join(['1'] * 260), '1.1.1.1'])
+		self.assertEqual([False, True], valid.tolist())
+
+	def test_matchesDotDec2Int(self):
+		random.seed(2)
+		values = ['%d.%d.%d.%d' % tuple(random.randint(0, 255) for octet in range(4)) for i in range(1000)]
+		(addrs, maskLens, valid) = ipaddr.parseMany(values)
+		self.assertEqual([ipaddr.IPv4Utils.dotDec2Int(value) for value in values], addrs.tolist())
+
+class TestParseNotation(unittest.TestCase):
+
+	def test_notations(self):
+		self.assertEqual((3232235776, 24), ipaddr._parseNotation('192.168.1.0/24'))
+		self.assertEqual((3232235776, 24), ipaddr._parseNotation('192.168.1.0', '255.255.255.0'))
+		self.assertEqual((3232235776, 24), ipaddr._parseNotation('0xC0A80100', '0xFFFFFF00'))
+		self.assertEqual((3232235777, 32), ipaddr._parseNotation('192.168.1.1'))
+
+	def test_invalidNotations(self):
+		for notation in ['192.168.1.0/33', '192.168.1/24', '300.1.1.0/24', '0xC0A801', '192.168.1.0/24 junk']:
+			self.assertRaises(ValueError, ipaddr._parseNotation, notation)
+		self.assertRaises(ValueError, ipaddr._parseNotation, '192.168.1.0', '255.0.255.0')
+
+	def test_validateArgs(self):
+		self.assertEqual((3232235776, 24, 'ipv4'), ipaddr._validateArgs({'addr': '192.168.1.0/24', 'af_family': 'IPv4'}))
+		self.assertRaises(ValueError, ipaddr._validateArgs, {'addr': '192.168.1.0/24', 'prefix': 24})
+		self.assertRaises(ValueError, ipaddr._validateArgs, {'addr': '0.168.1.0/24'})
+
+	def test_parseCache(self):
+		cache = ipaddr.ParseCache(maxSize=2)
+		cache.put('a', 1)
+		cache.put('b', 2)
+		self.assertEqual(1, cache.get('a'))
+		cache.put('c', 3)
+		self.assertEqual(None, cache.get('b'))
+		self.assertEqual(3, cache.get('c'))
+		self.assertEqual({'hits': 2, 'misses': 1, 'size': 2, 'maxSize': 2}, cache.info())
+
+	def test_ipv4AddrCached(self):
+		ipaddr.parseCache.clear()
+		first = ipaddr.ipv4Addr(addr='10.20.0.0/16')
+		second = ipaddr.ipv4Addr(addr='10.20.0.0/16')
+		self.assertEqual(1, ipaddr.parseCache.hits)
+		self.assertEqual(first._getNetData(), second._getNetData())
+
+	def test_ipv4AddrUnknownKeyword(self):
+		ipaddr.parseCache.clear()
+		ipaddr.ipv4Addr(addr='10.20.0.0/16', mask=None)
+		self.assertRaises(ValueError, ipaddr.ipv4Addr, addr='10.20.0.0/16', prefix=None)
+		self.assertEqual(0, ipaddr.parseCache.hits)
+
+	def test_parseCacheResizeThreads(self):
+		cache = ipaddr.ParseCache(maxSize=8)
+		def fill():
+			for i in range(2000):
+				cache.put(i, i)
+				cache.get(i - 1)
+		threads = [threading.Thread(target=fill) for i in range(4)]
+		for thread in threads:
+			thread.start()
+		for size in range(200):
+			cache.resize(size % 8 + 1)
+		for thread in threads:
+			thread.join()
+		self.assertTrue(len(cache) <= cache.maxSize)
+
+class TestPrefixTable(unittest.TestCase):
+
+	def setUp(self):
+		self.table = ipaddr.PrefixTable()
+		for (notation, value) in [('10.0.0.0/8', 'a'), ('10.1.0.0/16', 'b'), ('10.1.2.0/24', 'c'), ('192.168.0.0/16', 'd')]:
+			self.table.insert(ipaddr.ipv4Addr(addr=notation), value)
+
+	def test_longestMatch(self):
+		(network, value) = self.table.longestMatch('10.1.2.3')
+		self.assertEqual(('10.1.2.0', 24, 'c'), (network.networkAddress, network.maskLen, value))
+		self.assertEqual('b', self.table.longestMatch('10.1.3.1')[1])
+		self.assertEqual('a', self.table.longestMatch('10.200.0.1')[1])
+		self.assertEqual(None, self.table.longestMatch('172.16.0.1'))
+
+	def test_exactMatch(self):
+		self.assertEqual('b', self.table.exactMatch(ipaddr.ipv4Addr(addr='10.1.0.0/16')))
+		self.assertRaises(KeyError, self.table.exactMatch, ipaddr.ipv4Addr(addr='10.1.0.0/17'))
+		self.assertTrue(ipaddr.ipv4Addr(addr='192.168.0.0/16') in self.table)
+
+	def test_delete(self):
+		self.table.delete(ipaddr.ipv4Addr(addr='10.1.0.0/16'))
+		self.assertEqual(3, len(self.table))
+		self.assertEqual('a', self.table.longestMatch('10.1.3.1')[1])
+		self.assertEqual('c', self.table.longestMatch('10.1.2.3')[1])
+		self.assertRaises(KeyError, self.table.delete, ipaddr.ipv4Addr(addr='10.1.0.0/16'))
+
+	def test_iteration(self):
+		networks = [(network.networkAddress, network.maskLen) for (network, value) in self.table]
+		self.assertEqual([('10.0.0.0', 8), ('10.1.0.0', 16), ('10.1.2.0', 24), ('192.168.0.0', 16)], networks)
+
+	@unittest.skipIf(ipaddr.numpy is None, 'numpy is not installed')
+	def test_lookupMany(self):
+		(addrs, maskLens, valid) = ipaddr.parseMany(['10.1.2.3', '10.1.3.1', '10.2.0.0', '172.16.0.1', '192.168.255.255'])
+		self.assertEqual(['c', 'b', 'a', None, 'd'], self.table.lookupMany(addrs).tolist())
+
+	@unittest.skipIf(ipaddr.numpy is None, 'numpy is not installed')
+	def test_lookupManyReplacedValue(self):
+		(addrs, maskLens, valid) = ipaddr.parseMany(['10.200.0.1'])
+		self.assertEqual(['a'], self.table.lookupMany(addrs).tolist())
+		self.table.insert(ipaddr.ipv4Addr(addr='10.0.0.0/8'), 'e')
+		self.assertEqual(['e'], self.table.lookupMany(addrs).tolist())
+		self.assertEqual('e', self.table.longestMatch('10.200.0.1')[1])
+
+	@unittest.skipIf(ipaddr.numpy is None, 'numpy is not installed')
+	def test_lookupManyDefault(self):
+		(addrs, maskLens, valid) = ipaddr.parseMany(['10.1.2.3', '172.16.0.1'])
+		self.assertEqual(['c', 'x'], self.table.lookupMany(addrs, default='x').tolist())
+		self.assertEqual(['c', 'y'], self.table.lookupMany(addrs, default='y').tolist())
+		self.assertFalse('y' in self.table._flat[2].tolist())
+
+class TestMappedPrefixTable(unittest.TestCase):
+
+	def setUp(self):
+		self.table = ipaddr.PrefixTable()
+		for (notation, value) in [('10.0.0.0/8', 'a'), ('10.1.0.0/16', 'b'), ('10.1.2.0/24', 'c'), ('192.168.0.0/16', 'd'), ('255.255.255.0/24', [1, 2])]:
+			self.table.insert(ipaddr.ipv4Addr(addr=notation), value)
+		fd, self.path = tempfile.mkstemp()
+		os.close(fd)
+		self.table.compile(self.path)
+		self.mapped = ipaddr.MappedPrefixTable(self.path)
+
+	def tearDown(self):
+		self.mapped.close()
+		os.remove(self.path)
+
+	def test_longestMatch(self):
+		(network, value) = self.mapped.longestMatch('10.1.2.3')
+		self.assertEqual(('10.1.2.0', 24, 'c'), (network.networkAddress, network.maskLen, value))
+		self.assertEqual('b', self.mapped.longestMatch('10.1.3.1')[1])
+		self.assertEqual('a', self.mapped.longestMatch('10.200.0.1')[1])
+		self.assertEqual([1, 2], self.mapped.longestMatch('255.255.255.255')[1])
+		self.assertEqual(None, self.mapped.longestMatch('172.16.0.1'))
+		self.assertEqual(None, self.mapped.longestMatch(0))
+		self.assertEqual(5, len(self.mapped))
+
+	def test_randomTables(self):
+		rand = random.Random(13)
+		table = ipaddr.PrefixTable()
+		for i in range(500):
+			table.insert(ipaddr.AddressSpace.fromInt(rand.getrandbits(32), rand.randint(1, 32)), i % 7)
+		table.compile(self.path)
+		mapped = ipaddr.MappedPrefixTable(self.path)
+		for addr in [rand.getrandbits(32) for i in range(2000)]:
+			expected = table.longestMatch(addr)
+			match = mapped.longestMatch(addr)
+			if expected is None:
+				self.assertEqual(None, match)
+			else:
+				self.assertEqual((expected[0].networkAddress, expected[0].maskLen, expected[1]), (match[0].networkAddress, match[0].maskLen, match[1]))
+		mapped.close()
+
+	def test_badFile(self):
+		self.mapped.close()
+		with open(self.path, 'wb') as f:
+			f.write(b'not a prefix table at all')
+		self.assertRaises(ValueError, ipaddr.MappedPrefixTable, self.path)
+
+	@unittest.skipIf(ipaddr.numpy is None, 'numpy is not installed')
+	def test_lookupMany(self):
+		(addrs, maskLens, valid) = ipaddr.parseMany(['10.1.2.3', '10.1.3.1', '10.2.0.0', '172.16.0.1', '192.168.255.255'])
+		self.assertEqual(['c', 'b', 'a', 'x', 'd'], self.mapped.lookupMany(addrs, default='x').tolist())
+		self.assertEqual(['c', 'b', 'a', None, 'd'], self.mapped.lookupMany(addrs).tolist())
+		self.assertEqual([[1, 2], [0]], self.mapped.lookupMany([0xFFFFFFFF, 0xAC100001], default=[0]).tolist())
+
+class TestRangeDatabase(unittest.TestCase):
+
+	def setUp(self):
+		self.lines = ['# first,last,asn,name',
+			      '8.8.8.0,8.8.8.255,AS15169,"Google, LLC"',
+			      '',
+			      '16777216,16777471,AS13335,Cloudflare',
+			      '10.0.0.0,10.255.255.255,private',
+			      '0x0A000000,0x0A000000,',
+			      '9.9.9.9,9.9.9.9,AS19281,Quad9']
+		fd, self.path = tempfile.mkstemp()
+		os.close(fd)
+
+	def tearDown(self):
+		os.remove(self.path)
+
+	def test_lookup(self):
+		del self.lines[5]
+		self.assertEqual(4, ipaddr.RangeDatabase.build(self.lines, self.path))
+		database = ipaddr.RangeDatabase(self.path)
+		self.assertEqual('AS15169,"Google, LLC"', database.lookup('8.8.8.8'))
+		self.assertEqual('AS13335,Cloudflare', database.lookup(0x01000001))
+		self.assertEqual('AS19281,Quad9', database.lookup('9.9.9.9'))
+		self.assertEqual('private', database.lookup('10.255.255.255'))
+		self.assertEqual(None, database.lookup('9.9.9.10'))
+		self.assertEqual('-', database.lookup('0.0.0.0', '-'))
+		self.assertEqual(('1.0.0.0', '1.0.0.255', 'AS13335,Cloudflare'), database.rangeOf('1.0.0.7'))
+		self.assertEqual(None, database.rangeOf('255.255.255.255'))
+		self.assertEqual(4, len(database))
+		database.close()
+		self.assertRaises(ValueError, database.lookup, '8.8.8.8')
+		self.assertRaises(ValueError, database.rangeOf, '8.8.8.8')
+
+	def test_invalidRows(self):
+		self.assertRaises(ValueError, ipaddr.RangeDatabase.build, self.lines, self.path)
+		self.assertRaises(ValueError, ipaddr.RangeDatabase.build, ['1.2.3.4,1.2.3.0,reversed'], self.path)
+		for row in ('10.0.0.0/8,10.0.0.0/8,x', '10.0.0.0,10.0.0.255/32,x', '0x0A000000 0xFF000000,0x0AFFFFFF,x', 'cafe,beef,x'):
+			self.assertRaises(ValueError, ipaddr.RangeDatabase.build, [row], self.path)
+		self.assertRaises(ValueError, ipaddr.RangeDatabase.build, ['first,last,name', '1.2.3.4,1.2.3.9'], self.path)
+		self.assertEqual(1, ipaddr.RangeDatabase.build(['first\tlast', '1.2.3.4\t1.2.3.9'], self.path, delimiter='\t', header=True))
+		with open(self.path, 'wb') as f:
+			f.write(b'IPRD not a range database')
+		self.assertRaises(ValueError, ipaddr.RangeDatabase, self.path)
+
+	def test_randomRanges(self):
+		rand = random.Random(23)
+		bounds = sorted(rand.sample(range(1 << 20), 2000))
+		rows = [(bounds[i] << 12, bounds[i + 1] << 12, 'row %d' % (i % 17)) for i in range(0, 2000, 2)]
+		ipaddr.RangeDatabase.build(['%d,%d,%s' % row for row in reversed(rows)], self.path)
+		database = ipaddr.RangeDatabase(self.path)
+		for (start, end, value) in rand.sample(rows, 200):
+			addr = rand.randint(start, end)
+			self.assertEqual(value, database.lookup(addr))
+			self.assertEqual(None, database.lookup(end + 1))
+		database.close()
+
+	@unittest.skipIf(ipaddr.numpy is None, 'numpy is not installed')
+	def test_lookupMany(self):
+		del self.lines[5]
+		ipaddr.RangeDatabase.build(self.lines, self.path)
+		database = ipaddr.RangeDatabase(self.path)
+		(addrs, maskLens, valid) = ipaddr.parseMany(['8.8.8.8', '9.9.9.10', '10.1.2.3', '0.0.0.0'])
+		self.assertEqual([1, -1, 3, -1], database.rowsMany(addrs).tolist())
+		self.assertEqual(['AS15169,"Google, LLC"', 'x', 'private', 'x'], database.lookupMany(addrs, default='x').tolist())
+		self.assertEqual(['AS15169,"Google, LLC"', None, 'private', None], database.lookupMany(addrs).tolist())
+		database.close()
+
+class TestClassifyAddr(unittest.TestCase):
+
+	def test_categories(self):
+		utils = ipaddr.IPv4Utils
+		self.assertEqual(ipaddr.ADDR_PRIVATE, utils.classifyAddr('172.31.255.255'))
+		self.assertEqual(ipaddr.ADDR_PUBLIC, utils.classifyAddr('172.32.0.0'))
+		self.assertEqual(ipaddr.ADDR_CGNAT, utils.classifyAddr('100.64.0.1'))
+		self.assertEqual(ipaddr.ADDR_DOCUMENTATION, utils.classifyAddr('0xcb007101'))
+		self.assertEqual(ipaddr.ADDR_RESERVED, utils.classifyAddr(0xFFFFFFFF))
+		self.assertEqual('benchmarking', ipaddr.addrCategoryNames[utils.classifyAddr('198.19.0.1')])
+
+	def test_outOfRange(self):
+		utils = ipaddr.IPv4Utils
+		for prefix in ('deadbeefdead', '0x100000000', 0x100000000, -1):
+			self.assertRaises(ValueError, utils.addr2Int, prefix)
+			self.assertRaises(ValueError, utils.classifyAddr, prefix)
+
+	def test_predicates(self):
+		utils = ipaddr.IPv4Utils
+		self.assertTrue(utils.isLoopback('127.0.0.1'))
+		self.assertTrue(utils.isMcast('239.255.255.250'))
+		self.assertTrue(utils.isPrivateAddr('11000000101010000000000100000001'))
+		self.assertFalse(utils.isPrivateAddr('100.64.0.1'))
+		self.assertTrue(utils.isBogonAddr('100.64.0.1'))
+		self.assertFalse(utils.isBogonAddr('8.8.8.8'))
+
+	@unittest.skipIf(ipaddr.numpy is None, 'numpy is not installed')
+	def test_classifyMany(self):
+		random.seed(4)
+		addrs = [random.getrandbits(32) for i in range(1000)]
+		codes = ipaddr.IPv4Utils.classifyMany(addrs)
+		self.assertEqual([ipaddr.IPv4Utils.classifyAddr(addr) for addr in addrs], codes.tolist())
+
+class TestInNetwork(unittest.TestCase):
+
+	def setUp(self):
+		self.network = ipaddr.ipv4Addr(addr='192.168.1.0/24')
+		self.prefixes = ['192.168.0.255', '192.168.1.0', '192.168.1.1', '192.168.1.254', '192.168.1.255', '192.168.2.0']
+		self.expected = [False, True, True, True, True, False]
+
+	def test_boundaries(self):
+		self.assertEqual(self.expected, [self.network.inNetwork(prefix) for prefix in self.prefixes])
+
+	@unittest.skipIf(ipaddr.numpy is None, 'numpy is not installed')
+	def test_containsMany(self):
+		(addrs, maskLens, valid) = ipaddr.parseMany(self.prefixes)
+		self.assertEqual(self.expected, self.network.containsMany(addrs).tolist())
+
+	@unittest.skipIf(ipaddr.numpy is None, 'numpy is not installed')
+	def test_containsMatrix(self):
+		(addrs, maskLens, valid) = ipaddr.parseMany(self.prefixes)
+		networks = [self.network, ipaddr.ipv4Addr(addr='192.168.0.0/16'), ipaddr.ipv4Addr(addr='192.168.1.255/32')]
+		matrix = ipaddr.containsMatrix(addrs, networks)
+		self.assertEqual((6, 3), matrix.shape)
+		self.assertEqual(self.expected, matrix[:, 0].tolist())
+		self.assertTrue(matrix[:, 1].all())
+		self.assertEqual([False, False, False, False, True, False], matrix[:, 2].tolist())
+
+class TestSubnetAllocator(unittest.TestCase):
+
+	def setUp(self):
+		self.allocator = ipaddr.SubnetAllocator(ipaddr.ipv4Addr(addr='192.168.0.0/16'))
+
+	def test_allocate(self):
+		subnets = [self.allocator.allocate(24) for i in range(256)]
+		self.assertEqual(256, len(set(subnet.networkAddress for subnet in subnets)))
+		self.assertRaises(ValueError, self.allocator.allocate, 30)
+		self.assertEqual(0, self.allocator.freeAddrCount)
+
+	def test_overlappingPools(self):
+		self.assertRaises(ValueError, self.allocator.addPool, ipaddr.ipv4Addr(addr='192.168.4.0/24'))
+		self.assertRaises(ValueError, self.allocator.addPool, ipaddr.ipv4Addr(addr='192.0.0.0/8'))
+		self.allocator.addPool(ipaddr.ipv4Addr(addr='192.169.0.0/16'))
+		self.assertEqual(2 * 65536, self.allocator.freeAddrCount)
+
+	def test_freeMergesBuddies(self):
+		first = self.allocator.allocate('255.255.255.0')
+		second = self.allocator.allocate(30)
+		self.allocator.free(first)
+		self.allocator.free(second)
+		self.assertEqual([[16, [3232235520]]], self.allocator.snapshot()['free'])
+		self.assertRaises(ValueError, self.allocator.free, first)
+
+	def test_reserve(self):
+		reserved = ipaddr.ipv4Addr(addr='192.168.77.128/25')
+		self.allocator.reserve(reserved)
+		self.assertTrue(self.allocator.isAllocated(reserved))
+		self.assertRaises(ValueError, self.allocator.reserve, ipaddr.ipv4Addr(addr='192.168.77.0/24'))
+		self.assertEqual(65536 - 128, self.allocator.freeAddrCount)
+
+	def test_snapshotRestore(self):
+		for maskLen in (24, 26, 30, 20):
+			self.allocator.allocate(maskLen)
+		restored = ipaddr.SubnetAllocator.restore(self.allocator.snapshot())
+		self.assertEqual(self.allocator.snapshot(), restored.snapshot())
+		self.assertEqual(4, len(restored))
+
+class TestIPSet(unittest.TestCase):
+
+	def setUp(self):
+		self.first = ipaddr.IPSet([ipaddr.ipv4Addr(addr=notation) for notation in ['10.0.0.0/24', '10.0.1.0/24', '10.0.2.0/23', '192.168.0.0/16']])
+		self.second = ipaddr.IPSet([ipaddr.ipv4Addr(addr=notation) for notation in ['10.0.2.128/25', '192.168.128.0/17', '172.16.0.0/12']])
+
+	def cidrs(self, ipset):
+		return ['%s/%d' % (network.networkAddress, network.maskLen) for network in ipset.cidrs()]
+
+	def test_mergedCidrs(self):
+		self.assertEqual(['10.0.0.0/22', '192.168.0.0/16'], self.cidrs(self.first))
+		self.assertEqual(2, self.first.rangeCount)
+		self.assertEqual(1024 + 65536, self.first.addrCount)
+
+	def test_setOperations(self):
+		self.assertEqual(['10.0.0.0/22', '172.16.0.0/12', '192.168.0.0/16'], self.cidrs(self.first | self.second))
+		self.assertEqual(['10.0.2.128/25', '192.168.128.0/17'], self.cidrs(self.first & self.second))
+		self.assertEqual(['10.0.0.0/23', '10.0.2.0/25', '10.0.3.0/24', '192.168.0.0/17'], self.cidrs(self.first - self.second))
+
+	def test_unionInterleaved(self):
+		odd = ipaddr.IPSet([ipaddr.AddressSpace.fromInt(0x0A000000 + i * 512, 24) for i in range(64)])
+		even = ipaddr.IPSet([ipaddr.AddressSpace.fromInt(0x0A000100 + i * 512, 24) for i in range(64)])
+		self.assertEqual(['10.0.0.0/17'], self.cidrs(odd | even))
+		self.assertEqual(odd | even, even | odd)
+		self.assertEqual(odd, odd | ipaddr.IPSet([]))
+
+	def test_membership(self):
+		self.assertTrue('10.0.3.255' in self.first)
+		self.assertFalse('10.0.4.0' in self.first)
+		self.assertTrue(ipaddr.ipv4Addr(addr='10.0.1.0/24') in self.first)
+		self.assertFalse(ipaddr.ipv4Addr(addr='10.0.0.0/21') in self.first)
+
+class TestHashing(unittest.TestCase):
+
+	def test_equality(self):
+		network = ipaddr.ipv4Addr(addr='10.0.0.0/8')
+		self.assertEqual(network, ipaddr.ipv4Addr(addr='10.0.0.0', mask='255.0.0.0'))
+		self.assertEqual(network, ipaddr.AddressSpace.fromInt(0x0A000000, 8))
+		self.assertNotEqual(network, ipaddr.ipv4Addr(addr='10.0.0.0/9'))
+		self.assertEqual('ipv4', network.addressFamily)
+		self.assertEqual('IPv4', ipaddr.AddressSpace.fromInt(0x0A000000, 8).addressFamily)
+		self.assertEqual('IPv4', ipaddr.AddressSpace('10.0.0.0', '255.0.0.0').addressFamily)
+		self.assertEqual('ipv4', ipaddr.ipv4Addr(addr='10.0.0.0/8', af_family='IPv4').addressFamily)
+		self.assertEqual('ipv6', ipaddr.ipv4Addr(addr='2001:db8::/32').addressFamily)
+		self.assertEqual('IPv6', ipaddr.InternTable().fromInt(0x20010DB8 << 96, 32, 'IPv6').addressFamily)
+		self.assertNotEqual(network, ipaddr.ipv4Addr(addr='10.0.0.1/8'))
+		self.assertFalse(network == '10.0.0.0/8')
+		self.assertTrue(network != '10.0.0.0/8')
+
+	def test_hashing(self):
+		networks = [ipaddr.ipv4Addr(addr='192.168.%d.0/24' % (i % 10)) for i in range(100)]
+		self.assertEqual(10, len(set(networks)))
+		counts = {}
+		for network in networks:
+			counts[network] = counts.get(network, 0) + 1
+		self.assertEqual(10, counts[ipaddr.AddressSpace.fromInt(0xC0A80300, 24)])
+
+	def test_intern(self):
+		table = ipaddr.InternTable()
+		first = table.intern(ipaddr.ipv4Addr(addr='172.16.0.0/12'))
+		self.assertTrue(table.intern(ipaddr.ipv4Addr(addr='172.16.0.0', mask='255.240.0.0')) is first)
+		self.assertTrue(table.fromInt(0xAC100000, 12) is first)
+		self.assertFalse(table.fromInt(0xAC100000, 13) is first)
+		self.assertTrue(ipaddr.ipv4Intern(addr='10.0.0.0/8') is ipaddr.ipv4Intern(addr='0x0A000000', mask='0xFF000000'))
+		self.assertTrue(first in table)
+		del first
+		gc.collect()
+		self.assertEqual(0, len(table))
+
+class TestOrdering(unittest.TestCase):
+
+	def test_compareFunctions(self):
+		self.assertTrue(ipaddr.__ge__('10.0.0.10', '10.0.0.9'))
+		self.assertFalse(ipaddr.__ge__('10.0.0.9', '10.0.0.9'))
+		self.assertTrue(ipaddr.__le__(0x0A000009, '10.0.0.10'))
+		self.assertTrue(ipaddr.__eq__('0x0A000009', 0x0A000009))
+		self.assertTrue(ipaddr.__ne__('10.0.0.9', '10.0.0.10'))
+
+	def test_richComparisons(self):
+		networks = [ipaddr.ipv4Addr(addr=notation) for notation in ('10.1.0.0/16', '10.0.0.0/8', '9.255.255.255/32', '10.0.0.0/16', '10.0.0.0/8')]
+		self.assertEqual(['9.255.255.255/32', '10.0.0.0/8', '10.0.0.0/8', '10.0.0.0/16', '10.1.0.0/16'],
+				 ['%s/%d' % (network.networkAddress, network.maskLen) for network in sorted(networks)])
+		self.assertTrue(networks[1] <= networks[4] <= networks[1])
+		self.assertTrue(networks[3] > networks[1])
+		self.assertEqual((0x0A000000 << 6) | 16, networks[3].sortKey)
+
+	def test_sortMany(self):
+		rand = random.Random(18)
+		prefixes = []
+		for i in range(2000):
+			addr = rand.getrandbits(32)
+			maskLen = rand.randint(1, 32)
+			prefixes.append(rand.choice((addr, ipaddr.IPv4Utils.int2DotDec(addr), '%s/%d' % (ipaddr.IPv4Utils.int2DotDec(addr), maskLen), ipaddr.AddressSpace.fromInt(addr, maskLen))))
+		prefixes.extend(['10.0.0.0/8', 0x0A000000, '10.0.0.0', '10.0.0.0 255.0.0.0'])
+		expected = sorted(prefixes, key=ipaddr._sortKeyOf)
+		self.assertEqual(expected, ipaddr.sortMany(prefixes))
+		strings = [prefix for prefix in prefixes if isinstance(prefix, str)]
+		self.assertEqual(sorted(strings, key=ipaddr._sortKeyOf), ipaddr.sortMany(strings))
+		addrs = [prefix for prefix in prefixes if isinstance(prefix, int)]
+		self.assertEqual(sorted(addrs), ipaddr.sortMany(addrs))
+		self.assertRaises(ValueError, ipaddr.sortMany, ['10.0.0.1', '10.0.0.256'])
+		# notations _parseNotation() accepts sort the same with and without numpy
+		self.assertEqual(['0x01020304   0xFF000000', '9.0.0.0  255.0.0.0', '10.0.0.0\t255.0.0.0'],
+				 ipaddr.sortMany(['10.0.0.0\t255.0.0.0', '9.0.0.0  255.0.0.0', '0x01020304   0xFF000000']))
+		self.assertRaises(ValueError, ipaddr.sortMany, ['10.0.0.0 /8'])
+		self.assertEqual([], ipaddr.sortMany([]))
+
+class TestHostSequence(unittest.TestCase):
+
+	def setUp(self):
+		self.network = ipaddr.ipv4Addr(addr='10.0.0.0/8')
+
+	def test_len(self):
+		self.assertEqual(2 ** 24 - 2, len(self.network))
+		self.assertEqual(0, len(ipaddr.ipv4Addr(addr='10.0.0.1/32')))
+
+	def test_indexing(self):
+		self.assertEqual('10.0.0.1', self.network[0])
+		self.assertEqual('10.255.255.254', self.network[-1])
+		self.assertRaises(IndexError, self.network.__getitem__, 2 ** 24 - 2)
+
+	def test_slicing(self):
+		self.assertEqual(['10.0.0.6', '10.0.0.8', '10.0.0.10'], list(self.network[5:10:2]))
+		self.assertEqual(['10.0.0.11', '10.0.0.8', '10.0.0.5'], list(self.network[10:2:-3]))
+		self.assertEqual(16778, len(self.network[::1000]))
+		self.assertTrue('10.0.0.8' in self.network[5:10:2])
+
+	def test_reversed(self):
+		self.assertEqual(['10.255.255.254', '10.255.255.253'], list(itertools.islice(reversed(self.network), 2)))
+
+	def test_independentIterators(self):
+		network = ipaddr.ipv4Addr(addr='192.168.1.0/29')
+		first = iter(network)
+		next(first)
+		self.assertEqual(6, len(list(network)))
+		self.assertEqual('192.168.1.2', next(first))
+
+class TestSubnets(unittest.TestCase):
+
+	def setUp(self):
+		self.subnets = ipaddr.subnets(ipaddr.ipv4Addr(addr='10.0.0.0/8'), 30)
+
+	def test_len(self):
+		self.assertEqual(2 ** 22, len(self.subnets))
+		self.assertEqual(4, len(ipaddr.subnets(ipaddr.ipv4Addr(addr='192.168.1.0/24'), '255.255.255.192')))
+
+	def test_indexing(self):
+		self.assertEqual('10.0.0.20', self.subnets[5].networkAddress)
+		self.assertEqual(30, self.subnets[5].maskLen)
+		self.assertEqual('10.255.255.252', self.subnets[-1].networkAddress)
+		self.assertEqual(['10.0.0.16', '10.0.0.28'], [subnet.networkAddress for subnet in self.subnets[4:10:3]])
+		self.assertRaises(IndexError, self.subnets.__getitem__, 2 ** 22)
+
+	def test_inSubnet(self):
+		self.assertEqual(324, self.subnets.inSubnet('10.0.5.17'))
+		self.assertTrue(self.subnets[self.subnets.inSubnet('10.200.5.17')].inNetwork('10.200.5.17'))
+		self.assertRaises(ValueError, self.subnets.inSubnet, '11.0.0.0')
+
+	def test_iteration(self):
+		self.assertEqual(['10.0.0.0', '10.0.0.4', '10.0.0.8'], [subnet.networkAddress for subnet in itertools.islice(self.subnets, 3)])
+
+	def test_invalidMask(self):
+		self.assertRaises(ValueError, ipaddr.subnets, ipaddr.ipv4Addr(addr='192.168.1.0/24'), 16)
+
+class TestVersionedPrefixTable(unittest.TestCase):
+
+	def setUp(self):
+		self.table = ipaddr.VersionedPrefixTable()
+		self.networks = [ipaddr.AddressSpace.fromInt(0x0A000000 | (i << 8), 24) for i in range(64)]
+
+	def test_versions(self):
+		first = self.table.update(inserts={ipaddr.ipv4Addr(addr='10.0.0.0/8'): 'a', ipaddr.ipv4Addr(addr='2001:db8::/32'): 'v6'})
+		second = self.table.insert(ipaddr.ipv4Addr(addr='10.1.0.0/16'), 'b')
+		third = self.table.withdraw(ipaddr.ipv4Addr(addr='10.0.0.0/8'))
+		self.assertEqual((1, 2, 3), (first.version, second.version, third.version))
+		self.assertEqual('a', first.longestMatch('10.1.2.3')[1])
+		self.assertEqual('b', second.longestMatch('10.1.2.3')[1])
+		self.assertEqual(None, third.longestMatch('10.2.0.1'))
+		self.assertEqual('v6', third.longestMatch('2001:db8::1')[1])
+		self.assertEqual((2, 3, 2), (len(first), len(second), len(third)))
+		self.assertEqual('b', second.exactMatch(ipaddr.ipv4Addr(addr='10.1.0.0/16')))
+		self.assertFalse(ipaddr.ipv4Addr(addr='10.1.0.0/16') in first)
+		self.assertEqual(['10.1.0.0', '2001:db8::'], [network.networkAddress for (network, value) in third])
+		self.assertTrue(self.table.snapshot() is third)
+
+	def test_failedUpdate(self):
+		self.table.update(inserts=[(network, 0) for network in self.networks])
+		self.assertRaises(KeyError, self.table.update, [(ipaddr.ipv4Addr(addr='10.0.0.0/8'), 1)], [ipaddr.ipv4Addr(addr='10.1.0.0/16')])
+		self.assertEqual((1, 64), (self.table.version, len(self.table)))
+		self.assertEqual(None, self.table.longestMatch('10.1.0.1'))
+
+	def test_sharing(self):
+		before = self.table.update(inserts=[(network, 0) for network in self.networks])
+		after = self.table.insert(ipaddr.ipv4Addr(addr='10.0.63.0/24'), 1)
+		# the half of the trie holding 10.0.0.0/24 - 10.0.31.0/24 is not copied
+		self.assertTrue(before._root4[4][4] is after._root4[4][4])
+
+	def test_concurrentReaders(self):
+		''' every version sets all networks to its number; a reader must never see two
+		numbers in one snapshot '''
+		self.table.update(inserts=[(network, 0) for network in self.networks])
+		probes = [network.startHostAddr for network in self.networks]
+		done = threading.Event()
+		errors = []
+		reads = [0]
+
+		def reader():
+			last = 0
+			while not done.is_set():
+				snapshot = self.table.snapshot()
+				values = set(snapshot.longestMatch(probe)[1] for probe in probes)
+				if values != set([snapshot.version - 1]) or snapshot.version < last:
+					errors.append((snapshot.version, values))
+				last = snapshot.version
+				reads[0] += 1
+
+		threads = [threading.Thread(target=reader) for i in range(4)]
+		for thread in threads:
+			thread.start()
+		latencies = []
+		try:
+			for version in range(1, 101):
+				start = time.time()
+				self.table.update(inserts=[(network, version) for network in self.networks])
+				latencies.append(time.time() - start)
+		finally:
+			done.set()
+			for thread in threads:
+				thread.join()
+		self.assertEqual([], errors)
+		self.assertTrue(reads[0] > 0)
+		self.assertEqual(101, self.table.version)
+		latencies.sort()
+		# the latency of a 64 network update, reported by ipaddr-bench.py; here only
+		# checked to be bounded while readers compete for the interpreter
+		self.assertTrue(latencies[len(latencies) // 2] < 1.0)
+
+class TestHostPermutation(unittest.TestCase):
+
+	def setUp(self):
+		self.network = ipaddr.ipv4Addr(addr='10.0.0.0/22')
+
+	def test_permutation(self):
+		hosts = list(self.network.permutedHosts(seed=1))
+		self.assertEqual(sorted(self.network.hosts, key=ipaddr.IPv4Utils.dotDec2Int), sorted(hosts, key=ipaddr.IPv4Utils.dotDec2Int))
+		self.assertNotEqual(list(self.network.hosts), hosts)
+		self.assertEqual(hosts, list(ipaddr.HostPermutation(self.network, seed=1)))
+		self.assertNotEqual(hosts, list(ipaddr.HostPermutation(self.network, seed=2)))
+		self.assertEqual(hosts[7], self.network.permutedHosts(seed=1)[7])
+		for maskLen in (23, 29, 30, 31, 32):
+			network = ipaddr.AddressSpace.fromInt(0xC0A80000, maskLen)
+			self.assertEqual(len(network), len(set(network.permutedHosts())))
+		network = ipaddr.ipv4Addr(addr='2001:db8::/120')
+		self.assertEqual(set(network.hosts), set(network.permutedHosts(seed=5)))
+
+	def test_resume(self):
+		permutation = self.network.permutedHosts(seed=3)
+		first = [next(permutation) for i in range(100)]
+		self.assertEqual((100, 922), (permutation.position, len(permutation)))
+		resumed = ipaddr.HostPermutation(self.network, seed=3, position=permutation.position)
+		self.assertEqual(list(self.network.permutedHosts(seed=3)), first + list(resumed))
+		self.assertEqual(0, len(resumed))
+		self.assertRaises(ValueError, ipaddr.HostPermutation, self.network, position=1023)
+
+	def test_shards(self):
+		hosts = list(self.network.permutedHosts(seed=4))
+		shards = [list(self.network.permutedHosts(seed=4, shard=shard, shards=5)) for shard in range(5)]
+		self.assertEqual([205, 205, 204, 204, 204], [len(shard) for shard in shards])
+		for shard in range(5):
+			self.assertEqual(hosts[shard::5], shards[shard])
+		self.assertRaises(ValueError, ipaddr.HostPermutation, self.network, shard=5, shards=5)
+
+	def test_largeNetworks(self):
+		permutation = ipaddr.ipv4Addr(addr='2001:db8::/64').permutedHosts(seed=9)
+		self.assertEqual((1 << 64) - 2, permutation.count)
+		self.assertTrue(ipaddr.ipv4Addr(addr='2001:db8::/64').inNetwork(permutation[10 ** 18]))
+		self.assertEqual(permutation[12345], permutation[12345])
+
+class TestHostTracker(unittest.TestCase):
+
+	def setUp(self):
+		self.tracker = ipaddr.HostTracker(ipaddr.ipv4Addr(addr='192.168.0.0/22'))
+
+	def test_mark(self):
+		self.assertEqual(1022, len(self.tracker))
+		self.assertTrue(self.tracker.markUsed('192.168.0.1'))
+		self.assertFalse(self.tracker.markUsed(0xC0A80001))
+		self.assertTrue(self.tracker.isUsed('192.168.0.1'))
+		self.assertEqual(256, self.tracker.markRange('192.168.1.0', '192.168.1.255'))
+		self.assertEqual(2, self.tracker.markRange('192.168.1.0', '192.168.2.1'))
+		self.assertEqual(259, self.tracker.usedCount)
+		self.assertEqual(2, self.tracker.markRange('192.168.2.0', '192.168.2.1', used=False))
+		self.assertTrue(self.tracker.markFree('192.168.0.1'))
+		self.assertEqual(256, self.tracker.usedCount)
+		self.assertEqual(256, self.tracker.countUsed('192.168.1.0', '192.168.2.255'))
+		self.assertRaises(ValueError, self.tracker.markUsed, '192.168.0.0')
+		self.assertRaises(ValueError, self.tracker.markUsed, '192.168.4.1')
+		self.assertRaises(ValueError, ipaddr.HostTracker, ipaddr.ipv4Addr(addr='10.0.0.1/32'))
+
+	def test_findFree(self):
+		self.tracker.markRange('192.168.0.1', '192.168.0.100')
+		self.tracker.markUsed('192.168.0.105')
+		self.assertEqual('192.168.0.101', self.tracker.findFree())
+		self.assertEqual('192.168.0.106', self.tracker.findFree('192.168.0.105'))
+		self.assertEqual('192.168.0.106', self.tracker.findFreeRun(5))
+		self.assertEqual('192.168.0.101', self.tracker.allocate(4))
+		self.assertEqual('192.168.0.106', self.tracker.allocate())
+		self.tracker.markRange('192.168.0.107', '192.168.3.254')
+		self.assertEqual(None, self.tracker.findFree())
+		self.assertRaises(ValueError, self.tracker.allocate)
+		self.tracker.markRange('192.168.2.250', '192.168.3.2', used=False)
+		self.assertEqual('192.168.2.250', self.tracker.findFreeRun(9))
+		self.assertEqual(None, self.tracker.findFreeRun(10))
+
+	def test_allocateHint(self):
+		tracker = ipaddr.HostTracker(ipaddr.ipv4Addr(addr='10.0.0.0/8'))
+		hosts = [tracker.allocate() for i in range(1000)]
+		self.assertEqual(1000, len(set(hosts)))
+		self.assertEqual(1000, tracker._hint)
+		tracker.markFree(hosts[10])
+		self.assertEqual(10, tracker._hint)
+		self.assertEqual(hosts[10], tracker.allocate())
+		self.assertEqual(11, tracker._hint)
+		self.assertEqual('10.0.3.233', tracker.allocate(4))
+		self.assertEqual(1004, tracker._hint)
+
+	def test_largeRuns(self):
+		tracker = ipaddr.HostTracker(ipaddr.ipv4Addr(addr='10.0.0.0/8'))
+		tracker.markRange('10.0.0.1', '10.255.255.254')
+		tracker.markRange('10.128.0.0', '10.129.0.0', used=False)
+		tracker.markRange('10.200.0.0', '10.200.0.9', used=False)
+		self.assertEqual([('10.128.0.0', 65537), ('10.200.0.0', 10)], list(tracker.freeRuns()))
+		self.assertEqual('10.128.0.0', tracker.findFreeRun(65537))
+		self.assertEqual(None, tracker.findFreeRun(65538))
+		stats = tracker.stats()
+		self.assertEqual(65547, stats['free'])
+		self.assertEqual(65537, stats['largestFreeRun'])
+		self.assertEqual(2, stats['freeRuns'])
+
+	def test_dump(self):
+		self.tracker.markRange('192.168.0.1', '192.168.1.200')
+		self.tracker.markUsed('192.168.3.3')
+		(handle, path) = tempfile.mkstemp()
+		os.close(handle)
+		try:
+			self.tracker.dump(path)
+			self.assertTrue(os.path.getsize(path) < 100)
+			loaded = ipaddr.HostTracker.load(path)
+			self.assertEqual(self.tracker.network, loaded.network)
+			self.assertEqual(457, loaded.usedCount)
+			self.assertEqual(list(self.tracker.freeRuns()), list(loaded.freeRuns()))
+			with open(path, 'wb') as stream:
+				stream.write(b'not a dump')
+			self.assertRaises(ValueError, ipaddr.HostTracker.load, path)
+		finally:
+			os.remove(path)
+
+class TestSummarizeRange(unittest.TestCase):
+
+	def cidrs(self, *args):
+		return [(network.networkAddress, network.maskLen) for network in ipaddr.summarizeRange(*args)]
+
+	def test_summarizeRange(self):
+		self.assertEqual([('192.168.1.1', 32), ('192.168.1.2', 31), ('192.168.1.4', 31), ('192.168.1.6', 32)], self.cidrs('192.168.1.1', '192.168.1.6'))
+		self.assertEqual([('10.0.0.0', 8)], self.cidrs('10.0.0.0', '10.255.255.255'))
+		self.assertEqual([('0.0.0.0', 0)], self.cidrs(0, 0xFFFFFFFF))
+		self.assertEqual([('255.255.255.255', 32)], self.cidrs(0xFFFFFFFF, 0xFFFFFFFF))
+
+	def test_hostRange(self):
+		network = ipaddr.ipv4Addr(addr='192.168.1.0/24')
+		cidrs = self.cidrs(network.hostRange)
+		self.assertEqual(14, len(cidrs))
+		self.assertEqual(('192.168.1.1', 32), cidrs[0])
+		self.assertEqual(('192.168.1.128', 26), cidrs[7])
+		self.assertEqual(254, sum(2 ** (32 - maskLen) for (addr, maskLen) in cidrs))
+
+	def test_invalid(self):
+		self.assertRaises(ValueError, list, ipaddr.summarizeRange('10.0.0.2', '10.0.0.1'))
+		self.assertRaises(ValueError, list, ipaddr.summarizeRange('10.0.0.2'))
+		self.assertRaises(ValueError, list, ipaddr.summarizeRange(0, 2 ** 32))
+
+	@unittest.skipIf(ipaddr.numpy is None, 'numpy is not installed')
+	def test_summarizeMany(self):
+		rand = random.Random(14)
+		ranges = [(0, 0xFFFFFFFF), (5, 5), (0, 0)]
+		for i in range(500):
+			start = rand.getrandbits(32)
+			ranges.append((start, min(0xFFFFFFFF, start + rand.getrandbits(rand.choice((4, 12, 32))))))
+		(starts, ends) = zip(*ranges)
+		(addrs, maskLens, owners) = ipaddr.summarizeMany(starts, ends)
+		expected = [(network._addr, network.maskLen, i) for (i, (start, end)) in enumerate(ranges) for network in ipaddr.summarizeRange(start, end)]
+		self.assertEqual(expected, list(zip(addrs.tolist(), maskLens.tolist(), owners.tolist())))
+		(first, last) = ipaddr.expandMany(addrs, maskLens)
+		covered = ipaddr.numpy.bincount(owners, weights=last.astype(float) - first + 1, minlength=len(ranges))
+		self.assertEqual([end - start + 1 for (start, end) in ranges], covered.astype(int).tolist())
+		self.assertRaises(ValueError, ipaddr.summarizeMany, [2], [1])
+
+	@unittest.skipIf(ipaddr.numpy is None, 'numpy is not installed')
+	def test_expandMany(self):
+		(addrs, maskLens, valid) = ipaddr.parseMany(['10.1.2.3/8', '192.168.1.1', '0.0.0.0/0'])
+		(starts, ends) = ipaddr.expandMany(addrs, maskLens)
+		self.assertEqual([0x0A000000, 0xC0A80101, 0], starts.tolist())
+		self.assertEqual([0x0AFFFFFF, 0xC0A80101, 0xFFFFFFFF], ends.tolist())
+
+class TestConflicts(unittest.TestCase):
+
+	def test_relations(self):
+		inventory = [ipaddr.ipv4Addr(addr='10.0.0.0/8'),
+			     ipaddr.ipv4Addr(addr='10.1.0.0/16'),
+			     ipaddr.ipv4Addr(addr='192.168.0.0/24'),
+			     ipaddr.ipv4Addr(addr='10.1.0.0', mask='255.255.0.0'),
+			     ('192.168.0.128', '192.168.1.10'),
+			     ipaddr.ipv4Addr(addr='172.16.0.0/12')]
+		conflicts = sorted(ipaddr.findConflicts(inventory))
+		self.assertEqual([(ipaddr.CONFLICT_DUPLICATE, 1, 3),
+				  (ipaddr.CONFLICT_CONTAINS, 0, 1),
+				  (ipaddr.CONFLICT_CONTAINS, 0, 3),
+				  (ipaddr.CONFLICT_OVERLAP, 2, 4)], conflicts)
+		self.assertEqual('overlap', ipaddr.conflictNames[conflicts[-1][0]])
+
+	def test_families(self):
+		inventory = [ipaddr.ipv4Addr(addr='10.0.0.0/8'), ipaddr.ipv4Addr(addr='::a00:0/104'),
+			     ipaddr.ipv4Addr(addr='::/96'), (0x0A000000, 0x0A0000FF)]
+		self.assertEqual([(ipaddr.CONFLICT_CONTAINS, 0, 3), (ipaddr.CONFLICT_CONTAINS, 2, 1)],
+				 sorted(ipaddr.findConflicts(inventory)))
+
+	def test_stream(self):
+		inventory = [ipaddr.AddressSpace.fromInt(0x0A000000 + (i << 8), 24) for i in range(1000)]
+		inventory.append(ipaddr.ipv4Addr(addr='10.0.0.0/16'))
+		conflicts = ipaddr.findConflicts(inventory)
+		self.assertEqual((ipaddr.CONFLICT_CONTAINS, 1000, 0), next(conflicts))
+		self.assertEqual(256, 1 + sum(1 for conflict in conflicts))
+		self.assertEqual([], list(ipaddr.findConflicts([])))
+		self.assertRaises(ValueError, list, ipaddr.findConflicts([('10.0.0.9', '10.0.0.1')]))
+
+class TestAnnotate(unittest.TestCase):
+
+	def setUp(self):
+		self.table = annotate.loadNetworks(['# site networks', '10.1.0.0/16 office lan', '192.168.0.0 255.255.0.0', '', '10.0.0.0/8'])
+
+	def stream(self, text=''):
+		# native strings are bytes on python 2
+		return io.BytesIO(text) if str is bytes else io.StringIO(text)
+
+	def test_loadNetworks(self):
+		self.assertEqual(3, len(self.table))
+		self.assertEqual('office lan', self.table.longestMatch('10.1.9.9')[1])
+		self.assertEqual('192.168.0.0/16', self.table.longestMatch('192.168.7.7')[1])
+		self.assertEqual('10.0.0.0/8', self.table.longestMatch('10.2.0.1')[1])
+		table = annotate.loadNetworks(['0x0A010000 0xFFFF0000 hex', '10.2.0.0/16 corp.example.com', '10.3.0.0 lab.example.com'])
+		self.assertEqual(('10.1.0.0', 16, 'hex'), (lambda match: (match[0].networkAddress, match[0].maskLen, match[1]))(table.longestMatch('10.1.1.1')))
+		self.assertEqual('corp.example.com', table.longestMatch('10.2.1.1')[1])
+		self.assertEqual('lab.example.com', table.longestMatch('10.3.0.0')[1])
+
+	def test_readLines(self):
+		text = 'one\ntwo words\n\nthree'
+		for bufferSize in (1, 2, 5, 100):
+			self.assertEqual(['one\n', 'two words\n', '\n', 'three'], list(annotate.readLines(self.stream(text), bufferSize)))
+
+	def test_annotateLines(self):
+		lines = ['from 10.1.2.3 to 8.8.8.8\n', 'no addresses\n', 'bad 999.1.1.1 or 1.2.3.4.5\n', 'last 100.64.1.1']
+		self.assertEqual(['from 10.1.2.3 to 8.8.8.8\t10.1.2.3:office lan:private 8.8.8.8:-:public\n',
+				  'no addresses\n', 'bad 999.1.1.1 or 1.2.3.4.5\n', 'last 100.64.1.1\t100.64.1.1:-:cgnat'],
+				 list(annotate.annotateLines(lines, self.table)))
+		self.assertEqual('a 127.0.0.1\t127.0.0.1:-:loopback\n', next(annotate.annotateLines(['a 127.0.0.1\n'])))
+
+	def test_sentenceEnd(self):
+		self.assertEqual(['10.1.2.3', '10.1.2.4'], annotate._addrToken.findall('denied from 10.1.2.3. retry 10.1.2.4'))
+		self.assertEqual([], annotate._addrToken.findall('version 1.2.3.4.5'))
+		self.assertEqual('denied from 10.1.2.3.\t10.1.2.3:office lan:private\n',
+				 next(annotate.annotateLines(['denied from 10.1.2.3.\n'], self.table)))
+
+	def test_annotateStream(self):
+		text = ''.join('%d 10.1.%d.1 192.168.0.%d\n' % (i, i % 256, i % 256) for i in range(1000))
+		expected = ''.join(annotate.annotateLines(text.splitlines(True), self.table))
+		outstream = self.stream()
+		stats = annotate.annotateStream(self.stream(text), outstream, self.table, bufferSize=64)
+		self.assertEqual(expected, outstream.getvalue())
+		self.assertEqual(1000, stats['lines'])
+
+class TestParallel(unittest.TestCase):
+
+	def setUp(self):
+		rand = random.Random(12)
+		self.lines = ['%d.%d.%d.%d' % (rand.choice((10, 100, 172, 192, 8)), rand.randrange(256), rand.randrange(256), rand.randrange(256)) for i in range(2000)]
+		self.lines[5:8] = ['not an address', '', '0xc0a80101 trailing field']
+		self.lines[8:11] = ['cafe', 'beef 1.2.3.4', '10.0.0.0/8']
+		fd, self.path = tempfile.mkstemp()
+		with os.fdopen(fd, 'w') as f:
+			f.write('\n'.join(self.lines))
+		self.networks = ['10.0.0.0/8 corp', '192.168.0.0 255.255.0.0']
+
+	def tearDown(self):
+		os.remove(self.path)
+
+	def test_splitFile(self):
+		chunks = parallel.splitFile(self.path, 1000)
+		self.assertEqual(0, chunks[0][0])
+		self.assertEqual(os.path.getsize(self.path), chunks[-1][1])
+		with open(self.path, 'rb') as f:
+			data = f.read()
+		for (start, end), (nextStart, nextEnd) in zip(chunks, chunks[1:]):
+			self.assertEqual(end, nextStart)
+			self.assertEqual(b'\n', data[end - 1:end])
+
+	def test_classifyFile(self):
+		table = annotate.loadNetworks(self.networks)
+		expected = []
+		for line in self.lines:
+			try:
+				addr = ipaddr._parseAddr(line.split()[0])
+			except (ValueError, IndexError):
+				expected.append((None, None))
+				continue
+			match = table.longestMatch(addr)
+			expected.append((ipaddr.IPv4Utils.classifyAddr(addr), match[1] if match else None))
+		self.assertEqual((ipaddr.ADDR_PRIVATE, '192.168.0.0/16'), expected[7])
+		self.assertEqual([(None, None)] * 3, expected[8:11])
+		for workers in (1, 2):
+			self.assertEqual(expected, list(parallel.classifyFile(self.path, self.networks, workers, chunkSize=997)))
+		self.assertRaises(ValueError, list, parallel.classifyFile(self.path, workers=0))
+
+	def test_countFile(self):
+		categories, labels = parallel.countFile(self.path, self.networks, workers=2, chunkSize=4096)
+		self.assertEqual(len(self.lines), sum(categories.values()))
+		self.assertEqual(5, categories['invalid'])
+		self.assertEqual(sum(line.startswith('10.') and '/' not in line for line in self.lines), labels['corp'])
+
+class TestInstrumentation(unittest.TestCase):
+
+	def setUp(self):
+		self.instrumentation = ipaddr.Instrumentation()
+
+	def tearDown(self):
+		self.instrumentation.disable()
+
+	def test_counters(self):
+		self.instrumentation.enable()
+		self.assertTrue(self.instrumentation.enabled)
+		network = ipaddr.ipv4Addr(addr='172.31.250.0/23')
+		network.endHostAddr
+		network.endHostAddr
+		self.assertTrue(network.inNetwork('172.31.251.9'))
+		stats = self.instrumentation.snapshot()
+		self.assertEqual(2, stats['AddressSpace.endHostAddr']['calls'])
+		self.assertEqual(1, stats['AddressSpace.endHostAddr']['hits'])
+		self.assertEqual(1, stats['IPv4Utils.int2DotDec']['calls'])
+		self.assertEqual(1, stats['IPv4Utils.addr2Int']['calls'])
+		self.assertTrue(stats['ipv4Addr']['seconds'] >= stats['_validateArgs']['seconds'] >= stats['_parseNotation']['seconds'] > 0)
+		self.instrumentation.reset()
+		self.assertEqual({}, self.instrumentation.snapshot())
+
+	def test_parseCacheHits(self):
+		self.instrumentation.enable()
+		for i in range(3):
+			ipaddr.ipv4Addr(addr='172.31.248.0', mask='255.255.252.0')
+		stats = self.instrumentation.snapshot()['ipv4Addr']
+		self.assertEqual(3, stats['calls'])
+		self.assertTrue(stats['hits'] >= 2)
+
+	def test_parseCacheHitsThreads(self):
+		ipaddr.parseCache.clear()
+		self.instrumentation.enable()
+		def parse(octet):
+			for repeat in range(2):
+				for i in range(200):
+					ipaddr.ipv4Addr(addr='%d.%d.%d.0/24' % (octet, i // 256, i % 256))
+		threads = [threading.Thread(target=parse, args=(octet,)) for octet in range(11, 15)]
+		# switch threads often so the lookups of different threads interleave
+		if hasattr(sys, 'setswitchinterval'):
+			interval = sys.getswitchinterval()
+			sys.setswitchinterval(1e-6)
+		try:
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+		finally:
+			if hasattr(sys, 'setswitchinterval'):
+				sys.setswitchinterval(interval)
+		stats = self.instrumentation.snapshot()['ipv4Addr']
+		self.assertEqual(1600, stats['calls'])
+		self.assertEqual(800, stats['hits'])
+		self.instrumentation.disable()
+		self.assertFalse('get' in vars(ipaddr.parseCache))
+
+	def test_disable(self):
+		original = ipaddr.IPv4Utils.__dict__['int2DotDec']
+		self.instrumentation.enable()
+		self.assertFalse(ipaddr.IPv4Utils.__dict__['int2DotDec'] is original)
+		self.instrumentation.disable()
+		self.assertTrue(ipaddr.IPv4Utils.__dict__['int2DotDec'] is original)
+		ipaddr.ipv4Addr(addr='10.0.0.0/8').broadcastAddr
+		self.assertEqual({}, self.instrumentation.snapshot())
+
+class TestIPv6(unittest.TestCase):
+
+	def setUp(self):
+		self.network = ipaddr.ipv4Addr(addr='2001:db8::/32')
+
+	def test_parse(self):
+		utils = ipaddr.IPv6Utils
+		self.assertEqual(0x20010DB8 << 96 | 1, utils.colonHex2Int('2001:DB8::1'))
+		self.assertEqual(0xFFFF01020304, utils.colonHex2Int('::ffff:1.2.3.4'))
+		self.assertEqual('::ffff:102:304', utils.int2ColonHex(0xFFFF01020304))
+		for addr in ('::', '::1', '2001:db8::1', '2001:db8:0:1:1:1:1:1', '2001:0:0:1::1', 'fe80::'):
+			self.assertEqual(addr, utils.int2ColonHex(utils.colonHex2Int(addr)))
+		self.assertEqual('2001:db8::1:0:0:1', utils.int2ColonHex(utils.colonHex2Int('2001:db8:0:0:1:0:0:1')))
+		for addr in ('2001:db8:::1', '1::2::3', '2001:db8', '12345::', '1:2:3:4:5:6:7:8:9', 'g::1', '::1.2.3', '::01.2.3.4', '::1.2.3.004'):
+			self.assertRaises(ValueError, utils.colonHex2Int, addr)
+
+	def test_network(self):
+		self.assertTrue(isinstance(self.network, ipaddr.AddressSpace6))
+		self.assertEqual('2001:db8::', self.network.networkAddress)
+		self.assertEqual('ffff:ffff::', self.network.networkMask)
+		self.assertEqual('2001:db8:ffff:ffff:ffff:ffff:ffff:ffff', self.network.broadcastAddr)
+		self.assertEqual(32, self.network.minPrefixLen)
+		self.assertEqual(128, self.network.maxPrefixLen)
+		self.assertEqual((1 << 96) - 2, self.network.hosts.count)
+		self.assertEqual(2, len(ipaddr.ipv4Addr(addr='2001:db8::/126')))
+		self.assertEqual(self.network, ipaddr.ipv4Addr(addr='2001:db8::', mask=32, af_family='ipv6'))
+		self.assertEqual(128, ipaddr.ipv4Addr(addr='::1').minPrefixLen)
+		self.assertRaises(ValueError, ipaddr.ipv4Addr, addr='2001:db8::/129')
+		self.assertRaises(ValueError, ipaddr.ipv4Addr, addr='10.0.0.0/8', af_family='ipv6')
+
+	def test_families(self):
+		self.assertNotEqual(ipaddr.ipv4Addr(addr='10.0.0.0/8'), ipaddr.AddressSpace6.fromInt(0x0A000000, 8))
+		table = ipaddr.InternTable()
+		first = table.intern(ipaddr.ipv4Addr(addr='10.0.0.0/8'))
+		self.assertFalse(table.fromInt(0x0A000000, 8, 'ipv6') is first)
+		self.assertTrue(table.fromInt(0x0A000000, 8) is first)
+
+	def test_ipv4Only(self):
+		self.assertRaises(ValueError, ipaddr.subnets, self.network, 48)
+		self.assertRaises(ValueError, ipaddr.SubnetAllocator, self.network)
+		self.assertRaises(ValueError, ipaddr.SubnetAllocator().addPool, self.network)
+		self.assertRaises(ValueError, ipaddr.IPSet, [self.network])
+		self.assertRaises(ValueError, ipaddr.sortMany, [ipaddr.ipv4Addr(addr='10.0.0.0/8'), self.network])
+		self.assertFalse(self.network in ipaddr.IPSet([ipaddr.AddressSpace.fromInt(0, 1)]))
+
+	def test_hosts(self):
+		network = ipaddr.ipv4Addr(addr='2001:db8::/126')
+		self.assertTrue(network.inNetwork('2001:db8::3'))
+		self.assertFalse(network.inNetwork('2001:db8::4'))
+		self.assertEqual(['2001:db8::1', '2001:db8::2'], list(network.hosts))
+		self.assertEqual('2001:db8:0:1::1', ipaddr.ipv4Addr(addr='2001:db8:0:1::/64').hosts[0])
+
+	def test_prefixTable(self):
+		table = ipaddr.PrefixTable()
+		table.insert(ipaddr.ipv4Addr(addr='10.0.0.0/8'), 'v4')
+		table.insert(self.network, 'doc')
+		table.insert(ipaddr.ipv4Addr(addr='2001:db8:1::/48'), 'site')
+		self.assertEqual(3, len(table))
+		self.assertEqual('site', table.longestMatch('2001:db8:1::5')[1])
+		self.assertEqual('doc', table.longestMatch('2001:db8:2::5')[1])
+		self.assertEqual('v4', table.longestMatch('10.1.2.3')[1])
+		self.assertEqual(None, table.longestMatch('2001:db9::1'))
+		table.delete(self.network)
+		self.assertEqual(None, table.longestMatch('2001:db8:2::5'))
+		self.assertEqual(2, len(table))
+
+class AsyncSource(object):
+
+	''' async iterator over a list without async syntax, counting the addresses pulled '''
+
+	def __init__(self, loop, items):
+		self.loop = loop
+		self.items = iter(items)
+		self.pulled = 0
+
+	def __aiter__(self):
+		return self
+
+	def __anext__(self):
+		future = self.loop.create_future()
+		try:
+			item = next(self.items)
+			self.pulled += len(item) if isinstance(item, list) else 1
+			future.set_result(item)
+		except StopIteration:
+			future.set_exception(StopAsyncIteration())
+		return future
+
+@unittest.skipIf(asyncstream is None, 'asyncio interface needs python 3.7 or later')
+class TestAsyncStream(unittest.TestCase):
+
+	def setUp(self):
+		self.table = ipaddr.PrefixTable()
+		self.table.insert(ipaddr.ipv4Addr(addr='10.0.0.0/8'), 'corp')
+		self.loop = asyncio.new_event_loop()
+		asyncio.set_event_loop(self.loop)
+		self.addrs = ['10.0.%d.%d' % (i // 256, i % 256) for i in range(2500)]
+
+	def tearDown(self):
+		asyncio.set_event_loop(None)
+		self.loop.close()
+
+	def chunks(self, stream):
+		''' yield the micro-batches of an async generator, running the loop for each '''
+		while True:
+			try:
+				yield self.loop.run_until_complete(stream.__anext__())
+			except StopAsyncIteration:
+				break
+
+	def test_microBatches(self):
+		chunks = list(self.chunks(asyncstream.classifyStream(AsyncSource(self.loop, self.addrs), self.table, batchSize=100)))
+		self.assertEqual([100] * 25, [len(chunk) for chunk in chunks])
+		self.assertEqual(('10.0.0.1', ipaddr.ADDR_PRIVATE, 'corp'), chunks[0][1])
+		self.assertEqual(self.addrs, [result[0] for chunk in chunks for result in chunk])
+
+	def test_executorBatches(self):
+		batches = [self.addrs[i:i + 250] for i in range(0, 2500, 250)]
+		stream = asyncstream.classifyStream(AsyncSource(self.loop, batches), self.table, batchSize=100, inlineLimit=10)
+		chunks = list(self.chunks(stream))
+		self.assertEqual([100, 100, 50] * 10, [len(chunk) for chunk in chunks])
+		self.assertEqual(self.addrs, [result[0] for chunk in chunks for result in chunk])
+
+	def test_backpressure(self):
+		source = AsyncSource(self.loop, self.addrs)
+		consumed = 0
+		for chunk in self.chunks(asyncstream.classifyStream(source, batchSize=10, maxPending=2)):
+			consumed += len(chunk)
+			# the queued micro-batches, the one being submitted and the one being filled
+			self.assertTrue(source.pulled - consumed <= 10 * 4)
+		self.assertEqual(2500, consumed)
+
+	def test_classifyBatch(self):
+		results = self.loop.run_until_complete(asyncstream.classifyBatch(self.addrs, self.table, inlineLimit=100))
+		self.assertEqual(2500, len(results))
+		self.assertEqual(('10.0.9.195', ipaddr.ADDR_PRIVATE, 'corp'), results[-1])
+
+	def test_streamReader(self):
+		reader = asyncio.StreamReader()
+		reader.feed_data(b'192.168.1.1\n\n10.1.2.3\nnot-an-address\ncafe\n0x0a000001\n')
+		reader.feed_eof()
+		stream = asyncstream.classifyStream(asyncstream.readAddrs(reader), self.table, flushInterval=0.001)
+		self.assertEqual([('192.168.1.1', ipaddr.ADDR_PRIVATE, None), ('10.1.2.3', ipaddr.ADDR_PRIVATE, 'corp'), ('not-an-address', None, None),
+				  ('cafe', None, None), ('0x0a000001', ipaddr.ADDR_PRIVATE, 'corp')],
+				 [result for chunk in self.chunks(stream) for result in chunk])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -16,7 +16,86 @@
     # You should have received a copy of the GNU General Public License
     # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import array
+import binascii
+import bisect
+import heapq
+import json
+import mmap
+import random
 import re
+import struct
+import sys
+import threading
+import timeit
+import weakref
+import zlib
+
+try:
+    import numpy
+except ImportError:
+    # numpy is only needed by the bulk functions; parseMany()
+    numpy = None
+
+try:
+    _intTypes = (int, long)
+    _range = xrange
+except NameError:
+    # python 3 has a single int type and a lazy range()
+    _intTypes = (int,)
+    _range = range
+
+# network mask for every mask length, indexed by mask length; _ipv4MaskLens maps
+# each valid (contiguous) mask back to its length
+_ipv4Masks = [0xFFFFFFFF ^ ((1 << (32 - maskLen)) - 1) for maskLen in range(33)]
+_ipv4MaskLens = dict((mask, maskLen) for (maskLen, mask) in enumerate(_ipv4Masks))
+
+# the same for 128 bit IPv6 addresses
+_ipv6All = (1 << 128) - 1
+_ipv6Masks = [_ipv6All ^ ((1 << (128 - maskLen)) - 1) for maskLen in range(129)]
+
+# bitmaps are read as little endian ints so bit i of the int is bit i of the bitmap
+if hasattr(int, 'from_bytes'):
+    def _bitsOf(data):
+        return int.from_bytes(data, 'little')
+else:
+    def _bitsOf(data):
+        data = bytearray(data)
+        data.reverse()
+        return int(binascii.hexlify(data) or b'0', 16)
+
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:
+    def _popcount(bits):
+        return bin(bits).count('1')
+
+# special purpose address categories returned by IPv4Utils.classifyAddr()
+ADDR_PUBLIC = 0
+ADDR_THIS_NETWORK = 1
+ADDR_PRIVATE = 2
+ADDR_CGNAT = 3
+ADDR_LOOPBACK = 4
+ADDR_LINK_LOCAL = 5
+ADDR_IETF_PROTOCOL = 6
+ADDR_DOCUMENTATION = 7
+ADDR_BENCHMARKING = 8
+ADDR_MULTICAST = 9
+ADDR_RESERVED = 10
+
+addrCategoryNames = ('public', 'this network', 'private', 'cgnat', 'loopback', 'link local',
+                     'ietf protocol assignment', 'documentation', 'benchmarking', 'multicast', 'reserved')
+
+# relations between two networks or ranges reported by findConflicts()
+CONFLICT_DUPLICATE = 0
+CONFLICT_CONTAINS = 1
+CONFLICT_OVERLAP = 2
+
+conflictNames = ('duplicate', 'contains', 'overlap')
+
+# address families accepted by the af_family keyword of ipv4Addr(), and the keywords it accepts
+_supportedAF = ('ipv4', 'ipv6')
+_validArgs = ('addr', 'mask', 'af_family')
 
 # factory function to parse different IPv4 notations and return the appropriate class
 # object
@@ -26,68 +105,52 @@ def __ge__(prefix1, prefix2):
     Return True if prefix 1 is larger than prefix 2 or False if prefix 2 is larger
 
     Args:
-        prefix1: A dotted decimal IPv4 address as a string
-        prefix2: A dotted decimal IPv4 address as a string
+        prefix1: An IPv4 address in any format accepted by addr2Int(); an unsigned
+                 int is compared without parsing
+        prefix2: An IPv4 address in any format accepted by addr2Int()
     Returns:
         True/False
     '''
-    prefix1 = IPv4Utils.dotDec2Int(prefix1)
-    prefix2 = IPv4Utils.dotDec2Int(prefix2)
-    if prefix1 > prefix2:
-        return True
-    else:
-        return False
+    return IPv4Utils.addr2Int(prefix1) > IPv4Utils.addr2Int(prefix2)
 
 def __le__(prefix1, prefix2):
     ''' 
     Return True if prefix 1 is less than prefix 2 or False if prefix 2 smaller than prefix 1
 
     Args:
-        prefix1: A dotted decimal IPv4 address as a string
-        prefix2: A dotted decimal IPv4 address as a string
+        prefix1: An IPv4 address in any format accepted by addr2Int(); an unsigned
+                 int is compared without parsing
+        prefix2: An IPv4 address in any format accepted by addr2Int()
     Returns:
         True/False
     '''
-    prefix1 = IPv4Utils.dotDec2Int(prefix1)
-    prefix2 = IPv4Utils.dotDec2Int(prefix2)
-    if prefix1 < prefix2:
-        return True
-    else:
-        return False
+    return IPv4Utils.addr2Int(prefix1) < IPv4Utils.addr2Int(prefix2)
 
 def __eq__(prefix1, prefix2):
     '''
      Return True if prefix 1 and prefix 2 are equal
 
      Args:
-        prefix1: A dotted decimal IPv4 address as a string
-        prefix2: A dotted decimal IPv4 address as a string
+        prefix1: An IPv4 address in any format accepted by addr2Int(); an unsigned
+                 int is compared without parsing
+        prefix2: An IPv4 address in any format accepted by addr2Int()
     Returns:
         True/False
     '''
-    prefix1 = IPv4Utils.dotDec2Int(prefix1)
-    prefix2 = IPv4Utils.dotDec2Int(prefix2)
-    if prefix1 == prefix2:
-        return True
-    else:
-        return False
+    return IPv4Utils.addr2Int(prefix1) == IPv4Utils.addr2Int(prefix2)
 
 def __ne__(prefix1, prefix2):
     ''' 
     Return True if prefix 1 and prefix 2 are not equal, otherwise return False
 
     Args:
-        prefix1: A dotted decimal IPv4 address as a string
-        prefix2: A dotted decimal IPv4 address as a string
+        prefix1: An IPv4 address in any format accepted by addr2Int(); an unsigned
+                 int is compared without parsing
+        prefix2: An IPv4 address in any format accepted by addr2Int()
     Returns:
         True/False
     '''
-    prefix1 = IPv4Utils.dotDec2Int(prefix1)
-    prefix2 = IPv4Utils.dotDec2Int(prefix2)
-    if prefix1 != prefix2:
-        return True
-    else:
-        return False
+    return IPv4Utils.addr2Int(prefix1) != IPv4Utils.addr2Int(prefix2)
 
 def __add__(prefix1, value):
     ''' 
@@ -121,135 +184,554 @@ def __sub__(prefix1, value):
     addr = IPv4Utils.int2DotDec(newValue)
     return addr 
 
+# match pattern for dotted decimal notation followed by an optional cidr mask length
+# or dotted decimal mask, ex. 192.168.1.0/24 or 192.168.1.0 255.255.255.0
+_dotDecNotation = re.compile(r'(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})'
+                             r'(?:/(\d{1,2})|\s+(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3}))?$')
+# match pattern for hex address followed by an optional hex mask, ex. 0xC0A80100 0xFFFFFF00
+_hexNotation = re.compile(r'0[xX]([0-9A-Fa-f]{8})(?:\s+0[xX]([0-9A-Fa-f]{8}))?$')
+
 def _parseNotation(*args):
     '''
     Parses IPv4 address and/or Mask to determine notation used and return the 
-    dotted decimal representation of the address and maskLen
+    address and mask length as integers. The notation is picked from the first
+    characters of the address so each input is matched against a single
+    precompiled pattern. An address without a mask is treated as a /32.
 
     Args:
         *args: '192.168.1.0', '255.255.255.0' 
                '192.168.1.0/24'
                '0xC0A80100', '0xFFFFFF00'
         Returns:
-                The dotted decimal representation of the address and mask as a 
-                dictionary 
-                {'addr' : 192.168.1.0', 'mask' : '255.255.255.0'}
+                The address as an unsigned int and the mask length as a tuple
+                (3232235776, 24)
     '''
 
-    # match pattern for cidr notation, ex. 192.168.1.0/24
-    cidr = re.compile(r'((([0-9]){1,3}(\.)*){4})/([0-9]{1,2})')
-    # match pattern for address mask notation, ex. 192.168.1.0 255.255.255.0
-    addrMask = re.compile(r'((([0-9]){1,3}(\.)*){4}) ((([0-9]){1,3}(\.)*){4})')
-    # match pattern for hex network address and mask notation, ex. 0xC0A80100 0xFFFFFF00
-    hexAddrMask = re.compile(r'(0x)(([0-9A-Fa-f]){8}) (0x)(([0-9A-Fa-f]){8})')
-    
     # convert arg to single string object
     if len(args) == 2:
         args = args[0] + ' ' + args[1]
     else:
         args = args[0]
-    # identify which notation was used 
-    if cidr.match(args):
-        result = cidr.match(args)
-        return {'addr' : result.group(1), 'mask' : IPv4Utils._cidrMask2DotDec(result.group(5))}
-    if addrMask.match(args):
-        result = addrMask.match(args)
-        return {'addr' : result.group(1), 'mask' : result.group(5)}
-    if hexAddrMask.match(args):
-        result = hexAddrMask.match(args)
-        return {'addr' : IPv4Utils.hex2DotDec(result.group(2)), 'mask' : IPv4Utils.hex2DotDec(result.group(5))}
 
+    if args[1:2] in ('x', 'X'):
+        result = _hexNotation.match(args)
+        if result is None:
+            raise ValueError('Invalid IPv4 IP address and/or Mask')
+        (addr, mask) = result.groups()
+        addr = int(addr, 16)
+        mask = 0xFFFFFFFF if mask is None else int(mask, 16)
+    else:
+        result = _dotDecNotation.match(args)
+        if result is None:
+            raise ValueError('Invalid IPv4 IP address and/or Mask')
+        (a, b, c, d, maskLen, e, f, g, h) = result.groups()
+        (a, b, c, d) = (int(a), int(b), int(c), int(d))
+        addr = (a << 24) | (b << 16) | (c << 8) | d
+        if (a | b | c | d) >> 8:
+            raise ValueError('Invalid IPv4 IP address and/or Mask')
+        if maskLen is not None:
+            maskLen = int(maskLen)
+            if maskLen > 32:
+                raise ValueError('Invalid IPv4 IP address and/or Mask')
+            return (addr, maskLen)
+        if e is None:
+            return (addr, 32)
+        (e, f, g, h) = (int(e), int(f), int(g), int(h))
+        mask = (e << 24) | (f << 16) | (g << 8) | h
+        if (e | f | g | h) >> 8:
+            raise ValueError('Invalid IPv4 IP address and/or Mask')
+
+    maskLen = _ipv4MaskLens.get(mask)
+    if maskLen is None:
+        raise ValueError('Invalid IPv4 IP address and/or Mask')
+    return (addr, maskLen)
+
+def _parseAddr(prefix):
+    '''
+    Parses a single IPv4 address, without a mask, and returns it as an unsigned int.
+    Unlike IPv4Utils.addr2Int() a string must be in dotted decimal or 0x prefixed
+    hexadecimal notation, so words such as 'cafe' are rejected rather than read as hex.
+
+    Args:
+        prefix: 3232235777, '192.168.1.1' or '0xC0A80101'
+    Returns:
+        The address as an unsigned int
+    '''
+    if isinstance(prefix, _intTypes):
+        return IPv4Utils.addr2Int(prefix)
+    if '/' in prefix or len(prefix.split()) != 1:
+        raise ValueError('%s is not a valid IPv4 address' % prefix)
+    return _parseNotation(prefix)[0]
+
+
+def _parseNotation6(addr, mask=None):
+    '''
+    Parses an IPv6 address with an optional prefix length and returns the address and
+    prefix length as integers. An address without a prefix length is treated as a /128.
 
+    Args:
+        addr: '2001:db8::', '2001:db8::/32'
+        mask: (optional) the prefix length as an int or string; 32, '32' or '/32'
+    Returns:
+        The address as an unsigned int and the prefix length as a tuple
+        (42540765935913617771317959390390353920, 32)
+    '''
+    if mask is None:
+        (addr, slash, mask) = addr.partition('/')
+        if not slash:
+            mask = 128
+    try:
+        maskLen = int(str(mask).lstrip('/'))
+    except ValueError:
+        raise ValueError('Invalid IPv6 IP address and/or Mask')
+    if not 0 <= maskLen <= 128:
+        raise ValueError('Invalid IPv6 IP address and/or Mask')
+    return (IPv6Utils.colonHex2Int(addr), maskLen)
 
 def _validateArgs(kwargs):
     '''
     Parses arguments in ipv4Addr() and validates the number of arguments, keywords used 
-    are valid, extracts the arguments and verifies that the entries are dotted decimal or
-    hexidecimal. Calls _parseNotation() to validate the address and mask.
+    are valid and the address family is supported. Calls _parseNotation() to parse the
+    address and mask, and verifies the first octet of the address and the mask are not 0.
+    IPv6 arguments, picked by af_family='ipv6' or a ':' in the address, are parsed
+    by _parseNotation6() instead.
 
     Args:
         kwargs: addr='192.168.1.0', mask='255.255.255.0', af_family='ipv4'
+                addr='2001:db8::/32'
     returns 
-        A tuple containing the address, mask and af_family
-        ('192.168.1.0', '255.255.255.0', 'ipv4')
+        A tuple containing the address as an unsigned int, mask length and af_family
+        (3232235776, 24, 'ipv4')
     '''
-    
-    supportedAF = re.compile(r'ipv4')
-
-    # validate that correct keywords have been used
-
-    validArgs = ['addr', 'mask', 'af_family']
 
     # parse arguments
-    if 1 <= len(kwargs) <= 3:
-        for keyword in kwargs.keys():
-            if keyword not in validArgs:
-                raise ValueError, 'only keywords: addr, mask, af_family supported in ipvAddr()'
-
-        if len(kwargs) == 3:
-            # test to make sure address family is supported
-            if not supportedAF.match(kwargs['af_family']):
-                raise ValueError, '%s is not a supported address family' % af_family
-            # Parse args and format to dotted decimal entry for both address and mask
-            network = _parseNotation(kwargs['addr'].lower(), kwargs['mask'].lower())
-            addr = network['addr']
-            mask = network['mask']
-            af_family = kwargs['af_family'].lower()
-            
-            # make sure that both address and mask are valid dotted decimal entries
-            if not (IPv4Utils.isDotDec(addr) & (IPv4Utils.isDotDec(mask))):
-                raise ValueError, 'Invalid IPv4 IP address and/or Mask'
-            return (addr, mask, af_family)
-
-        if len(kwargs) == 2:
-            # set address family to IPv4 and assume that two arguments are address and mask
-            af_family = 'ipv4'
-            # parse args notation
-            network = _parseNotation(kwargs['addr'].lower(), kwargs['mask'].lower())
-            addr = network['addr']
-            mask = network['mask']
-            # make sure that both address and mask are valid dotted decimal entries
-            if not (IPv4Utils.isDotDec(addr) & (IPv4Utils.isDotDec(mask))):
-                raise ValueError, 'Invalid IPv4 IP address and/or Mask'
-            return (addr, mask, af_family)
-
-        if len(kwargs) == 1:
-            # set address family to IPv4 and assume that cidr notation is being used
-            af_family = 'ipv4'
-            # parse args notation
-            network = _parseNotation(kwargs['addr'].lower())
-            addr = network['addr']
-            mask = network['mask']
-            if not (IPv4Utils.isDotDec(addr) & (IPv4Utils.isDotDec(mask))):
-                raise ValueError, 'Invalid IPv4 IP address and/or Mask'
-            return (addr, mask, af_family)
+    if not 1 <= len(kwargs) <= 3 or kwargs.get('addr') is None:
+        raise ValueError('A valid IP network address and mask must be specified ex. ipaddr.ipv4Addr(addr="192.168.1.0", mask="255.255.255.0")')
+    _checkKeywords(kwargs)
+
+    # test to make sure address family is supported
+    af_family = kwargs.get('af_family')
+    if af_family is None:
+        af_family = 'ipv6' if ':' in str(kwargs['addr']) else 'ipv4'
     else:
-        raise ValueError, 'A valid IP network address and mask must be specified ex. ipaddr.ipv4Addr(addr="192.168.1.0", mask="255.255.255.0")'
+        af_family = af_family.lower()
+        if af_family not in _supportedAF:
+            raise ValueError('%s is not a supported address family' % kwargs['af_family'])
+
+    if af_family == 'ipv6':
+        (addr, maskLen) = _parseNotation6(kwargs['addr'], kwargs.get('mask'))
+        if maskLen < AddressSpace._minNetMaskLen:
+            raise ValueError('Invalid IPv6 IP address and/or Mask')
+        return (addr, maskLen, af_family)
+
+    # Parse args; cidr notation is assumed when no mask is given
+    if kwargs.get('mask') is None:
+        (addr, maskLen) = _parseNotation(kwargs['addr'])
+    else:
+        (addr, maskLen) = _parseNotation(kwargs['addr'], kwargs['mask'])
+
+    # make sure that neither the address nor mask start with a 0 octet
+    if not addr >> 24 or maskLen < AddressSpace._minNetMaskLen:
+        raise ValueError('Invalid IPv4 IP address and/or Mask')
+    return (addr, maskLen, af_family)
+
+
+class ParseCache(object):
+
+    '''
+    Size bounded least recently used cache of parsed ipv4Addr() arguments. The
+    parsed results are immutable tuples so a hit skips _validateArgs() entirely.
+    A maxSize of 0 disables the cache.
+    '''
+
+    def __init__(self, maxSize=4096):
+        # entries are kept in a circular doubly linked list of [prev, next, key, value]
+        # links; the root link's next is the least recently used entry and its prev
+        # the most recently used
+        self._lock = threading.Lock()
+        self._maxSize = maxSize
+        self._reset()
+
+    def _reset(self):
+        # callers other than __init__ must hold self._lock
+        self._links = {}
+        self._root = root = []
+        root[:] = [root, root, None, None]
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        ''' return the cached value for key, or None if it is not cached '''
+        with self._lock:
+            link = self._links.get(key)
+            if link is None:
+                self.misses += 1
+                return None
+            # unlink and move to the most recently used end of the list
+            (prevLink, nextLink) = link[0:2]
+            prevLink[1] = nextLink
+            nextLink[0] = prevLink
+            root = self._root
+            last = root[0]
+            last[1] = root[0] = link
+            link[0] = last
+            link[1] = root
+            self.hits += 1
+            return link[3]
+
+    def put(self, key, value):
+        ''' cache value under key, evicting the least recently used entry when full '''
+        with self._lock:
+            if self._maxSize <= 0 or key in self._links:
+                return
+            root = self._root
+            if len(self._links) >= self._maxSize:
+                oldest = root[1]
+                root[1] = oldest[1]
+                oldest[1][0] = root
+                del self._links[oldest[2]]
+            last = root[0]
+            link = [last, root, key, value]
+            last[1] = root[0] = self._links[key] = link
+
+    def clear(self):
+        ''' remove all entries and reset the hit/miss counters '''
+        with self._lock:
+            self._reset()
+
+    def resize(self, maxSize):
+        ''' change the maximum number of entries; clears the cache '''
+        with self._lock:
+            self._maxSize = maxSize
+            self._reset()
+
+    def __len__(self):
+        return len(self._links)
+
+    @property
+    def maxSize(self):
+        ''' the maximum number of entries held '''
+        return self._maxSize
+
+    def info(self):
+        ''' return the cache statistics as a dictionary '''
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._links), 'maxSize': self._maxSize}
+
+def _checkKeywords(kwargs):
+    ''' validate that correct keywords have been used '''
+    for keyword in kwargs:
+        if keyword not in _validArgs:
+            raise ValueError('only keywords: addr, mask, af_family supported in ipvAddr()')
 
+# cache used by ipv4Addr(); ipaddr.parseCache.resize(0) turns it off
+parseCache = ParseCache()
 
 def ipv4Addr(**kwargs):
     ''' 
     Factory function that accepts multiple IPv4 address/mask formats. Calls _validateArgs(), if the inputs
-    are valid; return class object initialized with the arguments given.
+    are valid; return class object initialized with the arguments given. The parsed arguments
+    are kept in parseCache so repeated calls with the same notation skip parsing.
 
     Args:
         addr: An IPv4 Network address; addr='192.168.1.0'
         mask: An IPv4 Network Mask; mask='255.255.255.0'
-        af_family: (optional) keyword designating the address space; currently only supports 'ipv4'
+        af_family: (optional) keyword designating the address space; 'ipv4' or 'ipv6'. An
+                    address holding a ':' is taken as IPv6 when it is not given
                     af_family='ipv4'
     Returns:
-        A Class Object initialized with the addr, mask and af_family. Calls AddressSpace()
+        A Class Object initialized with the addr, mask and af_family. Calls AddressSpace(),
+        or AddressSpace6() for IPv6
      '''
 
-    (addr, mask, af_family) = _validateArgs(kwargs)
-    return AddressSpace(addr, mask, af_family)
+    # unknown keywords are rejected before the lookup so they can never hit the cache
+    _checkKeywords(kwargs)
+    key = (kwargs.get('addr'), kwargs.get('mask'), kwargs.get('af_family'))
+    network = parseCache.get(key)
+    if network is None:
+        network = _validateArgs(kwargs)
+        parseCache.put(key, network)
+    (addr, maskLen, af_family) = network
+    if af_family == 'ipv6':
+        return AddressSpace6.fromInt(addr, maskLen, af_family)
+    return AddressSpace.fromInt(addr, maskLen, af_family)
     
+class InternTable(object):
+
+    '''
+    Weak table of shared AddressSpace() objects; asking for a network equal to one
+    that is still referenced elsewhere returns that same object, so repeated
+    prefixes cost one object, share their computed properties and compare by
+    identity in dictionary lookups. Entries vanish once the last outside reference
+    to a network is dropped.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._networks = weakref.WeakValueDictionary()
+
+    def intern(self, network):
+        ''' return the shared object equal to network, making network the shared object
+        if there is none '''
+        key = (network._addr, network._maskLen, network._maxNetMaskLen)
+        with self._lock:
+            shared = self._networks.get(key)
+            if shared is None:
+                self._networks[key] = shared = network
+            return shared
+
+    def fromInt(self, netAddr, maskLen, AF_Family='IPv4'):
+        ''' the shared AddressSpace.fromInt() object; AF_Family picks the class in any case '''
+        spaceClass = AddressSpace6 if AF_Family.lower() == 'ipv6' else AddressSpace
+        with self._lock:
+            shared = self._networks.get((netAddr, maskLen, spaceClass._maxNetMaskLen))
+        if shared is not None:
+            return shared
+        return self.intern(spaceClass.fromInt(netAddr, maskLen, AF_Family))
+
+    def clear(self):
+        ''' forget every shared object '''
+        with self._lock:
+            self._networks.clear()
+
+    def __len__(self):
+        return len(self._networks)
+
+    def __contains__(self, network):
+        return (network._addr, network._maskLen, network._maxNetMaskLen) in self._networks
+
+# table used by ipv4Intern()
+internTable = InternTable()
+
+def ipv4Intern(**kwargs):
+    '''
+    Same as ipv4Addr() but returns the shared object from internTable, so every
+    call for the same network returns the same AddressSpace() object while it is in use.
+
+    ipv4Intern(addr='10.0.0.0/8') is ipv4Intern(addr='10.0.0.0', mask='255.0.0.0')
+    > True
+    '''
+    network = ipv4Addr(**kwargs)
+    return internTable.intern(network)
+
+def _requireIPv4(network, caller):
+    ''' raise ValueError when an IPv4 only class or function is given an IPv6 network '''
+    if network._maxNetMaskLen != 32:
+        raise ValueError('%s supports IPv4 networks only' % caller)
+
+def _requireNumpy(caller):
+    ''' raise ImportError when a bulk function is called without numpy installed '''
+    if numpy is None:
+        raise ImportError('%s() requires numpy' % caller)
+
+def parseMany(values):
+    '''
+    Parse a sequence of IPv4 address strings in bulk. Every notation accepted by
+    _parseNotation() is supported, plus a plain address which is treated as a /32.
+    The strings are laid out as a matrix of characters and parsed with numpy array
+    operations, so no per-string work is done by the interpreter. Requires numpy.
+
+    Args:
+        values: a list or numpy array of strings
+                ['192.168.1.0/24', '10.1.1.1', '192.168.2.0 255.255.255.0', '0xC0A80100 0xFFFFFF00']
+    Returns:
+        A tuple of three parallel numpy arrays; the uint32 addresses, the uint8 mask
+        lengths and a bool array marking the rows that parsed. Rows that failed to
+        parse hold 0 in both the address and mask length arrays.
+    '''
+    _requireNumpy('parseMany')
+
+    strings = numpy.asarray(values).ravel()
+    if strings.dtype.kind != 'S':
+        strings = strings.astype('S')
+    count, width = len(strings), max(strings.dtype.itemsize, 1)
+    # one byte per character followed by at least one NUL column, and wide enough
+    # for the longest hex notation; '0xFFFFFFFF 0xFFFFFFFF'
+    chars = numpy.zeros((count, max(width, 21) + 1), dtype=numpy.uint8)
+    chars[:, :width] = strings.view(numpy.uint8).reshape(count, width)
+
+    digit = (chars >= 48) & (chars <= 57)
+    dot = chars == 46
+    slash = chars == 47
+    space = chars == 32
+    nul = chars == 0
+    sep = dot | slash | space
+    # the digit mask shifted so each cell can see the characters either side of it
+    digitBefore = numpy.zeros_like(digit)
+    digitBefore[:, 1:] = digit[:, :-1]
+    digitAfter = numpy.zeros_like(digit)
+    digitAfter[:, :-1] = digit[:, 1:]
+    # number of separators up to and including each cell, which is also the field
+    # each digit belongs to; fields 0 - 3 are the address octets, field 4 is the
+    # cidr mask length or fields 4 - 7 are the mask octets. int8 counts would wrap on
+    # rows of 128 or more characters, so those are counted in int32
+    fieldIndex = sep.cumsum(axis=1, dtype=numpy.int8 if chars.shape[1] < 128 else numpy.int32)
+
+    # only digits and separators before the terminating NUL, each separator sits
+    # between two digits, no run of digits is longer than 3 and a '/' or ' ' is
+    # only allowed as the 4th separator, right after the address
+    invalid = ~(digit | sep | nul)
+    invalid[:, :-1] |= nul[:, :-1] & ~nul[:, 1:]
+    invalid |= sep & ~(digitBefore & digitAfter)
+    invalid[:, 3:] |= digit[:, 3:] & digitBefore[:, 3:] & digitBefore[:, 2:-1] & digitBefore[:, 1:-2]
+    invalid |= (slash | space) & (fieldIndex != 4)
+    valid = digit[:, 0] & ~invalid.any(axis=1)
+
+    separators = fieldIndex[:, -1]
+    notation = (slash.view(numpy.uint8) | (space.view(numpy.uint8) << 1)).max(axis=1)
+    plain = (separators == 3) & (notation == 0)
+    cidr = (separators == 4) & (notation == 1)
+    addrMask = (separators == 7) & (notation == 2)
+    valid &= plain | cidr | addrMask
+
+    # the value of each field is read at its last digit, from at most 3 digits
+    columns = chars.shape[1]
+    flatChars = chars.ravel().astype(numpy.uint32) - 48
+    flatDigitBefore = digitBefore.ravel()
+    lastDigits = numpy.flatnonzero(digit & ~digitAfter)
+    tens = flatDigitBefore[lastDigits]
+    hundreds = tens & flatDigitBefore[lastDigits - tens]
+    fieldValues = flatChars[lastDigits] + (flatChars[lastDigits - 1] * 10 * tens) + \
+        (flatChars[lastDigits - 2] * 100 * hundreds)
+    fields = numpy.zeros((count, 9), dtype=numpy.uint32)
+    fields[lastDigits // columns, fieldIndex.ravel()[lastDigits].clip(0, 8)] = fieldValues
+
+    valid &= (fields[:, :4] <= 255).all(axis=1)
+    valid &= ~cidr | (fields[:, 4] <= 32)
+    valid &= ~addrMask | (fields[:, 4:8] <= 255).all(axis=1)
+    addrs = (fields[:, 0] << 24) | (fields[:, 1] << 16) | (fields[:, 2] << 8) | fields[:, 3]
+    masks = (fields[:, 4] << 24) | (fields[:, 5] << 16) | (fields[:, 6] << 8) | fields[:, 7]
+    maskLens = numpy.where(cidr, fields[:, 4], 32)
+    notation = numpy.where(addrMask, 2, 0)
+
+    # hexidecimal notation; '0xC0A80100' or '0xC0A80100 0xFFFFFF00'
+    isHex = (chars[:, 0] == 48) & ((chars[:, 1] | 32) == 120)
+    if isHex.any():
+        hexRows = numpy.flatnonzero(isHex)
+        hexChars = chars[hexRows, :22]
+        hexValues = numpy.full(256, -1, dtype=numpy.int8)
+        for character in '0123456789abcdef':
+            hexValues[ord(character)] = hexValues[ord(character.upper())] = int(character, 16)
+        hexDigits = hexValues[hexChars]
+        hexAddr = (hexDigits[:, 2:10] >= 0).all(axis=1)
+        hexAddrMask = hexAddr & (hexChars[:, 10] == 32) & (hexChars[:, 11] == 48) & \
+            ((hexChars[:, 12] | 32) == 120) & (hexDigits[:, 13:21] >= 0).all(axis=1) & (hexChars[:, 21] == 0)
+        hexAddrs = numpy.zeros(len(hexRows), dtype=numpy.uint32)
+        hexMasks = numpy.zeros(len(hexRows), dtype=numpy.uint32)
+        for position in range(8):
+            hexAddrs = (hexAddrs << 4) | (hexDigits[:, 2 + position] & 15).astype(numpy.uint32)
+            hexMasks = (hexMasks << 4) | (hexDigits[:, 13 + position] & 15).astype(numpy.uint32)
+        addrs[hexRows] = hexAddrs
+        masks[hexRows] = hexMasks
+        notation[hexRows] = numpy.where(hexAddrMask, 2, 0)
+        maskLens[hexRows] = 32
+        valid[hexRows] = (hexAddr & (hexChars[:, 10] == 0)) | hexAddrMask
+
+    # masks convert to their length by position in the sorted mask table; a
+    # non-contiguous mask is not found in the table
+    table = numpy.array(_ipv4Masks, dtype=numpy.uint32)
+    maskIndex = numpy.searchsorted(table, masks).clip(0, 32)
+    isMask = notation == 2
+    valid &= ~isMask | (table[maskIndex] == masks)
+    maskLens = numpy.where(isMask, maskIndex, maskLens)
+
+    addrs = numpy.where(valid, addrs, 0).astype(numpy.uint32)
+    maskLens = numpy.where(valid, maskLens, 0).astype(numpy.uint8)
+    return (addrs, maskLens, valid)
+
+def containsMatrix(prefixes, networks):
+    '''
+    Test N addresses against M AddressSpace() networks at once, with the same
+    membership rule as AddressSpace.inNetwork(). The work is done in blocks of
+    addresses so the temporary arrays stay small. Requires numpy.
+
+    Args:
+        prefixes: a sequence or numpy array of N unsigned int addresses
+        networks: a sequence of M AddressSpace() objects
+    Returns:
+        An N x M numpy bool array; [i, j] is True when address i is part of network j
+    '''
+    _requireNumpy('containsMatrix')
+    prefixes = numpy.asarray(prefixes, dtype=numpy.uint32).ravel()
+    masks = numpy.array([_ipv4Masks[network._maskLen] for network in networks], dtype=numpy.uint32)
+    addrs = numpy.array([network._addr for network in networks], dtype=numpy.uint32) & masks
+    result = numpy.empty((len(prefixes), len(networks)), dtype=bool)
+    block = max(1, (1 << 20) // max(1, len(networks)))
+    for start in range(0, len(prefixes), block):
+        rows = prefixes[start:start + block, numpy.newaxis]
+        result[start:start + block] = (rows & masks) == addrs
+    return result
+
+def _sortKeyOf(prefix):
+    ''' the (network address, mask length) sort key of an AddressSpace(), an unsigned
+    int address or an address or notation string '''
+    if isinstance(prefix, AddressSpace):
+        _requireIPv4(prefix, 'sortMany()')
+        return (prefix._addr & _ipv4Masks[prefix._maskLen], prefix._maskLen)
+    if isinstance(prefix, _intTypes):
+        if not 0 <= prefix <= 0xFFFFFFFF:
+            raise ValueError('%s is not a valid IPv4 address' % prefix)
+        return (prefix, 32)
+    (addr, maskLen) = _parseNotation(prefix)
+    return (addr & _ipv4Masks[maskLen], maskLen)
+
+def sortMany(prefixes):
+    '''
+    Sort addresses and networks by network address and then mask length, parsing every
+    item once with _parseNotation(), so the same items are accepted with and without
+    numpy. With numpy the keys are ordered in a single int64 array sort; without it by
+    one keyed sort. Items with equal keys keep their order.
+
+    Args:
+        prefixes: a sequence of AddressSpace() objects, unsigned int addresses or
+                  strings in any notation _parseNotation() accepts, mixed freely; a
+                  plain address sorts as a /32
+    Returns:
+        A new list of the items in sorted order
+    '''
+    prefixes = list(prefixes)
+    if numpy is None or not prefixes:
+        keys = [_sortKeyOf(prefix) for prefix in prefixes]
+        return [prefixes[i] for i in sorted(_range(len(prefixes)), key=keys.__getitem__)]
+
+    types = set(map(type, prefixes))
+    if types.issubset(_intTypes):
+        networks = numpy.array(prefixes, dtype=numpy.int64)
+        if networks.min() < 0 or networks.max() > 0xFFFFFFFF:
+            raise ValueError('Invalid IPv4 address in sortMany()')
+        maskLens = numpy.zeros(1, dtype=numpy.int64)
+    else:
+        keys = [_sortKeyOf(prefix) for prefix in prefixes]
+        networks = numpy.fromiter((key[0] for key in keys), dtype=numpy.int64, count=len(keys))
+        maskLens = numpy.fromiter((key[1] for key in keys), dtype=numpy.int64, count=len(keys))
+
+    count = len(prefixes)
+    keys = networks
+    keyBits = 32
+    if maskLens.min() != maskLens.max():
+        keys = (networks << 6) | maskLens
+        keyBits = 38
+    indexBits = count.bit_length()
+    if keyBits + indexBits <= 63:
+        # the item index packed below the key keeps equal keys in their original
+        # order, so one unstable in place sort of int64 values does the job
+        packed = (keys << indexBits) | numpy.arange(count, dtype=numpy.int64)
+        packed.sort()
+        order = packed & ((1 << indexBits) - 1)
+    else:
+        order = numpy.argsort(keys, kind='mergesort')
+    if types.issubset((str,) + _intTypes):
+        # gathering through an object array avoids an interpreted loop over the items
+        return numpy.array(prefixes, dtype=object)[order].tolist()
+    return [prefixes[i] for i in order.tolist()]
+
 # Mixin class
 
-class IPv4Utils():
+class IPv4Utils(object):
 
     '''collection of staticmethod utilities for managing IPv4 addresses'''
 
+    __slots__ = ()
+
     @staticmethod
     def isHexStr(prefix):
         ''' 
@@ -352,21 +834,9 @@ class IPv4Utils():
             Returns:
                 A bitstring representation of the integer as a string; '10000000'
             '''
-            bits = []
-            bitPositionValues = [128, 64, 32, 16, 8, 4, 2, 1]
-
             assert 0 <= octet <= 255
 
-            if octet == 0:
-                    return '00000000'
-            else:
-                    for value in bitPositionValues:
-                            if octet / value:
-                                    bits.append(str(1))
-                                    octet -= value
-                            else:
-                                    bits.append(str(0))
-                    return ''.join(bits)
+            return format(octet, '08b')
 
 
     @staticmethod
@@ -463,40 +933,23 @@ class IPv4Utils():
         ''' Given an IPv4 address as an unsigned int representation, convert it to dotted 
         decimal format.'''
 
-        assert type(prefix) == int
-        binary = bin(prefix)
-        # strip off the leading 0b 
-        if binary[0:2] == '0b':
-            binary = binary[2:]
-        # binary conversion drops leading zeros, we need to add them back
-        if len(binary) < 32:
-            padding = 32 - len(binary)
-            binary = ('0' * padding) + binary 
-        # convert to decimal 
-        addr = IPv4Utils._bin2Dec(binary)
-        return '.'.join(addr)
+        assert 0 <= prefix <= 0xFFFFFFFF
+        return '%d.%d.%d.%d' % (prefix >> 24, (prefix >> 16) & 255, (prefix >> 8) & 255, prefix & 255)
 
     @staticmethod
     def _cidrMask2DotDec(mask):
         '''Given a mask length as an int, convert to the dotted decimal representation'''
-        tmpMask = '1' * int(mask)
-        padding = 32 - int(mask) 
-        result = tmpMask + ('0' * padding)
-        # convert to dotted decimal
-        result = IPv4Utils._bin2Dec(result)
-        result = '.'.join(result)
-        return result
+        return IPv4Utils.int2DotDec(_ipv4Masks[int(mask)])
 
     @staticmethod
     def dotDec2Int(prefix):
         ''' Given an IPv4 inverse address mask, convert it to an unsigned int '''
 
-        bitstring = ''
-        for octet in prefix.split('.'):
-            octet = int(octet)
-            bits = IPv4Utils._dec2Bin(octet)
-            bitstring += bits
-        return int(bitstring, 2) 
+        a, b, c, d = [int(octet) for octet in prefix.split('.')]
+        # any octet outside 0 - 255 leaves bits set above the low 8
+        if (a | b | c | d) >> 8:
+            raise ValueError('%s is not a valid dotted decimal address' % prefix)
+        return (a << 24) | (b << 16) | (c << 8) | d
 
     @staticmethod
     def convertAddr(prefix):
@@ -511,6 +964,53 @@ class IPv4Utils():
                     return prefix
 
     
+    @staticmethod
+    def addr2Int(prefix):
+            ''' Given an ipv4 address as an unsigned int or in hexidecimal, dotted decimal
+            or binary string format, convert it to an unsigned int.
+
+            addr2Int('0xc0a80101')
+            > 3232235777
+            '''
+
+            if isinstance(prefix, _intTypes):
+                    addr = prefix
+            elif '.' in prefix:
+                    return IPv4Utils.dotDec2Int(prefix)
+            elif prefix[0:2].lower() == '0b' or len(prefix) == 32:
+                    addr = int(prefix, 2)
+            else:
+                    addr = int(prefix, 16)
+            if not 0 <= addr <= 0xFFFFFFFF:
+                    raise ValueError('%s is not a valid IPv4 address' % (prefix,))
+            return addr
+
+    @staticmethod
+    def classifyAddr(prefix):
+            ''' Given an ipv4 address as an unsigned int or in hexidecimal, dotted decimal
+            or binary string format, return the special purpose category the address
+            belongs to; one of the ADDR_* category codes. The address is located with
+            a single binary search of the sorted special purpose range table.
+
+            classifyAddr('172.20.1.1')
+            > ADDR_PRIVATE
+            '''
+
+            return _specialCodes[bisect.bisect_right(_specialStarts, IPv4Utils.addr2Int(prefix)) - 1]
+
+    @staticmethod
+    def classifyMany(prefixes):
+            ''' Given a sequence or numpy array of unsigned int addresses, such as the
+            address array returned by parseMany(), return a numpy uint8 array with the
+            ADDR_* category code of each address. Requires numpy.
+            '''
+
+            _requireNumpy('classifyMany')
+            starts = numpy.array(_specialStarts, dtype=numpy.int64)
+            codes = numpy.array(_specialCodes, dtype=numpy.uint8)
+            prefixes = numpy.asarray(prefixes, dtype=numpy.int64)
+            return codes[numpy.searchsorted(starts, prefixes, side='right') - 1]
+
     @staticmethod        
     def isLoopback(prefix):
             ''' Given an ipv4 address return True if the address is part of the
@@ -525,16 +1025,7 @@ class IPv4Utils():
             0000000000000001')
             > True
             '''
-            prefix = IPv4Utils.convertAddr(prefix)
-
-            # Loopback space is any 127.0.0.0 address
-            loopback = IPv4Utils._dec2Bin(127)
-
-            if prefix[0:8] == loopback:
-                    return True
-            else:
-                    return False
-            
+            return IPv4Utils.classifyAddr(prefix) == ADDR_LOOPBACK
 
     @staticmethod
     def isMcast(prefix):
@@ -542,38 +1033,15 @@ class IPv4Utils():
             test to see if the first octet falls in the multicast address range 224 - 239;
             return True/False.
             '''
-
-            prefix = IPv4Utils.convertAddr(prefix)
-
-            firstOctet = prefix[0:8]
-            if int(firstOctet, 2) in range(224, 240):
-                    return True
-            else:
-                    return False
-
+            return IPv4Utils.classifyAddr(prefix) == ADDR_MULTICAST
 
     @staticmethod
     def isPrivateAddr(prefix):
             ''' Given an ipv4 address in hexidecimal, dotted decimal or binary string format,
             test to see if the first octet falls in any of the RFC1918 address space.
-            192.168.0.0/16, 172.16.0.0 - 172.16.31.0/12 or 10.0.0.0/8.
+            192.168.0.0/16, 172.16.0.0 - 172.31.255.255/12 or 10.0.0.0/8.
             '''
-
-            prefix = IPv4Utils.convertAddr(prefix)
-
-            # test for 10.0.0.0/8
-            if int(prefix[0:8], 2) == 10:
-                    return True
-
-            # test for 172.16.0.0 - 172.16.31.0/12
-            if (int(prefix[0:8], 2) == 172) & (int(prefix[8:16], 2) == 16) & (int(prefix[16:24], 2) in range(0, 17)):
-                    return True
-
-            # test for 192.168.0.0/16
-            if (int(prefix[0:8], 2) == 192) & (int(prefix[8:16], 2) == 168):
-                    return True
-
-            return False
+            return IPv4Utils.classifyAddr(prefix) == ADDR_PRIVATE
 
     @staticmethod
     def isBogonAddr(prefix):
@@ -597,7 +1065,7 @@ class IPv4Utils():
 
             Retrun True/False
             '''
-            pass
+            return IPv4Utils.classifyAddr(prefix) != ADDR_PUBLIC
 
     @staticmethod
     def printDotDec(prefix):
@@ -610,22 +1078,367 @@ class IPv4Utils():
             addr = IPv4Utils._bin2Dec(prefix)
             return '.'.join(addr)
 
+# special purpose (bogon) address ranges and their categories
+_specialRanges = [
+    ('0.0.0.0/8', ADDR_THIS_NETWORK),
+    ('10.0.0.0/8', ADDR_PRIVATE),
+    ('100.64.0.0/10', ADDR_CGNAT),
+    ('127.0.0.0/8', ADDR_LOOPBACK),
+    ('169.254.0.0/16', ADDR_LINK_LOCAL),
+    ('172.16.0.0/12', ADDR_PRIVATE),
+    ('192.0.0.0/24', ADDR_IETF_PROTOCOL),
+    ('192.0.2.0/24', ADDR_DOCUMENTATION),
+    ('192.168.0.0/16', ADDR_PRIVATE),
+    ('198.18.0.0/15', ADDR_BENCHMARKING),
+    ('198.51.100.0/24', ADDR_DOCUMENTATION),
+    ('203.0.113.0/24', ADDR_DOCUMENTATION),
+    ('224.0.0.0/4', ADDR_MULTICAST),
+    ('240.0.0.0/4', ADDR_RESERVED),
+]
+
+def _buildSpecialTable(ranges):
+    ''' flatten the special purpose ranges into sorted range starts and the category
+    code of each range, filling the gaps between them with ADDR_PUBLIC '''
+    starts = [0]
+    codes = [ADDR_PUBLIC]
+    for (notation, code) in ranges:
+        (addr, maskLen) = _parseNotation(notation)
+        end = addr | (0xFFFFFFFF ^ _ipv4Masks[maskLen])
+        if starts[-1] == addr:
+            codes[-1] = code
+        else:
+            starts.append(addr)
+            codes.append(code)
+        if end < 0xFFFFFFFF:
+            starts.append(end + 1)
+            codes.append(ADDR_PUBLIC)
+    return (starts, codes)
+
+(_specialStarts, _specialCodes) = _buildSpecialTable(_specialRanges)
+
+
+# characters allowed in an IPv6 address; the embedded IPv4 form uses the dots
+_colonHexChars = re.compile(r'[0-9A-Fa-f:.]+$')
+
+class IPv6Utils(object):
+
+    '''
+    Conversions between 128 bit unsigned int IPv6 addresses and their colon separated
+    hexadecimal text form.
+    '''
+
+    __slots__ = ()
+
+    @staticmethod
+    def colonHex2Int(prefix):
+        ''' Given an IPv6 address in full, '::' compressed or embedded IPv4 notation,
+        convert it to an unsigned int.
+
+        colonHex2Int('2001:db8::1')
+        > 42540766411282592856903984951653826561
+        '''
+
+        if not _colonHexChars.match(prefix):
+            raise ValueError('%s is not a valid IPv6 address' % prefix)
+        if '.' in prefix:
+            # the last 32 bits written as dotted decimal; ::ffff:192.168.1.1
+            (head, colon, tail) = prefix.rpartition(':')
+            # leading zeros are rejected as they may mean octal to other parsers
+            if any(len(octet) > 1 and octet[0] == '0' for octet in tail.split('.')):
+                raise ValueError('%s is not a valid IPv6 address' % prefix)
+            v4 = IPv4Utils.dotDec2Int(tail)
+            prefix = '%s:%x:%x' % (head, v4 >> 16, v4 & 0xFFFF)
+        halves = prefix.split('::')
+        if len(halves) == 1:
+            groups = prefix.split(':')
+            if len(groups) != 8:
+                raise ValueError('%s is not a valid IPv6 address' % prefix)
+        elif len(halves) == 2:
+            head = halves[0].split(':') if halves[0] else []
+            tail = halves[1].split(':') if halves[1] else []
+            missing = 8 - len(head) - len(tail)
+            if missing < 1:
+                raise ValueError('%s is not a valid IPv6 address' % prefix)
+            groups = head + ['0'] * missing + tail
+        else:
+            raise ValueError('%s is not a valid IPv6 address' % prefix)
+        addr = 0
+        for group in groups:
+            if not 0 < len(group) <= 4 or '.' in group:
+                raise ValueError('%s is not a valid IPv6 address' % prefix)
+            addr = (addr << 16) | int(group, 16)
+        return addr
+
+    @staticmethod
+    def int2ColonHex(prefix):
+        ''' Given an IPv6 address as an unsigned int, convert it to the RFC 5952 text
+        form; lower case, no leading zeros and the longest run of two or more zero
+        groups, the first of equal runs, replaced by '::'.
+
+        int2ColonHex(42540766411282592856903984951653826561)
+        > '2001:db8::1'
+        '''
+
+        assert 0 <= prefix <= _ipv6All
+        groups = [(prefix >> shift) & 0xFFFF for shift in (112, 96, 80, 64, 48, 32, 16, 0)]
+        (bestStart, bestLen, runStart) = (0, 1, None)
+        for (i, group) in enumerate(groups):
+            if group:
+                runStart = None
+            else:
+                if runStart is None:
+                    runStart = i
+                if i - runStart + 1 > bestLen:
+                    (bestStart, bestLen) = (runStart, i - runStart + 1)
+        if bestLen < 2:
+            return '%x:%x:%x:%x:%x:%x:%x:%x' % tuple(groups)
+        return '%s::%s' % (':'.join(['%x' % group for group in groups[:bestStart]]),
+                           ':'.join(['%x' % group for group in groups[bestStart + bestLen:]]))
+
+    @staticmethod
+    def addr2Int(prefix):
+        ''' Given an IPv6 address as an unsigned int or in colon hexadecimal notation,
+        convert it to an unsigned int. '''
+
+        if isinstance(prefix, _intTypes):
+            return prefix
+        return IPv6Utils.colonHex2Int(prefix)
+
+
+class HostSequence(object):
+
+    '''
+    Read only sequence of host addresses in dotted decimal format, computed from a
+    first address, a step and a count. Nothing is stored per host; indexing and
+    slicing are arithmetic, and every iteration is a separate generator so one
+    sequence can be walked from several threads at once.
+    '''
+
+    __slots__ = ('_first', '_step', '_count')
+
+    def __init__(self, first, step, count):
+        self._first = first
+        self._step = step
+        self._count = max(0, count)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            (start, stop, step) = index.indices(self._count)
+            if step > 0:
+                count = (stop - start + step - 1) // step
+            else:
+                count = (start - stop - step - 1) // -step
+            return type(self)(self._first + start * self._step, self._step * step, count)
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('host index out of range')
+        return IPv4Utils.int2DotDec(self._first + index * self._step)
+
+    def __iter__(self):
+        int2DotDec = IPv4Utils.int2DotDec
+        (addr, step) = (self._first, self._step)
+        for index in _range(self._count):
+            yield int2DotDec(addr)
+            addr += step
+
+    def __reversed__(self):
+        int2DotDec = IPv4Utils.int2DotDec
+        step = self._step
+        addr = self._first + (self._count - 1) * step
+        for index in _range(self._count):
+            yield int2DotDec(addr)
+            addr -= step
+
+    def __contains__(self, prefix):
+        offset = IPv4Utils.addr2Int(prefix) - self._first
+        if not self._count:
+            return False
+        (index, remainder) = divmod(offset, self._step)
+        return not remainder and 0 <= index < self._count
+
+
+class HostSequence6(HostSequence):
+
+    '''
+    HostSequence() of IPv6 host addresses in colon hexadecimal format. The count may
+    be larger than a machine int, so len() only works for sequences of up to
+    sys.maxsize hosts; count holds the exact number.
+    '''
+
+    __slots__ = ()
+
+    @property
+    def count(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return HostSequence.__getitem__(self, index)
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('host index out of range')
+        return IPv6Utils.int2ColonHex(self._first + index * self._step)
+
+    def __iter__(self):
+        int2ColonHex = IPv6Utils.int2ColonHex
+        (addr, step) = (self._first, self._step)
+        last = addr + self._count * step
+        while addr != last:
+            yield int2ColonHex(addr)
+            addr += step
+
+    def __reversed__(self):
+        int2ColonHex = IPv6Utils.int2ColonHex
+        step = self._step
+        addr = self._first + (self._count - 1) * step
+        remaining = self._count
+        while remaining:
+            yield int2ColonHex(addr)
+            addr -= step
+            remaining -= 1
+
+    def __contains__(self, prefix):
+        offset = IPv6Utils.addr2Int(prefix) - self._first
+        if not self._count:
+            return False
+        (index, remainder) = divmod(offset, self._step)
+        return not remainder and 0 <= index < self._count
+
+
+class HostPermutation(object):
+
+    '''
+    Iterator over every host address of a network exactly once in a seeded
+    pseudorandom order, using O(1) memory. The k-th host is found directly from k:
+    host indexes are put through a keyed Feistel network on the smallest power of two
+    covering the host count, and values past the end are put through again (cycle
+    walking) until they fall inside it, which takes fewer than two passes on average.
+
+    position counts the hosts already returned, so an iterator can be saved as
+    (seed, shard, shards, position) and resumed later. With shards workers each
+    taking a different shard, worker shard visits positions shard, shard + shards,
+    ... of the same order, so together they cover every host once with no
+    coordination. len() gives the hosts left; for IPv6 networks with more than
+    sys.maxsize hosts use count - position.
+
+    for host in HostPermutation(ipv4Addr(addr='10.0.0.0/8'), seed=7, shard=2, shards=16):
+        probe(host)
+    '''
+
+    # Feistel rounds; four make the round functions a pseudorandom permutation
+    _rounds = 4
+
+    def __init__(self, network, seed=0, shard=0, shards=1, position=0):
+        if not 0 <= shard < shards:
+            raise ValueError('shard must be 0 to %d' % (shards - 1))
+        hosts = network.hosts
+        self._first = hosts._first
+        self._total = hosts._count
+        self._format = IPv4Utils.int2DotDec if network._maxNetMaskLen == 32 else IPv6Utils.int2ColonHex
+        self.seed = seed
+        self.shard = shard
+        self.shards = shards
+        # hosts in this shard
+        self.count = max(0, (self._total - shard + shards - 1) // shards)
+        if not 0 <= position <= self.count:
+            raise ValueError('position must be 0 to %d' % self.count)
+        self.position = position
+        # the split of the index bits alternates each round, so any width works
+        bits = max(2, (self._total - 1).bit_length())
+        rand = random.Random(seed)
+        self._roundKeys = []
+        for round in range(self._rounds):
+            highBits = bits // 2 if round % 2 == 0 else bits - bits // 2
+            self._roundKeys.append((rand.getrandbits(64) | 1, rand.getrandbits(64),
+                                    highBits, bits - highBits, 64 - highBits))
+
+    def _permute(self, index):
+        ''' the host number at an index of the full order '''
+        total = self._total
+        mask64 = 0xFFFFFFFFFFFFFFFF
+        while True:
+            for (multiplier, key, highBits, lowBits, shift) in self._roundKeys:
+                low = index & ((1 << lowBits) - 1)
+                index = (low << highBits) | ((index >> lowBits) ^ ((((low ^ key) * multiplier) & mask64) >> shift))
+            if index < total:
+                return index
+
+    def __getitem__(self, position):
+        ''' the host at a position of this shard '''
+        if position < 0:
+            position += self.count
+        if not 0 <= position < self.count:
+            raise IndexError('host position out of range')
+        return self._format(self._first + self._permute(self.shard + position * self.shards))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.position >= self.count:
+            raise StopIteration
+        host = self._format(self._first + self._permute(self.shard + self.position * self.shards))
+        self.position += 1
+        return host
+
+    next = __next__
+
+    def __len__(self):
+        return self.count - self.position
+
+
 class AddressSpace(IPv4Utils, object):
 
     version = '0.1'
     
     _minNetMaskLen = 1
     _maxNetMaskLen = 32
-    # create a dictionary of lists to track the subnet classes and subnet allocated
-    # mark off any tht would also not be available so overlap doesn't happen
-    #subnetsAllocated = {1: [], 2: []}
-    
+    # mask for every mask length of the address family
+    _masks = _ipv4Masks
+
+    # the address space is held as an integer address and mask length; every other
+    # property is derived from those two values the first time it is read and kept
+    # in its own slot so later reads are a plain attribute lookup. Nothing changes the
+    # address or mask length after construction, so the objects are immutable values
+    # that hash and compare on (address, mask length)
+    __slots__ = ('_AF_Family', '_addr', '_maskLen',
+                 '_networkAddress', '_networkMask', '_inverseMask', '_networkInverseMask',
+                 '_broadcastAddr', '_startHostAddr', '_endHostAddr', '_networkClass',
+                 '_hostRange', '__weakref__')
 
     def __init__(self,  netAddr, netMask, AF_Family='IPv4'):
+        maskLen = _ipv4MaskLens.get(IPv4Utils.dotDec2Int(netMask))
+        if maskLen is None:
+            raise ValueError('%s is not a valid IPv4 network mask' % netMask)
         self._AF_Family = AF_Family
-        self._netAddr = IPv4Utils.dotDecimalToBinStr(netAddr)
-        self._netMask = IPv4Utils.dotDecimalToBinStr(netMask)
-        self._hosts = int(self._netAddr, 2) + 1
+        self._addr = IPv4Utils.dotDec2Int(netAddr)
+        self._maskLen = maskLen
+
+    @classmethod
+    def fromInt(cls, netAddr, maskLen, AF_Family='IPv4'):
+        '''
+        Build an AddressSpace() object directly from an integer address and mask length,
+        skipping the dotted decimal parsing done in __init__()
+
+        Args:
+            netAddr: An IPv4 Network address as an unsigned int; 3232235776
+            maskLen: The network mask length as an int; 24
+            AF_Family: (optional) the address family; 'IPv4'
+        Returns:
+            An AddressSpace() object
+        '''
+        if not 0 <= maskLen <= cls._maxNetMaskLen:
+            raise ValueError('%s is not a valid IPv4 network mask length' % maskLen)
+        space = cls.__new__(cls)
+        space._AF_Family = AF_Family
+        space._addr = netAddr
+        space._maskLen = maskLen
+        return space
 
     # __str__(self):
     #     pass
@@ -637,26 +1450,31 @@ class AddressSpace(IPv4Utils, object):
     def networkAddress(self):
         '''Displays the network address in dotted decimal Format'''
 
-        return IPv4Utils.printDotDec(self._netAddr)
+        try:
+            return self._networkAddress
+        except AttributeError:
+            self._networkAddress = IPv4Utils.int2DotDec(self._addr)
+            return self._networkAddress
 
     @property 
     def networkMask(self):
         '''Displays the network mask in dotted decimal format'''
 
-        return IPv4Utils.printDotDec(self._netMask)
+        try:
+            return self._networkMask
+        except AttributeError:
+            self._networkMask = IPv4Utils.int2DotDec(_ipv4Masks[self._maskLen])
+            return self._networkMask
 
     @property 
     def inverseMask(self):
         '''Displays the inverse network mask in dotted decimal format'''
 
-        return IPv4Utils.printDotDec(self.networkInverseMask)
-
-    @property 
-    def addressFamily(self):
-        ''' Displays the address family of the network address '''
-
-        return self._AF_Family
-
+        try:
+            return self._inverseMask
+        except AttributeError:
+            self._inverseMask = IPv4Utils.int2DotDec(0xFFFFFFFF ^ _ipv4Masks[self._maskLen])
+            return self._inverseMask
 
     @property
     def allSubnetsAddr(self):
@@ -669,18 +1487,22 @@ class AddressSpace(IPv4Utils, object):
     def startHostAddr(self):
         '''Calculate and return the starting host IP address'''
 
-        addr = IPv4Utils.dotDec2Int(self.networkAddress)
-        addr += 1
-        return IPv4Utils.int2DotDec(addr)
+        try:
+            return self._startHostAddr
+        except AttributeError:
+            self._startHostAddr = IPv4Utils.int2DotDec(self._addr + 1)
+            return self._startHostAddr
 
     @property
     def endHostAddr(self):
         ''' Calculate the last host address in the IP range '''
 
-        baseAddr = IPv4Utils.dotDec2Int(self.networkAddress)
-        inverse = IPv4Utils.dotDec2Int(self.inverseMask)
-        endAddress = (baseAddr -1) + inverse
-        return IPv4Utils.int2DotDec(endAddress) 
+        try:
+            return self._endHostAddr
+        except AttributeError:
+            inverse = 0xFFFFFFFF ^ _ipv4Masks[self._maskLen]
+            self._endHostAddr = IPv4Utils.int2DotDec((self._addr - 1) + inverse)
+            return self._endHostAddr
 
     @property
     def networkClass(self):
@@ -694,18 +1516,21 @@ class AddressSpace(IPv4Utils, object):
         # class D = First Byte 11100000 - 11101111
         # class E = First Byte 11110000 - 11111111
 
-        if self._netAddr[0] == '0':
-            return 'Class A'
-        elif self._netAddr[0:2] == '10':
-            return 'Class B'
-        elif self._netAddr[0:3] == '110':
-            return 'Class C'
-        elif self._netAddr[0:4] == '1110':
-            return 'Class D'
-        elif self._netAddr[0:4] == '1111':
-            return 'Class E'
-        else:
-            raise ValueError
+        try:
+            return self._networkClass
+        except AttributeError:
+            firstOctet = self._addr >> 24
+            if firstOctet < 128:
+                self._networkClass = 'Class A'
+            elif firstOctet < 192:
+                self._networkClass = 'Class B'
+            elif firstOctet < 224:
+                self._networkClass = 'Class C'
+            elif firstOctet < 240:
+                self._networkClass = 'Class D'
+            else:
+                self._networkClass = 'Class E'
+            return self._networkClass
 
     @property
     def networkInverseMask(self):
@@ -713,17 +1538,11 @@ class AddressSpace(IPv4Utils, object):
         mask to the inverse representation.
         1111111100000000 becomes 0000000011111111'''
 
-        invMask = []
-        if IPv4Utils.isBinStr(self._netMask):
-            for value in self._netMask:
-                if value == '1':
-                    invMask.append('0')
-                else:
-                    invMask.append('1')
-            self._networkInverseMask = ''.join(invMask)
+        try:
+            return self._networkInverseMask
+        except AttributeError:
+            self._networkInverseMask = format(0xFFFFFFFF ^ _ipv4Masks[self._maskLen], '032b')
             return self._networkInverseMask
-        else:
-            return None
 
     @property 
     def maxPrefixLen(self):
@@ -733,8 +1552,8 @@ class AddressSpace(IPv4Utils, object):
     @property 
     def minPrefixLen(self):
         '''Return the larger of minNetMaskLen or maskLen(self.NetMask)'''
-        if (self.maskLen) > self._minNetMaskLen:
-            return self.maskLen
+        if (self._maskLen) > self._minNetMaskLen:
+            return self._maskLen
         else:
             return self._minNetMaskLen
 
@@ -742,8 +1561,12 @@ class AddressSpace(IPv4Utils, object):
     def broadcastAddr(self):
         '''Calculate the Broadcast address from network address'''
         
-        baseMask = '1' * 32
-        return IPv4Utils.printDotDec(self._netAddr[0:self.maskLen] + baseMask[self.maskLen:])  
+        try:
+            return self._broadcastAddr
+        except AttributeError:
+            mask = _ipv4Masks[self._maskLen]
+            self._broadcastAddr = IPv4Utils.int2DotDec((self._addr & mask) | (0xFFFFFFFF ^ mask))
+            return self._broadcastAddr
             
     @property
     def addressFamily(self):
@@ -761,7 +1584,11 @@ class AddressSpace(IPv4Utils, object):
             Valide IPv4 Host range; 
             '192.168.1.1 - 192.168.1.254'
         '''
-        return '%s - %s' % (self.startHostAddr, self.endHostAddr)
+        try:
+            return self._hostRange
+        except AttributeError:
+            self._hostRange = '%s - %s' % (self.startHostAddr, self.endHostAddr)
+            return self._hostRange
 
     def _getNetData(self):
         ''' Retrieve properties of this address space and return the properties as a 
@@ -786,87 +1613,2263 @@ class AddressSpace(IPv4Utils, object):
 
     @property
     def maskLen(self):
-        ''' Given a bitstring for a bitmask convert from bitstring to the 
-        decimal number representing the number of 1's in the mask. 
+        ''' Return the number of 1's in the network mask. 
 
-        >>>>masklen('0b11110000', 8)
-        4
+        >>>>ipv4Addr(addr='192.168.1.0/24').maskLen
+        24
         '''
 
-        decimalMaskLen = 0
-        assert len(self._netMask) <= self.maxPrefixLen
-        tmpBitMask = int(self._netMask.rstrip('0'), 2)
-        while tmpBitMask:
-            tmpBitMask >>= 1
-            decimalMaskLen += 1
-        return decimalMaskLen
+        return self._maskLen
 
     def inNetwork(self, prefix):
         ''' given a prefix, return True if the prefix is part of the network and 
-        False if it is not ''' 
+        False if it is not. Every address from the network address through the
+        broadcast address is part of the network. The prefix may be in any format
+        accepted by addr2Int(). ''' 
         
-        prefix = IPv4Utils.dotDec2Int(prefix)
-        start = IPv4Utils.dotDec2Int(self.startHostAddr)
-        stop = IPv4Utils.dotDec2Int(self.endHostAddr)
-
-        if prefix in range(start, stop):
+        mask = _ipv4Masks[self._maskLen]
+        if (IPv4Utils.addr2Int(prefix) & mask) == (self._addr & mask):
             return True
         else:
             return False
-    # def allocateAs(self, newMask):
-    #     ''' Given a new network mask, allocate the address space into new subnets '''
-    #     if isDotDec(newMask):
-    #         if IPv4Utils.dotDec2Int(newMask) > IPv4Utils.dotDec2Int(self.networkMask):
-    #             raise ValueError, 'New Network Mask must be larger than existing network mask: %s' % (slef.networkMask)
-    #         maskDiff = IPv4Utils.dotDec2Int(newMsk) - IPv4Utils.dotDec2Int(self.networkMask)
-    #         maskDiff = 2 ** maskDiff 
-
-    #     if type(newMask) == int:
-    #         pass
-    #     else:
-    #         Raise ValueError, 'Invalid network mask'
-    
+
+    def containsMany(self, prefixes):
+        '''
+        Vectorized inNetwork(); test every address in an array with one mask and
+        compare. Requires numpy.
+
+        Args:
+            prefixes: a sequence or numpy array of unsigned int addresses, such as the
+                      address array returned by parseMany()
+        Returns:
+            A numpy bool array, True where the address is part of the network
+        '''
+        _requireNumpy('containsMany')
+        mask = _ipv4Masks[self._maskLen]
+        prefixes = numpy.asarray(prefixes, dtype=numpy.uint32)
+        return (prefixes & numpy.uint32(mask)) == numpy.uint32(self._addr & mask)
+
+    @property
+    def hosts(self):
+        ''' The host addresses of the network, startHostAddr through endHostAddr, as a
+        HostSequence() '''
+        inverse = 0xFFFFFFFF ^ _ipv4Masks[self._maskLen]
+        return HostSequence(self._addr + 1, 1, inverse - 1)
+
+    def permutedHosts(self, seed=0, shard=0, shards=1, position=0):
+        ''' The host addresses of the network in a seeded pseudorandom order, as a
+        HostPermutation() '''
+        return HostPermutation(self, seed, shard, shards, position)
+
     def __iter__(self):
-        return self
+        return iter(self.hosts)
 
-    def __getitem__(self):
-        pass
+    def __reversed__(self):
+        return reversed(self.hosts)
 
-    def next(self):
-        value = self._hosts 
-        if value > (int(self._netAddr, 2)) + (IPv4Utils.dotDec2Int(self.inverseMask) -1):
-            raise StopIteration
-        self._hosts += 1
-        return IPv4Utils.int2DotDec(value) 
+    def __getitem__(self, index):
+        return self.hosts[index]
 
     def __len__(self):
-        int(self.inverseMask.lstrip('0.')) - 1
+        return max(0, (0xFFFFFFFF ^ _ipv4Masks[self._maskLen]) - 1)
 
+    def __nonzero__(self):
+        # a /31 or /32 has no hosts but is still a valid network
+        return True
 
-class subnets(object):
+    __bool__ = __nonzero__
 
-    version = '0.1'
+    def __eq__(self, other):
+        if not isinstance(other, AddressSpace):
+            return NotImplemented
+        # the address width tells an IPv4 network from the IPv6 one with the same numbers
+        return (self._addr == other._addr and self._maskLen == other._maskLen and
+                self._maxNetMaskLen == other._maxNetMaskLen)
 
-    def __init__(self, subnetAddr, subnetMask):
-        self.subnetAddr = subnetAddr
-        self.subnetMask = subnetMask
+    def __ne__(self, other):
+        if not isinstance(other, AddressSpace):
+            return NotImplemented
+        return not self == other
 
-    def __str__(self):
-        pass
+    def __hash__(self):
+        return hash((self._addr, self._maskLen))
 
-    def __repr__(self):
-        pass
+    @property
+    def sortKey(self):
+        ''' The network address and mask length packed into one int,
+        (network << 6) | maskLen, so networks sort by address and then from the
+        shortest to the longest prefix; sorted(networks, key=attrgetter('sortKey')) '''
+        return ((self._addr & _ipv4Masks[self._maskLen]) << 6) | self._maskLen
 
-    def __iter__(self):
-        pass
+    def _orderKey(self):
+        # sortKey with the unmasked address as a tie break, matching __eq__()
+        return (((self._addr & _ipv4Masks[self._maskLen]) << 6 | self._maskLen) << 32) | self._addr
 
-    def __len__(self):
-        pass
+    def __lt__(self, other):
+        if not isinstance(other, AddressSpace):
+            return NotImplemented
+        return self._orderKey() < other._orderKey()
 
-    def inSubnet(self):
-        pass
-    
-    
- 
+    def __le__(self, other):
+        if not isinstance(other, AddressSpace):
+            return NotImplemented
+        return self._orderKey() <= other._orderKey()
 
-    
+    def __gt__(self, other):
+        if not isinstance(other, AddressSpace):
+            return NotImplemented
+        return self._orderKey() > other._orderKey()
+
+    def __ge__(self, other):
+        if not isinstance(other, AddressSpace):
+            return NotImplemented
+        return self._orderKey() >= other._orderKey()
+
+
+class AddressSpace6(AddressSpace):
+
+    '''
+    IPv6 address space on the same integer core as AddressSpace(); the address is a
+    128 bit unsigned int and addresses are shown in colon hexadecimal format. There
+    is no broadcast address in IPv6, broadcastAddr is the last address of the network.
+    Networks sort after all IPv4 networks.
+    '''
+
+    __slots__ = ()
+
+    _maxNetMaskLen = 128
+    _masks = _ipv6Masks
+
+    def __init__(self, netAddr, netMask, AF_Family='IPv6'):
+        (addr, maskLen) = _parseNotation6(netAddr, netMask)
+        self._AF_Family = AF_Family
+        self._addr = addr
+        self._maskLen = maskLen
+
+    @classmethod
+    def fromInt(cls, netAddr, maskLen, AF_Family='IPv6'):
+        ''' Build an AddressSpace6() object from a 128 bit integer address and a prefix length '''
+        return super(AddressSpace6, cls).fromInt(netAddr, maskLen, AF_Family)
+
+    @property
+    def networkAddress(self):
+        '''Displays the network address in colon hexadecimal format'''
+
+        try:
+            return self._networkAddress
+        except AttributeError:
+            self._networkAddress = IPv6Utils.int2ColonHex(self._addr)
+            return self._networkAddress
+
+    @property
+    def networkMask(self):
+        '''Displays the network mask in colon hexadecimal format'''
+
+        try:
+            return self._networkMask
+        except AttributeError:
+            self._networkMask = IPv6Utils.int2ColonHex(_ipv6Masks[self._maskLen])
+            return self._networkMask
+
+    @property
+    def inverseMask(self):
+        '''Displays the inverse network mask in colon hexadecimal format'''
+
+        try:
+            return self._inverseMask
+        except AttributeError:
+            self._inverseMask = IPv6Utils.int2ColonHex(_ipv6All ^ _ipv6Masks[self._maskLen])
+            return self._inverseMask
+
+    @property
+    def startHostAddr(self):
+        '''Calculate and return the starting host IP address'''
+
+        try:
+            return self._startHostAddr
+        except AttributeError:
+            self._startHostAddr = IPv6Utils.int2ColonHex(self._addr + 1)
+            return self._startHostAddr
+
+    @property
+    def endHostAddr(self):
+        ''' Calculate the last host address in the IP range '''
+
+        try:
+            return self._endHostAddr
+        except AttributeError:
+            inverse = _ipv6All ^ _ipv6Masks[self._maskLen]
+            self._endHostAddr = IPv6Utils.int2ColonHex((self._addr - 1) + inverse)
+            return self._endHostAddr
+
+    @property
+    def networkClass(self):
+        '''IPv6 has no network classes; always None'''
+        return None
+
+    @property
+    def networkInverseMask(self):
+        '''The inverse network mask as a 128 character bitstring'''
+
+        try:
+            return self._networkInverseMask
+        except AttributeError:
+            self._networkInverseMask = format(_ipv6All ^ _ipv6Masks[self._maskLen], '0128b')
+            return self._networkInverseMask
+
+    @property
+    def broadcastAddr(self):
+        '''The last address of the network'''
+
+        try:
+            return self._broadcastAddr
+        except AttributeError:
+            mask = _ipv6Masks[self._maskLen]
+            self._broadcastAddr = IPv6Utils.int2ColonHex((self._addr & mask) | (_ipv6All ^ mask))
+            return self._broadcastAddr
+
+    def inNetwork(self, prefix):
+        ''' given an IPv6 address as an unsigned int or in colon hexadecimal format,
+        return True if it is part of the network '''
+
+        mask = _ipv6Masks[self._maskLen]
+        return (IPv6Utils.addr2Int(prefix) & mask) == (self._addr & mask)
+
+    def containsMany(self, prefixes):
+        ''' numpy has no 128 bit integers; use inNetwork() for IPv6 '''
+        raise ValueError('containsMany() only supports IPv4 networks')
+
+    @property
+    def hosts(self):
+        ''' The host addresses of the network, startHostAddr through endHostAddr, as a
+        HostSequence6() '''
+        inverse = _ipv6All ^ _ipv6Masks[self._maskLen]
+        return HostSequence6(self._addr + 1, 1, inverse - 1)
+
+    def __len__(self):
+        # len() is limited to sys.maxsize; hosts.count holds the host count of any network
+        return max(0, (_ipv6All ^ _ipv6Masks[self._maskLen]) - 1)
+
+    @property
+    def sortKey(self):
+        ''' The network address and prefix length packed into one int,
+        (network << 8) | maskLen '''
+        return ((self._addr & _ipv6Masks[self._maskLen]) << 8) | self._maskLen
+
+    def _orderKey(self):
+        # above every IPv4 key, which stay below 1 << 70
+        return (1 << 300) | ((self.sortKey << 128) | self._addr)
+
+
+class subnets(object):
+
+    '''
+    Virtual sequence of the subnets of a given size that an AddressSpace() network
+    divides into. Subnets are computed from their index when they are read, so a /8
+    split into /30s costs the same as a /24 split into /26s.
+
+    subnets(ipv4Addr(addr='10.0.0.0/8'), 24)[5].networkAddress
+    > '10.0.5.0'
+    '''
+
+    version = '0.1'
+
+    def __init__(self, network, newMask):
+        _requireIPv4(network, 'subnets()')
+        if isinstance(newMask, _intTypes):
+            maskLen = newMask
+        else:
+            maskLen = _ipv4MaskLens.get(IPv4Utils.dotDec2Int(newMask))
+        if maskLen is None or not network._maskLen <= maskLen <= network._maxNetMaskLen:
+            raise ValueError('New Network Mask must be larger than existing network mask: %s' % network.networkMask)
+        self._network = network
+        self._base = network._addr & _ipv4Masks[network._maskLen]
+        self._maskLen = maskLen
+        self._shift = 32 - maskLen
+        self._count = 1 << (maskLen - network._maskLen)
+
+    @property
+    def subnetAddr(self):
+        '''The network address of the network being divided in dotted decimal format'''
+        return IPv4Utils.int2DotDec(self._base)
+
+    @property
+    def subnetMask(self):
+        '''The network mask of each subnet in dotted decimal format'''
+        return IPv4Utils.int2DotDec(_ipv4Masks[self._maskLen])
+
+    @property
+    def maskLen(self):
+        '''The mask length of each subnet'''
+        return self._maskLen
+
+    def __str__(self):
+        return '%s/%d in /%d subnets' % (self.subnetAddr, self._network._maskLen, self._maskLen)
+
+    def __repr__(self):
+        return 'subnets(%s/%d, %d)' % (self.subnetAddr, self._network._maskLen, self._maskLen)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        ''' return the subnet at an index as an AddressSpace() object, or a list of
+        subnets for a slice '''
+        if isinstance(index, slice):
+            return [self[position] for position in _range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('subnet index out of range')
+        return AddressSpace.fromInt(self._base + (index << self._shift), self._maskLen, self._network._AF_Family)
+
+    def __iter__(self):
+        (addr, size) = (self._base, 1 << self._shift)
+        (maskLen, family) = (self._maskLen, self._network._AF_Family)
+        for index in _range(self._count):
+            yield AddressSpace.fromInt(addr, maskLen, family)
+            addr += size
+
+    def inSubnet(self, prefix):
+        '''
+        Find which subnet an address belongs to
+
+        Args:
+            prefix: An IPv4 address in any format accepted by addr2Int(); '10.0.5.17'
+        Returns:
+            The index of the subnet holding the address. Raises ValueError if the
+            address is not part of the network being divided.
+        '''
+        offset = IPv4Utils.addr2Int(prefix) - self._base
+        if not 0 <= offset < (self._count << self._shift):
+            raise ValueError('%s is not in %s/%d' % (prefix, self.subnetAddr, self._network._maskLen))
+        return offset >> self._shift
+
+
+class PrefixTable(object):
+
+    '''
+    Longest prefix match table of AddressSpace() networks and attached values, held
+    as a path compressed binary (Patricia) trie. Lookups, inserts and deletes visit
+    at most one node per bit of the prefix.
+
+    Nodes are stored column wise in flat arrays rather than as objects; the network
+    address, mask length, the two child node indexes and the value of node i are
+    _addrs[i], _lens[i], _children[2 * i], _children[2 * i + 1] and _values[i]. Node 0
+    is the root 0.0.0.0/0 and a child index of 0 means no child.
+
+    IPv6 networks are kept in a second, 128 bit wide, trie of the same kind that is
+    created with the first one inserted; lookups of addresses holding a ':' go there.
+    lookupMany() and compile() cover the IPv4 networks only.
+    '''
+
+    version = '0.1'
+
+    # address width of the trie and the matching masks and network class
+    _bits = 32
+    _masks = _ipv4Masks
+    _spaceClass = AddressSpace
+
+    def __init__(self):
+        self._addrs = array.array('I', [0]) if self._bits == 32 else [0]
+        self._lens = bytearray(1)
+        self._children = array.array('i', [0, 0])
+        self._values = [None]
+        self._occupied = bytearray(1)
+        self._free = []
+        self._count = 0
+        # interval table used by lookupMany(), rebuilt after the table changes
+        self._flat = None
+        # trie of the IPv6 networks
+        self._table6 = None
+
+    def _alloc(self, addr, maskLen):
+        ''' return the index of a new childless node '''
+        self._flat = None
+        if self._free:
+            node = self._free.pop()
+            self._addrs[node] = addr
+            self._lens[node] = maskLen
+            self._children[2 * node] = self._children[2 * node + 1] = 0
+            return node
+        self._addrs.append(addr)
+        self._lens.append(maskLen)
+        self._children.extend((0, 0))
+        self._values.append(None)
+        self._occupied.append(0)
+        return len(self._lens) - 1
+
+    def _release(self, node):
+        ''' return a node that has been unlinked from the trie to the free list '''
+        self._values[node] = None
+        self._occupied[node] = 0
+        self._free.append(node)
+
+    @staticmethod
+    def _key(network):
+        ''' return the masked network address and mask length of an AddressSpace() '''
+        return (network._addr & network._masks[network._maskLen], network._maskLen)
+
+    @staticmethod
+    def _toInt(prefix):
+        ''' accept an address as an unsigned int or in dotted decimal format '''
+        if isinstance(prefix, _intTypes):
+            return int(prefix)
+        return IPv4Utils.dotDec2Int(prefix)
+
+    def _tableOf(self, network):
+        ''' the trie holding networks of the family of network; None for a missing IPv6 trie '''
+        if network._maxNetMaskLen == self._bits:
+            return self
+        return self._table6
+
+    def _find(self, addr, maskLen):
+        ''' return the path of nodes from the root to the node holding exactly addr/maskLen '''
+        addrs, lens, children, masks = self._addrs, self._lens, self._children, self._masks
+        top = self._bits - 1
+        path = [0]
+        node = 0
+        while lens[node] < maskLen:
+            node = children[2 * node + ((addr >> (top - lens[node])) & 1)]
+            if not node or lens[node] > maskLen or (addr & masks[lens[node]]) != addrs[node]:
+                return None
+            path.append(node)
+        return path if addrs[node] == addr else None
+
+    def insert(self, network, value=None):
+        '''
+        Add a network to the table, replacing the value if the network is already present
+
+        Args:
+            network: An AddressSpace() object; ipv4Addr(addr='192.168.0.0/16')
+            value: any object to return when the network is matched
+        '''
+        if network._maxNetMaskLen != self._bits:
+            if self._table6 is None:
+                self._table6 = _PrefixTable6()
+            return self._table6.insert(network, value)
+        (addr, maskLen) = self._key(network)
+        addrs, lens, children = self._addrs, self._lens, self._children
+        bits = self._bits
+        node = 0
+        while True:
+            if lens[node] == maskLen:
+                # only reached when the address matches, as every node on the way has
+                if not self._occupied[node]:
+                    self._occupied[node] = 1
+                    self._count += 1
+                # the flattened table holds the values as well as the ranges
+                self._flat = None
+                self._values[node] = value
+                return
+            slot = 2 * node + ((addr >> (bits - 1 - lens[node])) & 1)
+            child = children[slot]
+            if not child:
+                child = self._alloc(addr, maskLen)
+                self._children[slot] = child
+                node = child
+                continue
+            childAddr, childLen = addrs[child], lens[child]
+            # number of leading bits the new network and the child have in common
+            common = min(maskLen, childLen, bits - (addr ^ childAddr).bit_length())
+            if common == childLen:
+                node = child
+                continue
+            # the new network, or a glue node where the two part ways, sits between
+            # the node and its child
+            between = self._alloc(addr & self._masks[common], common)
+            self._children[slot] = between
+            self._children[2 * between + ((childAddr >> (bits - 1 - common)) & 1)] = child
+            node = between
+
+    def delete(self, network):
+        '''
+        Remove a network from the table. Raises KeyError if it is not present.
+
+        Args:
+            network: An AddressSpace() object
+        '''
+        table = self._tableOf(network)
+        if table is not self:
+            if table is None:
+                raise KeyError('%s/%d' % (network.networkAddress, network.maskLen))
+            return table.delete(network)
+        (addr, maskLen) = self._key(network)
+        path = self._find(addr, maskLen)
+        if path is None or not self._occupied[path[-1]]:
+            raise KeyError('%s/%d' % (network.networkAddress, maskLen))
+        node = path[-1]
+        self._values[node] = None
+        self._occupied[node] = 0
+        self._count -= 1
+        self._flat = None
+        # nodes without a value are only kept while they join two children
+        children = self._children
+        while len(path) > 1:
+            node = path.pop()
+            if self._occupied[node] or (children[2 * node] and children[2 * node + 1]):
+                break
+            parent = path[-1]
+            slot = 2 * parent + ((self._addrs[node] >> (self._bits - 1 - self._lens[parent])) & 1)
+            children[slot] = children[2 * node] or children[2 * node + 1]
+            self._release(node)
+            if children[slot]:
+                break
+
+    def exactMatch(self, network):
+        '''
+        Return the value stored for exactly this network. Raises KeyError if it is
+        not present.
+
+        Args:
+            network: An AddressSpace() object
+        '''
+        table = self._tableOf(network)
+        if table is not self:
+            if table is None:
+                raise KeyError('%s/%d' % (network.networkAddress, network.maskLen))
+            return table.exactMatch(network)
+        (addr, maskLen) = self._key(network)
+        path = self._find(addr, maskLen)
+        if path is None or not self._occupied[path[-1]]:
+            raise KeyError('%s/%d' % (network.networkAddress, maskLen))
+        return self._values[path[-1]]
+
+    def longestMatch(self, prefix):
+        '''
+        Find the most specific network in the table that contains an address
+
+        Args:
+            prefix: An IPv4 address in dotted decimal format or as an unsigned int, or an
+                    IPv6 address in colon hexadecimal format
+        Returns:
+            A tuple of the matching AddressSpace() object and its value, or None
+            if no network contains the address
+        '''
+        try:
+            addr = self._toInt(prefix)
+        except ValueError:
+            # IPv6 addresses fail the IPv4 parse and are answered by the IPv6 table
+            if self._bits != 32 or ':' not in prefix:
+                raise
+            return self._table6.longestMatch(prefix) if self._table6 is not None else None
+        addrs, lens, children, occupied = self._addrs, self._lens, self._children, self._occupied
+        bits = self._bits
+        best = 0 if occupied[0] else -1
+        node = maskLen = 0
+        while maskLen < bits:
+            node = children[(node << 1) | ((addr >> (bits - 1 - maskLen)) & 1)]
+            if not node:
+                break
+            maskLen = lens[node]
+            # stop at the first node whose network does not contain the address
+            if (addr ^ addrs[node]) >> (bits - maskLen):
+                break
+            if occupied[node]:
+                best = node
+        if best < 0:
+            return None
+        return (self._spaceClass.fromInt(addrs[best], lens[best]), self._values[best])
+
+    def _ranges(self):
+        '''
+        Flatten the trie into sorted, non overlapping address ranges. Returns the list
+        of range start addresses and, for each range, the node whose network is the
+        longest match for it (-1 for no match).
+        '''
+        starts = [0]
+        owners = [-1]
+        enclosing = []
+
+        def mark(start, owner):
+            if starts[-1] == start:
+                owners[-1] = owner
+            else:
+                starts.append(start)
+                owners.append(owner)
+
+        for node in self._preorder():
+            start = self._addrs[node]
+            # networks that end before this one starts hand their range back to
+            # the enclosing network
+            while enclosing and enclosing[-1][0] < start:
+                end = enclosing.pop()[0]
+                mark(end + 1, enclosing[-1][1] if enclosing else -1)
+            mark(start, node)
+            enclosing.append((start | (0xFFFFFFFF ^ _ipv4Masks[self._lens[node]]), node))
+        while enclosing:
+            end = enclosing.pop()[0]
+            mark(end + 1, enclosing[-1][1] if enclosing else -1)
+        if starts[-1] > 0xFFFFFFFF:
+            # the range after a network ending at 255.255.255.255
+            starts.pop()
+            owners.pop()
+        return (starts, owners)
+
+    def _flatten(self):
+        ''' the _ranges() table as numpy arrays '''
+        (starts, owners) = self._ranges()
+        return (numpy.array(starts, dtype=numpy.int64), numpy.array(owners, dtype=numpy.int64))
+
+    def _preorder(self):
+        ''' yield the occupied nodes in address order, enclosing networks first '''
+        children, occupied = self._children, self._occupied
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if occupied[node]:
+                yield node
+            if children[2 * node + 1]:
+                stack.append(children[2 * node + 1])
+            if children[2 * node]:
+                stack.append(children[2 * node])
+
+    def lookupMany(self, prefixes, default=None):
+        '''
+        Longest prefix match for an array of addresses at once. The trie is flattened
+        into a sorted table of address ranges, kept until the table next changes, and
+        every address is located with a single numpy binary search. Requires numpy.
+
+        Args:
+            prefixes: a sequence or numpy array of unsigned int addresses, such as the
+                      address array returned by parseMany()
+            default: the value returned for addresses no network contains
+        Returns:
+            A numpy object array holding the matched value for each address
+        '''
+        _requireNumpy('lookupMany')
+        if self._flat is None:
+            (starts, owners) = self._flatten()
+            values = numpy.empty(len(self._values), dtype=object)
+            for (node, value) in enumerate(self._values):
+                values[node] = value
+            self._flat = (starts, owners, values)
+        (starts, owners, values) = self._flat
+        prefixes = numpy.asarray(prefixes, dtype=numpy.int64).ravel()
+        # searching in sorted order keeps the binary searches cache friendly
+        order = numpy.argsort(prefixes)
+        ranges = numpy.empty(len(prefixes), dtype=numpy.int64)
+        ranges[order] = numpy.searchsorted(starts, prefixes[order], side='right') - 1
+        # the cached arrays are shared by every caller, so the default goes into a
+        # fresh result array; ranges no network covers have owner -1
+        nodes = owners[ranges]
+        found = nodes >= 0
+        matched = numpy.empty(len(prefixes), dtype=object)
+        matched.fill(default)
+        matched[found] = values[nodes[found]]
+        return matched
+
+    def __len__(self):
+        return self._count + (len(self._table6) if self._table6 is not None else 0)
+
+    def __contains__(self, network):
+        table = self._tableOf(network)
+        if table is not self:
+            return table is not None and network in table
+        (addr, maskLen) = self._key(network)
+        path = self._find(addr, maskLen)
+        return path is not None and bool(self._occupied[path[-1]])
+
+    def __iter__(self):
+        ''' yield (AddressSpace(), value) tuples in address order, IPv4 networks first '''
+        for node in self._preorder():
+            yield (self._spaceClass.fromInt(self._addrs[node], self._lens[node]), self._values[node])
+        if self._table6 is not None:
+            for item in self._table6:
+                yield item
+
+    def compile(self, path):
+        '''
+        Write the IPv4 networks of the table to a binary file that MappedPrefixTable()
+        queries in place. Values must be JSON serializable; tuples come back as lists.
+
+        Args:
+            path: the file to write
+        '''
+        (starts, owners) = self._ranges()
+        columns = ([], [], [], [])
+        lens = bytearray()
+        valueIndex = {}
+        blobs = []
+        for (i, owner) in enumerate(owners):
+            if owner < 0:
+                continue
+            end = starts[i + 1] - 1 if i + 1 < len(starts) else 0xFFFFFFFF
+            blob = json.dumps(self._values[owner], sort_keys=True).encode('utf-8')
+            if blob not in valueIndex:
+                valueIndex[blob] = len(blobs)
+                blobs.append(blob)
+            for (column, item) in zip(columns, (starts[i], end, self._addrs[owner], valueIndex[blob])):
+                column.append(item)
+            lens.append(self._lens[owner])
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        with open(path, 'wb') as stream:
+            stream.write(_mappedHeader.pack(_mappedMagic, _mappedVersion, self._count, len(lens), len(blobs)))
+            for column in columns + (offsets,):
+                column = array.array('I', column)
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                stream.write(column.tostring() if not hasattr(column, 'tobytes') else column.tobytes())
+            stream.write(bytes(lens))
+            stream.write(b''.join(blobs))
+
+
+class _PrefixTable6(PrefixTable):
+
+    ''' the 128 bit trie a PrefixTable() keeps its IPv6 networks in '''
+
+    _bits = 128
+    _masks = _ipv6Masks
+    _spaceClass = AddressSpace6
+
+    @staticmethod
+    def _toInt(prefix):
+        return IPv6Utils.addr2Int(prefix)
+
+
+# persistent trie nodes used by VersionedPrefixTable() are never changed once built;
+# each is a tuple (network address, mask length, occupied, value, zero child, one child)
+# and a missing child is None
+_emptyRoot = (0, 0, False, None, None, None)
+
+def _cowInsert(node, addr, maskLen, value, bits, masks):
+    ''' return (a copy of the subtrie node with addr/maskLen set to value, True if the
+    network is new); only the nodes on the path to the network are copied '''
+    (nodeAddr, nodeLen, occupied, nodeValue, zero, one) = node
+    if nodeLen == maskLen:
+        return ((nodeAddr, nodeLen, True, value, zero, one), not occupied)
+    bit = (addr >> (bits - 1 - nodeLen)) & 1
+    child = one if bit else zero
+    if child is None:
+        (child, added) = ((addr, maskLen, True, value, None, None), True)
+    else:
+        childAddr = child[0]
+        childLen = child[1]
+        common = min(maskLen, childLen, bits - (addr ^ childAddr).bit_length())
+        if common < childLen:
+            # the new network, or a glue node where the two part ways, goes between
+            # the node and its child
+            if (childAddr >> (bits - 1 - common)) & 1:
+                child = (addr & masks[common], common, False, None, None, child)
+            else:
+                child = (addr & masks[common], common, False, None, child, None)
+        (child, added) = _cowInsert(child, addr, maskLen, value, bits, masks)
+    if bit:
+        return ((nodeAddr, nodeLen, occupied, nodeValue, zero, child), added)
+    return ((nodeAddr, nodeLen, occupied, nodeValue, child, one), added)
+
+def _cowDelete(node, addr, maskLen, bits, masks, root=False):
+    ''' return a copy of the subtrie node without addr/maskLen, None if nothing is
+    left of it; raises KeyError if the network is not present '''
+    (nodeAddr, nodeLen, occupied, nodeValue, zero, one) = node
+    if nodeLen == maskLen:
+        if nodeAddr != addr or not occupied:
+            raise KeyError(maskLen)
+        (occupied, nodeValue) = (False, None)
+    else:
+        bit = (addr >> (bits - 1 - nodeLen)) & 1
+        child = one if bit else zero
+        if child is None or child[1] > maskLen or (addr & masks[child[1]]) != child[0]:
+            raise KeyError(maskLen)
+        child = _cowDelete(child, addr, maskLen, bits, masks)
+        (zero, one) = (zero, child) if bit else (child, one)
+    # nodes without a value are only kept while they join two children
+    if not root and not occupied and (zero is None or one is None):
+        return zero if one is None else one
+    return (nodeAddr, nodeLen, occupied, nodeValue, zero, one)
+
+
+class PrefixSnapshot(object):
+
+    '''
+    One immutable version of a VersionedPrefixTable(). Nothing in a snapshot ever
+    changes, so any number of threads can query it without locks while the table
+    moves on to newer versions. Supports the lookups of PrefixTable().
+    '''
+
+    __slots__ = ('_root4', '_root6', '_count', 'version')
+
+    def __init__(self, root4=_emptyRoot, root6=_emptyRoot, count=0, version=0):
+        self._root4 = root4
+        self._root6 = root6
+        self._count = count
+        self.version = version
+
+    @staticmethod
+    def _match(node, addr, bits):
+        ''' the deepest occupied node of the subtrie containing addr, or None '''
+        best = None
+        while node is not None:
+            nodeLen = node[1]
+            if (addr ^ node[0]) >> (bits - nodeLen):
+                break
+            if node[2]:
+                best = node
+            if nodeLen == bits:
+                break
+            node = node[5] if (addr >> (bits - 1 - nodeLen)) & 1 else node[4]
+        return best
+
+    def longestMatch(self, prefix):
+        '''
+        Find the most specific network in the snapshot that contains an address
+
+        Args:
+            prefix: An IPv4 address in dotted decimal format or as an unsigned int, or an
+                    IPv6 address in colon hexadecimal format
+        Returns:
+            A tuple of the matching AddressSpace() object and its value, or None
+            if no network contains the address
+        '''
+        try:
+            best = self._match(self._root4, PrefixTable._toInt(prefix), 32)
+            spaceClass = AddressSpace
+        except ValueError:
+            if ':' not in prefix:
+                raise
+            best = self._match(self._root6, IPv6Utils.addr2Int(prefix), 128)
+            spaceClass = AddressSpace6
+        if best is None:
+            return None
+        return (spaceClass.fromInt(best[0], best[1]), best[3])
+
+    def _find(self, network):
+        ''' the node holding exactly network, or None '''
+        (addr, maskLen) = PrefixTable._key(network)
+        if network._maxNetMaskLen == 32:
+            (node, bits) = (self._root4, 32)
+        else:
+            (node, bits) = (self._root6, 128)
+        while node is not None and node[1] < maskLen:
+            node = node[5] if (addr >> (bits - 1 - node[1])) & 1 else node[4]
+        if node is None or node[1] != maskLen or node[0] != addr or not node[2]:
+            return None
+        return node
+
+    def exactMatch(self, network):
+        '''
+        Return the value stored for exactly this network. Raises KeyError if it is
+        not present.
+
+        Args:
+            network: An AddressSpace() object
+        '''
+        node = self._find(network)
+        if node is None:
+            raise KeyError('%s/%d' % (network.networkAddress, network.maskLen))
+        return node[3]
+
+    def __contains__(self, network):
+        return self._find(network) is not None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        ''' yield (AddressSpace(), value) tuples in address order, IPv4 networks first '''
+        for (root, spaceClass) in ((self._root4, AddressSpace), (self._root6, AddressSpace6)):
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                if node[2]:
+                    yield (spaceClass.fromInt(node[0], node[1]), node[3])
+                if node[5] is not None:
+                    stack.append(node[5])
+                if node[4] is not None:
+                    stack.append(node[4])
+
+
+class VersionedPrefixTable(object):
+
+    '''
+    Longest prefix match table for many reader threads and a stream of updates.
+    The table is a persistent path compressed trie: an update copies only the nodes
+    on the paths to the networks it changes and shares the rest with the previous
+    version, then publishes the result as a new PrefixSnapshot() with a single
+    reference assignment. Readers never lock; a snapshot taken with snapshot() keeps
+    answering from its version however many updates follow. Writers are serialised
+    by a lock.
+
+    table = VersionedPrefixTable()
+    table.update(inserts=[(ipv4Addr(addr='10.0.0.0/8'), 'corp')])
+    snapshot = table.snapshot()
+    snapshot.longestMatch('10.1.2.3')
+    > (<ipaddr.AddressSpace object>, 'corp')
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = PrefixSnapshot()
+
+    def snapshot(self):
+        ''' the current version as a PrefixSnapshot() '''
+        return self._current
+
+    @property
+    def version(self):
+        ''' the number of updates published '''
+        return self._current.version
+
+    def update(self, inserts=(), withdraws=()):
+        '''
+        Apply a batch of changes and publish them as one new version; readers see
+        either none or all of the batch. Withdrawals are applied before inserts.
+        If a withdrawn network is not present KeyError is raised and nothing is
+        published.
+
+        Args:
+            inserts: (AddressSpace(), value) pairs, or a dictionary of them, to add or
+                     replace
+            withdraws: AddressSpace() objects to remove
+        Returns:
+            The published PrefixSnapshot()
+        '''
+        if hasattr(inserts, 'items'):
+            inserts = inserts.items()
+        with self._lock:
+            current = self._current
+            roots = [current._root4, current._root6]
+            count = current._count
+            for network in withdraws:
+                (addr, maskLen) = PrefixTable._key(network)
+                family = network._maxNetMaskLen != 32
+                try:
+                    roots[family] = _cowDelete(roots[family], addr, maskLen, network._maxNetMaskLen,
+                                               network._masks, root=True)
+                except KeyError:
+                    raise KeyError('%s/%d' % (network.networkAddress, maskLen))
+                count -= 1
+            for (network, value) in inserts:
+                (addr, maskLen) = PrefixTable._key(network)
+                family = network._maxNetMaskLen != 32
+                (roots[family], added) = _cowInsert(roots[family], addr, maskLen, value,
+                                                    network._maxNetMaskLen, network._masks)
+                count += added
+            self._current = PrefixSnapshot(roots[0], roots[1], count, current.version + 1)
+            return self._current
+
+    def insert(self, network, value=None):
+        ''' add or replace one network as a new version '''
+        return self.update(inserts=[(network, value)])
+
+    def withdraw(self, network):
+        ''' remove one network as a new version; raises KeyError if it is not present '''
+        return self.update(withdraws=[network])
+
+    def longestMatch(self, prefix):
+        ''' longestMatch() of the current version '''
+        return self._current.longestMatch(prefix)
+
+    def __len__(self):
+        return len(self._current)
+
+
+# compiled prefix table file layout, all little endian; the header, then for n ranges
+# the uint32 columns start, end (inclusive), network address and value number, the
+# v + 1 uint32 value offsets into the value data, the n uint8 mask lengths and last
+# the JSON encoded values
+_mappedHeader = struct.Struct('<4sIIII')
+_mappedMagic = b'IPPT'
+_mappedVersion = 1
+
+
+class MappedPrefixTable(object):
+
+    '''
+    Read only longest prefix match table over a file written by PrefixTable.compile().
+    The file is memory mapped and searched in place, nothing is parsed when it is
+    opened, so processes mapping the same file share a single copy of it in the page
+    cache.
+
+    table = MappedPrefixTable('networks.ippt')
+    table.longestMatch('10.1.2.3')
+    > (<ipaddr.AddressSpace object>, 'office')
+    '''
+
+    # one range start in every _blockSize is kept in memory to direct the search
+    _blockSize = 64
+
+    def __init__(self, path):
+        with open(path, 'rb') as stream:
+            self._map = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _mappedHeader.size:
+            raise ValueError('Not a compiled prefix table: %s' % path)
+        (magic, version, self._count, count, values) = _mappedHeader.unpack_from(self._map, 0)
+        if magic != _mappedMagic or version != _mappedVersion:
+            raise ValueError('Not a compiled prefix table: %s' % path)
+        self._rangeCount = count
+        self._valueCount = values
+        # byte offsets of the columns
+        self._startsOffset = _mappedHeader.size
+        self._endsOffset = self._startsOffset + 4 * count
+        self._netsOffset = self._endsOffset + 4 * count
+        self._numbersOffset = self._netsOffset + 4 * count
+        self._valueOffsets = self._numbersOffset + 4 * count
+        self._lensOffset = self._valueOffsets + 4 * (values + 1)
+        self._dataOffset = self._lensOffset + count
+        self._index = array.array('I', [self._uint32(self._startsOffset, i) for i in _range(0, count, self._blockSize)])
+        self._values = {}
+        # every value as a numpy object array, built by lookupMany()
+        self._valueArray = None
+
+    def _uint32(self, column, i):
+        return struct.unpack_from('<I', self._map, column + 4 * i)[0]
+
+    def _search(self, addr):
+        ''' return the number of the last range starting at or before addr, -1 for none '''
+        block = bisect.bisect_right(self._index, addr) - 1
+        if block < 0:
+            return -1
+        base = block * self._blockSize
+        size = min(self._blockSize, self._rangeCount - base)
+        starts = struct.unpack_from('<%dI' % size, self._map, self._startsOffset + 4 * base)
+        return base + bisect.bisect_right(starts, addr) - 1
+
+    def _value(self, number):
+        ''' decode a value on first use '''
+        try:
+            return self._values[number]
+        except KeyError:
+            start = self._dataOffset + self._uint32(self._valueOffsets, number)
+            end = self._dataOffset + self._uint32(self._valueOffsets, number + 1)
+            value = self._values[number] = json.loads(self._map[start:end].decode('utf-8'))
+            return value
+
+    def longestMatch(self, prefix):
+        '''
+        Find the most specific network in the table that contains an address
+
+        Args:
+            prefix: An IPv4 address in dotted decimal format or as an unsigned int
+        Returns:
+            A tuple of the matching AddressSpace() object and its value, or None
+            if no network contains the address
+        '''
+        addr = PrefixTable._toInt(prefix)
+        i = self._search(addr)
+        if i < 0 or addr > self._uint32(self._endsOffset, i):
+            return None
+        maskLen = struct.unpack_from('B', self._map, self._lensOffset + i)[0]
+        return (AddressSpace.fromInt(self._uint32(self._netsOffset, i), maskLen),
+                self._value(self._uint32(self._numbersOffset, i)))
+
+    def lookupMany(self, prefixes, default=None):
+        '''
+        Longest prefix match for an array of addresses at once, searching numpy views
+        of the mapped columns. Requires numpy.
+
+        Args:
+            prefixes: a sequence or numpy array of unsigned int addresses
+            default: the value returned for addresses no network contains
+        Returns:
+            A numpy object array holding the matched value for each address
+        '''
+        _requireNumpy('lookupMany')
+        count = self._rangeCount
+        starts = numpy.frombuffer(self._map, dtype='<u4', count=count, offset=self._startsOffset)
+        ends = numpy.frombuffer(self._map, dtype='<u4', count=count, offset=self._endsOffset)
+        numbers = numpy.frombuffer(self._map, dtype='<u4', count=count, offset=self._numbersOffset)
+        if self._valueArray is None:
+            self._valueArray = numpy.empty(self._valueCount, dtype=object)
+            for number in _range(self._valueCount):
+                self._valueArray[number] = self._value(number)
+        prefixes = numpy.asarray(prefixes, dtype=numpy.int64).ravel()
+        ranges = numpy.searchsorted(starts, prefixes, side='right') - 1
+        found = ranges >= 0
+        found[found] = prefixes[found] <= ends[ranges[found]]
+        matched = numpy.empty(len(prefixes), dtype=object)
+        matched.fill(default)
+        matched[found] = self._valueArray[numbers[ranges[found]]]
+        return matched
+
+    def close(self):
+        ''' unmap the file '''
+        self._map.close()
+
+    def __len__(self):
+        return self._count
+
+
+# range database file layout, all little endian; the header, then for n rows the
+# uint32 columns start, end (inclusive) and attribute number, the v + 1 uint32
+# attribute offsets into the attribute data and last the utf-8 attribute strings
+_rangeHeader = struct.Struct('<4sIII')
+_rangeMagic = b'IPRD'
+_rangeVersion = 1
+
+
+class RangeDatabase(object):
+
+    '''
+    Read only table of address ranges and their attributes, such as an ASN, country
+    or owner, over a file written by RangeDatabase.build(). The file is memory
+    mapped and lookups binary search the mapped start column in place; repeated
+    attribute strings are stored once.
+
+    RangeDatabase.build(open('asn.csv'), 'asn.iprd')
+    database = RangeDatabase('asn.iprd')
+    database.lookup('8.8.8.8')
+    > 'AS15169,GOOGLE'
+    '''
+
+    # without memoryview.cast() one range start in every _blockSize is kept in
+    # memory to direct the search
+    _blockSize = 64
+
+    def __init__(self, path):
+        with open(path, 'rb') as stream:
+            self._map = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _rangeHeader.size:
+            raise ValueError('Not a range database: %s' % path)
+        (magic, version, count, values) = _rangeHeader.unpack_from(self._map, 0)
+        if magic != _rangeMagic or version != _rangeVersion or \
+           len(self._map) < _rangeHeader.size + 4 * (3 * count + values + 1):
+            raise ValueError('Not a range database: %s' % path)
+        self._count = count
+        self._valueCount = values
+        # byte offsets of the columns
+        self._startsOffset = _rangeHeader.size
+        self._endsOffset = self._startsOffset + 4 * count
+        self._numbersOffset = self._endsOffset + 4 * count
+        self._valueOffsets = self._numbersOffset + 4 * count
+        self._dataOffset = self._valueOffsets + 4 * (values + 1)
+        self._values = {}
+        # every attribute string as a numpy object array, built by lookupMany()
+        self._valueArray = None
+        self._closed = False
+        self._views = None
+        if hasattr(memoryview, 'cast') and sys.byteorder == 'little' and array.array('I').itemsize == 4:
+            # the columns as sequences of ints, searched with no copying
+            view = memoryview(self._map)
+            self._views = tuple(view[offset:offset + 4 * count].cast('I')
+                                for offset in (self._startsOffset, self._endsOffset, self._numbersOffset))
+            view.release()
+        else:
+            self._index = array.array('I', [self._uint32(self._startsOffset, i) for i in _range(0, count, self._blockSize)])
+
+    @classmethod
+    def build(cls, lines, path, delimiter=',', header=False):
+        '''
+        Parse rows of first address, last address and attributes and write them to
+        a range database file. Addresses are unsigned ints or single addresses in dotted
+        decimal or 0x prefixed hexadecimal notation, without a mask; the attributes are
+        the rest of the row, kept as one string.
+        Blank lines and lines starting with # are skipped.
+
+        Args:
+            lines: An iterable of text lines, such as an open CSV file
+            path: the file to write
+            delimiter: the field separator
+            header: True to skip the first line
+        Returns:
+            The number of rows written. Raises ValueError for a malformed row or
+            overlapping rows.
+        '''
+        starts = []
+        ends = []
+        numbers = []
+        valueIndex = {}
+        blobs = []
+        for (lineNumber, line) in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line[0] == '#' or (header and lineNumber == 1):
+                continue
+            fields = line.split(delimiter, 2)
+            try:
+                (start, end) = (cls._addrOf(fields[0]), cls._addrOf(fields[1]))
+            except (IndexError, ValueError):
+                raise ValueError('line %d: invalid address range: %s' % (lineNumber, line))
+            if start > end:
+                raise ValueError('line %d: invalid address range: %s' % (lineNumber, line))
+            attributes = fields[2] if len(fields) > 2 else ''
+            number = valueIndex.get(attributes)
+            if number is None:
+                number = valueIndex[attributes] = len(blobs)
+                blobs.append(attributes if isinstance(attributes, bytes) else attributes.encode('utf-8'))
+            starts.append(start)
+            ends.append(end)
+            numbers.append(number)
+        order = sorted(_range(len(starts)), key=starts.__getitem__)
+        for (previous, row) in zip(order, order[1:]):
+            if starts[row] <= ends[previous]:
+                raise ValueError('overlapping ranges %s - %s and %s - %s' % (
+                    IPv4Utils.int2DotDec(starts[previous]), IPv4Utils.int2DotDec(ends[previous]),
+                    IPv4Utils.int2DotDec(starts[row]), IPv4Utils.int2DotDec(ends[row])))
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        with open(path, 'wb') as stream:
+            stream.write(_rangeHeader.pack(_rangeMagic, _rangeVersion, len(order), len(blobs)))
+            for column in ([starts[row] for row in order], [ends[row] for row in order],
+                           [numbers[row] for row in order], offsets):
+                column = array.array('I', column)
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                stream.write(column.tostring() if not hasattr(column, 'tobytes') else column.tobytes())
+            stream.write(b''.join(blobs))
+        return len(order)
+
+    @staticmethod
+    def _addrOf(field):
+        ''' an address field as an unsigned int; a field carrying a mask is rejected '''
+        field = field.strip()
+        if field.isdigit():
+            addr = int(field)
+            if addr > 0xFFFFFFFF:
+                raise ValueError('Invalid IPv4 IP address: %s' % field)
+            return addr
+        return _parseAddr(field)
+
+    def _uint32(self, column, i):
+        return struct.unpack_from('<I', self._map, column + 4 * i)[0]
+
+    def _search(self, addr):
+        ''' return the number of the row holding addr, -1 for none '''
+        if self._closed:
+            raise ValueError('database is closed')
+        if self._views is not None:
+            (starts, ends, numbers) = self._views
+            i = bisect.bisect_right(starts, addr) - 1
+            return i if i >= 0 and addr <= ends[i] else -1
+        block = bisect.bisect_right(self._index, addr) - 1
+        if block < 0:
+            return -1
+        base = block * self._blockSize
+        size = min(self._blockSize, self._count - base)
+        starts = struct.unpack_from('<%dI' % size, self._map, self._startsOffset + 4 * base)
+        i = base + bisect.bisect_right(starts, addr) - 1
+        return i if addr <= self._uint32(self._endsOffset, i) else -1
+
+    def _value(self, number):
+        ''' decode an attribute string on first use '''
+        try:
+            return self._values[number]
+        except KeyError:
+            start = self._dataOffset + self._uint32(self._valueOffsets, number)
+            end = self._dataOffset + self._uint32(self._valueOffsets, number + 1)
+            value = self._values[number] = self._map[start:end].decode('utf-8')
+            return value
+
+    def lookup(self, prefix, default=None):
+        '''
+        Find the attributes of the range holding an address
+
+        Args:
+            prefix: An IPv4 address in dotted decimal format or as an unsigned int
+            default: the value returned when no range holds the address
+        Returns:
+            The attribute string of the range, or default
+        '''
+        i = self._search(PrefixTable._toInt(prefix))
+        if i < 0:
+            return default
+        if self._views is not None:
+            return self._value(self._views[2][i])
+        return self._value(self._uint32(self._numbersOffset, i))
+
+    def rangeOf(self, prefix):
+        ''' return (first address, last address, attributes) of the range holding an
+        address, with the addresses in dotted decimal format, or None '''
+        i = self._search(PrefixTable._toInt(prefix))
+        if i < 0:
+            return None
+        return (IPv4Utils.int2DotDec(self._uint32(self._startsOffset, i)),
+                IPv4Utils.int2DotDec(self._uint32(self._endsOffset, i)),
+                self._value(self._uint32(self._numbersOffset, i)))
+
+    def rowsMany(self, prefixes):
+        '''
+        The row number of the range holding each of an array of addresses, searching
+        numpy views of the mapped columns. Requires numpy.
+
+        Args:
+            prefixes: a sequence or numpy array of unsigned int addresses
+        Returns:
+            A numpy int64 array of row numbers, -1 where no range holds the address
+        '''
+        _requireNumpy('rowsMany')
+        if self._closed:
+            raise ValueError('database is closed')
+        count = self._count
+        starts = numpy.frombuffer(self._map, dtype='<u4', count=count, offset=self._startsOffset)
+        ends = numpy.frombuffer(self._map, dtype='<u4', count=count, offset=self._endsOffset)
+        prefixes = numpy.asarray(prefixes, dtype=numpy.int64).ravel()
+        rows = numpy.searchsorted(starts, prefixes, side='right') - 1
+        found = rows >= 0
+        found[found] = prefixes[found] <= ends[rows[found]]
+        rows[~found] = -1
+        return rows
+
+    def lookupMany(self, prefixes, default=None):
+        '''
+        lookup() for an array of addresses at once. Requires numpy.
+
+        Args:
+            prefixes: a sequence or numpy array of unsigned int addresses
+            default: the value returned for addresses no range holds
+        Returns:
+            A numpy object array holding the attributes for each address
+        '''
+        rows = self.rowsMany(prefixes)
+        numbers = numpy.frombuffer(self._map, dtype='<u4', count=self._count, offset=self._numbersOffset)
+        if self._valueArray is None:
+            self._valueArray = numpy.empty(self._valueCount, dtype=object)
+            for number in _range(self._valueCount):
+                self._valueArray[number] = self._value(number)
+        matched = numpy.empty(len(rows), dtype=object)
+        matched.fill(default)
+        found = rows >= 0
+        matched[found] = self._valueArray[numbers[rows[found]]]
+        return matched
+
+    def close(self):
+        ''' unmap the file; later lookups raise ValueError '''
+        self._closed = True
+        if self._views is not None:
+            for view in self._views:
+                view.release()
+            self._views = None
+        self._map.close()
+
+    def __len__(self):
+        return self._count
+
+
+class SubnetAllocator(object):
+
+    '''
+    Buddy system allocator that hands out non overlapping subnets from one or more
+    AddressSpace() pools. Free blocks are kept in a set per mask length; allocating
+    splits the smallest free block that fits in halves, and freeing merges a block
+    with its buddy (the other half of the same parent block) whenever the buddy is
+    also free. allocate(), free() and reserve() take at most one step per mask length.
+    '''
+
+    version = '0.1'
+
+    def __init__(self, *pools):
+        # free block addresses for each mask length 0 - 32
+        self._free = [set() for maskLen in range(33)]
+        # allocated subnets as {address: mask length}
+        self._allocated = {}
+        # pools sorted by address as parallel lists of start address and mask length
+        self._poolStarts = []
+        self._poolLens = []
+        for pool in pools:
+            _requireIPv4(pool, 'SubnetAllocator()')
+        for pool in sorted(pools, key=lambda pool: pool._addr & _ipv4Masks[pool._maskLen]):
+            self._addPool(pool._addr & _ipv4Masks[pool._maskLen], pool._maskLen)
+
+    def _addPool(self, addr, maskLen):
+        last = addr | (0xFFFFFFFF ^ _ipv4Masks[maskLen])
+        # an existing pool either holds the new one or starts inside it
+        if self._poolOf(addr) is not None or \
+           bisect.bisect_left(self._poolStarts, addr) != bisect.bisect_right(self._poolStarts, last):
+            raise ValueError('pool %s/%d overlaps an existing pool' % (IPv4Utils.int2DotDec(addr), maskLen))
+        position = bisect.bisect(self._poolStarts, addr)
+        self._poolStarts.insert(position, addr)
+        self._poolLens.insert(position, maskLen)
+        self._free[maskLen].add(addr)
+
+    def _poolOf(self, addr):
+        ''' return the mask length of the pool holding addr, or None '''
+        position = bisect.bisect(self._poolStarts, addr) - 1
+        if position >= 0 and (addr & _ipv4Masks[self._poolLens[position]]) == self._poolStarts[position]:
+            return self._poolLens[position]
+        return None
+
+    @staticmethod
+    def _maskLenOf(newMask):
+        ''' accept a mask length as an int or a network mask in dotted decimal format '''
+        if isinstance(newMask, _intTypes):
+            maskLen = newMask
+        else:
+            maskLen = _ipv4MaskLens.get(IPv4Utils.dotDec2Int(newMask))
+        if maskLen is None or not 0 <= maskLen <= 32:
+            raise ValueError('Invalid network mask: %s' % newMask)
+        return maskLen
+
+    def addPool(self, pool):
+        '''
+        Add another AddressSpace() pool to allocate from. Raises ValueError if it
+        overlaps an existing pool.
+        '''
+        _requireIPv4(pool, 'SubnetAllocator()')
+        self._addPool(pool._addr & _ipv4Masks[pool._maskLen], pool._maskLen)
+
+    def allocate(self, newMask):
+        '''
+        Allocate a free subnet of the given size
+
+        Args:
+            newMask: The subnet mask length as an int or the network mask in dotted
+                     decimal format; 24 or '255.255.255.0'
+        Returns:
+            An AddressSpace() object for the allocated subnet. Raises ValueError if
+            no free block is large enough.
+        '''
+        maskLen = self._maskLenOf(newMask)
+        free = self._free
+        blockLen = maskLen
+        while not free[blockLen]:
+            blockLen -= 1
+            if blockLen < 0:
+                raise ValueError('no free /%d subnet' % maskLen)
+        addr = free[blockLen].pop()
+        # split the block, keeping the lower half and freeing the upper half, until
+        # it is the requested size
+        while blockLen < maskLen:
+            blockLen += 1
+            free[blockLen].add(addr | (1 << (32 - blockLen)))
+        self._allocated[addr] = maskLen
+        return AddressSpace.fromInt(addr, maskLen)
+
+    def reserve(self, subnet):
+        '''
+        Mark a specific subnet as allocated, such as a subnet already in use before
+        the allocator was created. Raises ValueError if any part of the subnet is
+        already allocated or outside the pools.
+
+        Args:
+            subnet: An AddressSpace() object
+        '''
+        _requireIPv4(subnet, 'SubnetAllocator()')
+        maskLen = subnet._maskLen
+        addr = subnet._addr & _ipv4Masks[maskLen]
+        free = self._free
+        # find the free block holding the subnet
+        blockLen = maskLen
+        while (addr & _ipv4Masks[blockLen]) not in free[blockLen]:
+            blockLen -= 1
+            if blockLen < 0:
+                raise ValueError('%s/%d is not free' % (IPv4Utils.int2DotDec(addr), maskLen))
+        free[blockLen].remove(addr & _ipv4Masks[blockLen])
+        # split it, freeing the half that does not hold the subnet each time
+        while blockLen < maskLen:
+            blockLen += 1
+            free[blockLen].add((addr & _ipv4Masks[blockLen]) ^ (1 << (32 - blockLen)))
+        self._allocated[addr] = maskLen
+
+    def free(self, subnet):
+        '''
+        Return an allocated subnet to the pool, merging it with its buddy blocks.
+        Raises ValueError if the subnet is not allocated.
+
+        Args:
+            subnet: An AddressSpace() object returned by allocate() or reserve()
+        '''
+        _requireIPv4(subnet, 'SubnetAllocator()')
+        maskLen = subnet._maskLen
+        addr = subnet._addr & _ipv4Masks[maskLen]
+        if self._allocated.get(addr) != maskLen:
+            raise ValueError('%s/%d is not allocated' % (IPv4Utils.int2DotDec(addr), maskLen))
+        del self._allocated[addr]
+        free = self._free
+        poolLen = self._poolOf(addr)
+        while maskLen > poolLen:
+            buddy = addr ^ (1 << (32 - maskLen))
+            if buddy not in free[maskLen]:
+                break
+            free[maskLen].remove(buddy)
+            maskLen -= 1
+            addr &= _ipv4Masks[maskLen]
+        free[maskLen].add(addr)
+
+    def isAllocated(self, subnet):
+        ''' return True if exactly this subnet is currently allocated '''
+        if subnet._maxNetMaskLen != 32:
+            return False
+        return self._allocated.get(subnet._addr & _ipv4Masks[subnet._maskLen]) == subnet._maskLen
+
+    @property
+    def freeAddrCount(self):
+        ''' the number of addresses in all free blocks '''
+        return sum(len(blocks) << (32 - maskLen) for (maskLen, blocks) in enumerate(self._free))
+
+    def allocations(self):
+        ''' yield the allocated subnets as AddressSpace() objects in address order '''
+        for addr in sorted(self._allocated):
+            yield AddressSpace.fromInt(addr, self._allocated[addr])
+
+    def __len__(self):
+        return len(self._allocated)
+
+    def snapshot(self):
+        '''
+        Return the allocator state as a dictionary of lists and ints that can be
+        written out with json or pickle and given to restore()
+        '''
+        return {'version': self.version,
+                'pools': [[addr, maskLen] for (addr, maskLen) in zip(self._poolStarts, self._poolLens)],
+                'free': [[maskLen, sorted(blocks)] for (maskLen, blocks) in enumerate(self._free) if blocks],
+                'allocated': sorted([addr, maskLen] for (addr, maskLen) in self._allocated.items())}
+
+    @classmethod
+    def restore(cls, state):
+        ''' Build an allocator from the dictionary returned by snapshot() '''
+        allocator = cls()
+        for (addr, maskLen) in state['pools']:
+            allocator._poolStarts.append(addr)
+            allocator._poolLens.append(maskLen)
+        for (maskLen, blocks) in state['free']:
+            allocator._free[maskLen].update(blocks)
+        allocator._allocated.update((addr, maskLen) for (addr, maskLen) in state['allocated'])
+        return allocator
+
+
+# host tracker dump layout, all little endian; the header, then the zlib compressed bitmap
+_trackerHeader = struct.Struct('<4sIII')
+_trackerMagic = b'IPHT'
+_trackerVersion = 1
+
+
+class HostTracker(object):
+
+    '''
+    Tracks which host addresses of an AddressSpace() are in use with one bit per
+    host, so a /8 costs 2MB. Searches read the bitmap a window at a time as a single
+    int and find free hosts and runs of free hosts with int bit operations, so the
+    per bit work is done in C rather than by the interpreter. Host addresses are
+    given as ints or in dotted decimal format.
+    '''
+
+    # bits read per search step
+    _windowBits = 1 << 15
+
+    def __init__(self, network):
+        _requireIPv4(network, 'HostTracker()')
+        hosts = network.hosts
+        if not len(hosts):
+            raise ValueError('%s has no host addresses' % network.networkAddress)
+        self._network = network
+        self._first = hosts._first
+        self._count = len(hosts)
+        self._used = 0
+        # every host below _hint is in use
+        self._hint = 0
+        self._bitmap = bytearray((self._count + 7) >> 3)
+        # mark the bits past the last host as used so searches never return them
+        if self._count & 7:
+            self._bitmap[-1] = 0xFF ^ ((1 << (self._count & 7)) - 1)
+
+    @property
+    def network(self):
+        ''' the AddressSpace() object whose hosts are tracked '''
+        return self._network
+
+    def _index(self, host):
+        if isinstance(host, _intTypes):
+            index = host - self._first
+        else:
+            index = IPv4Utils.dotDec2Int(host) - self._first
+        if not 0 <= index < self._count:
+            raise ValueError('%s is not a host of %s/%d' % (host, self._network.networkAddress, self._network._maskLen))
+        return index
+
+    def _host(self, index):
+        return IPv4Utils.int2DotDec(self._first + index)
+
+    def _window(self, start, end):
+        ''' the bits start through end - 1 as an int '''
+        bits = _bitsOf(self._bitmap[start >> 3:(end + 7) >> 3]) >> (start & 7)
+        return bits & ((1 << (end - start)) - 1)
+
+    def _setRange(self, start, end, used):
+        ''' set the bits start through end inclusive, returning how many changed '''
+        before = _popcount(self._window(start, end + 1))
+        bitmap = self._bitmap
+        (low, high) = (start >> 3, end >> 3)
+        if low == high:
+            masks = [(low, ((1 << (end - start + 1)) - 1) << (start & 7))]
+        else:
+            masks = [(low, 0xFF & (0xFF << (start & 7))), (high, (1 << ((end & 7) + 1)) - 1)]
+            bitmap[low + 1:high] = (b'\xff' if used else b'\x00') * (high - low - 1)
+        for (position, mask) in masks:
+            if used:
+                bitmap[position] |= mask
+            else:
+                bitmap[position] &= 0xFF ^ mask
+        if used:
+            changed = end - start + 1 - before
+            self._used += changed
+        else:
+            changed = before
+            self._used -= changed
+            self._hint = min(self._hint, start)
+        return changed
+
+    def markUsed(self, host):
+        ''' mark a host address as in use; returns False if it already was '''
+        index = self._index(host)
+        bit = 1 << (index & 7)
+        if self._bitmap[index >> 3] & bit:
+            return False
+        self._bitmap[index >> 3] |= bit
+        self._used += 1
+        return True
+
+    def markFree(self, host):
+        ''' mark a host address as free; returns False if it already was '''
+        index = self._index(host)
+        bit = 1 << (index & 7)
+        if not self._bitmap[index >> 3] & bit:
+            return False
+        self._bitmap[index >> 3] ^= bit
+        self._used -= 1
+        self._hint = min(self._hint, index)
+        return True
+
+    def markRange(self, first, last, used=True):
+        '''
+        Mark the host addresses first through last inclusive as used or free
+
+        Args:
+            first: The first host address
+            last: The last host address
+            used: False to mark the hosts free
+        Returns:
+            The number of hosts whose state changed
+        '''
+        (start, end) = (self._index(first), self._index(last))
+        if start > end:
+            raise ValueError('%s is after %s' % (first, last))
+        return self._setRange(start, end, used)
+
+    def isUsed(self, host):
+        ''' return True if the host address is marked as in use '''
+        index = self._index(host)
+        return bool(self._bitmap[index >> 3] & (1 << (index & 7)))
+
+    def _find(self, start, used):
+        ''' the index of the first bit at or after start that is set (used) or clear,
+        or None '''
+        count = self._count
+        # the window starts small, as the bit is usually close, and doubles up to
+        # _windowBits
+        window = 64
+        while start < count:
+            end = min(count, start + window)
+            bits = self._window(start, end)
+            if not used:
+                bits ^= (1 << (end - start)) - 1
+            if bits:
+                return start + (bits & -bits).bit_length() - 1
+            start = end
+            window = min(window << 1, self._windowBits)
+        return None
+
+    def _findRun(self, length, start):
+        ''' the index of the first of length consecutive free hosts at or after start,
+        or None '''
+        count = self._count
+        (window, largest) = (max(64, length << 2), max(self._windowBits, length << 2))
+        while start + length <= count:
+            end = min(count, start + window)
+            free = self._window(start, end) ^ ((1 << (end - start)) - 1)
+            # bit i of free is left set only when bits i through i + length - 1 are
+            # all set, doubling the run checked by each and
+            run = 1
+            while free and run < length:
+                shift = min(run, length - run)
+                free &= free >> shift
+                run += shift
+            if free:
+                return start + (free & -free).bit_length() - 1
+            if end == count:
+                break
+            # the next window overlaps by the length of a run that could span both
+            start = end - length + 1
+            window = min(window << 1, largest)
+        return None
+
+    def findFree(self, start=None):
+        '''
+        Find the first free host address
+
+        Args:
+            start: (optional) the host address to start searching from
+        Returns:
+            The free host address in dotted decimal format, or None if every host
+            from start on is in use
+        '''
+        index = self._find(self._hint if start is None else self._index(start), False)
+        if start is None:
+            self._hint = self._count if index is None else index
+        return None if index is None else self._host(index)
+
+    def findFreeRun(self, length, start=None):
+        '''
+        Find the first run of consecutive free host addresses
+
+        Args:
+            length: The number of consecutive free hosts needed
+            start: (optional) the host address to start searching from
+        Returns:
+            The first host address of the run in dotted decimal format, or None if
+            there is no such run
+        '''
+        if length < 1:
+            raise ValueError('length must be at least 1')
+        index = self._findRun(length, self._hint if start is None else self._index(start))
+        return None if index is None else self._host(index)
+
+    def allocate(self, length=1):
+        '''
+        Mark the first run of length free host addresses as used and return the
+        first one in dotted decimal format. Raises ValueError if there is no such run.
+        '''
+        if length < 1:
+            raise ValueError('length must be at least 1')
+        # move the hint up to the first free host, so the used hosts below it are
+        # scanned once rather than on every call
+        first = self._find(self._hint, False)
+        self._hint = self._count if first is None else first
+        index = None if first is None else self._findRun(length, first)
+        if index is None:
+            raise ValueError('no run of %d free hosts' % length)
+        self._setRange(index, index + length - 1, True)
+        if index == first:
+            self._hint = index + length
+        return self._host(index)
+
+    def freeRuns(self):
+        ''' yield each run of free host addresses as a tuple of its first host in
+        dotted decimal format and its length, in address order '''
+        start = self._find(self._hint, False)
+        while start is not None:
+            end = self._find(start, True)
+            if end is None:
+                end = self._count
+            yield (self._host(start), end - start)
+            start = self._find(end, False)
+
+    def countUsed(self, first=None, last=None):
+        ''' the number of used host addresses, optionally only first through last '''
+        if first is None and last is None:
+            return self._used
+        start = 0 if first is None else self._index(first)
+        end = self._count - 1 if last is None else self._index(last)
+        if start > end:
+            return 0
+        return _popcount(self._window(start, end + 1))
+
+    @property
+    def usedCount(self):
+        ''' the number of host addresses in use '''
+        return self._used
+
+    @property
+    def freeCount(self):
+        ''' the number of free host addresses '''
+        return self._count - self._used
+
+    def stats(self):
+        '''
+        Return a dictionary of the host count, used and free counts, the fraction in
+        use and the number and longest of the runs of free hosts
+        '''
+        runs = [length for (host, length) in self.freeRuns()]
+        return {'hosts': self._count,
+                'used': self._used,
+                'free': self._count - self._used,
+                'utilization': float(self._used) / self._count,
+                'freeRuns': len(runs),
+                'largestFreeRun': max(runs) if runs else 0}
+
+    def __len__(self):
+        return self._count
+
+    def dump(self, path):
+        ''' Write the network and the compressed bitmap to a file that load() reads '''
+        with open(path, 'wb') as stream:
+            stream.write(_trackerHeader.pack(_trackerMagic, _trackerVersion,
+                                             self._network._addr, self._network._maskLen))
+            stream.write(zlib.compress(bytes(self._bitmap)))
+
+    @classmethod
+    def load(cls, path):
+        ''' Build a tracker from a file written by dump() '''
+        with open(path, 'rb') as stream:
+            data = stream.read()
+        if len(data) < _trackerHeader.size:
+            raise ValueError('%s is not a host tracker dump' % path)
+        (magic, version, addr, maskLen) = _trackerHeader.unpack_from(data)
+        if magic != _trackerMagic or version != _trackerVersion or maskLen > 32:
+            raise ValueError('%s is not a host tracker dump' % path)
+        tracker = cls(AddressSpace.fromInt(addr, maskLen))
+        try:
+            bitmap = bytearray(zlib.decompress(data[_trackerHeader.size:]))
+        except zlib.error:
+            raise ValueError('%s is not a host tracker dump' % path)
+        if len(bitmap) != len(tracker._bitmap):
+            raise ValueError('%s is not a host tracker dump' % path)
+        tracker._bitmap = bitmap
+        tracker._used = _popcount(_bitsOf(bitmap)) - (len(bitmap) << 3) + tracker._count
+        return tracker
+
+
+def _rangeToCidrs(start, end):
+    ''' yield the (address, mask length) of the fewest CIDR blocks that exactly cover
+    the addresses start through end inclusive '''
+    while start <= end:
+        # the block is limited by the alignment of start and by the addresses left
+        bits = (start & -start).bit_length() - 1 if start else 32
+        bits = min(bits, (end - start + 1).bit_length() - 1)
+        yield (start, 32 - bits)
+        start += 1 << bits
+
+def summarizeRange(start, end=None):
+    '''
+    Yield the fewest CIDR blocks that exactly cover an address range. Each block
+    takes a constant number of bit operations to find.
+
+    summarizeRange('192.168.1.1', '192.168.1.6')
+    > 192.168.1.1/32, 192.168.1.2/31, 192.168.1.4/31, 192.168.1.6/32
+
+    Args:
+        start: the first address of the range as an unsigned int or in hexidecimal,
+               dotted decimal or binary string format, or the whole range in the
+               hostRange format; '192.168.1.1 - 192.168.1.254'
+        end: the last address of the range (inclusive)
+    Returns:
+        A generator of AddressSpace() objects in address order
+    '''
+    if end is None:
+        try:
+            (start, end) = start.split('-')
+        except (AttributeError, ValueError):
+            raise ValueError('Invalid Address Range: %s' % (start,))
+        (start, end) = (start.strip(), end.strip())
+    (first, last) = (IPv4Utils.addr2Int(start), IPv4Utils.addr2Int(end))
+    if not 0 <= first <= last <= 0xFFFFFFFF:
+        raise ValueError('Invalid Address Range: %s - %s' % (start, end))
+    for (addr, maskLen) in _rangeToCidrs(first, last):
+        yield AddressSpace.fromInt(addr, maskLen)
+
+def summarizeMany(starts, ends):
+    '''
+    Decompose arrays of address ranges into CIDR blocks at once. Every pass finds the
+    next block of all unfinished ranges, so the number of passes is bounded by the
+    most blocks any one range needs (at most 62), not by the number of ranges.
+    Requires numpy.
+
+    Args:
+        starts: a sequence or numpy array of unsigned int range start addresses
+        ends: the matching last addresses (inclusive)
+    Returns:
+        (addrs, maskLens, owners); numpy arrays of the block network addresses as
+        uint32, their mask lengths as uint8 and the index of the range each block
+        belongs to. Blocks are ordered by range and then by address, and the blocks
+        of each range are exactly those summarizeRange() yields for it.
+    '''
+    _requireNumpy('summarizeMany')
+    starts = numpy.asarray(starts, dtype=numpy.int64).ravel()
+    ends = numpy.asarray(ends, dtype=numpy.int64).ravel()
+    if len(starts) != len(ends):
+        raise ValueError('Range start and end arrays differ in length: %d, %d' % (len(starts), len(ends)))
+    if len(starts) and (starts.min() < 0 or ends.max() > 0xFFFFFFFF or (starts > ends).any()):
+        raise ValueError('Invalid Address Range in summarizeMany()')
+    current = starts.copy()
+    active = numpy.arange(len(starts))
+    counts = numpy.zeros(len(starts), dtype=numpy.int64)
+    passes = []
+    while len(active):
+        block = current[active]
+        # frexp() gives exact exponents of integers; the exponent of the lowest set bit
+        # is the alignment of the block start and that of the remaining count its size
+        aligned = numpy.where(block == 0, 32, numpy.frexp(block & -block)[1] - 1)
+        fits = numpy.frexp(ends[active] - block + 1)[1] - 1
+        bits = numpy.minimum(aligned, fits).astype(numpy.int64)
+        passes.append((active, block, bits))
+        counts[active] += 1
+        current[active] = block + (1 << bits)
+        active = active[current[active] <= ends[active]]
+    # a range takes part in every pass until it is finished, so the block found for
+    # it in pass n is its nth block and goes straight to its place in the output
+    offsets = numpy.cumsum(counts) - counts
+    total = int(counts.sum())
+    addrs = numpy.empty(total, dtype=numpy.uint32)
+    maskLens = numpy.empty(total, dtype=numpy.uint8)
+    owners = numpy.empty(total, dtype=numpy.int64)
+    for (n, (active, block, bits)) in enumerate(passes):
+        places = offsets[active] + n
+        addrs[places] = block
+        maskLens[places] = 32 - bits
+        owners[places] = active
+    return (addrs, maskLens, owners)
+
+def expandMany(addrs, maskLens):
+    '''
+    The inverse of summarizeMany(); the first and last address of each CIDR block of
+    arrays of network addresses and mask lengths, such as those returned by
+    parseMany(). Host bits of the addresses are ignored. Requires numpy.
+
+    Returns:
+        (starts, ends); numpy uint32 arrays of the first and last (inclusive) address
+        of each block
+    '''
+    _requireNumpy('expandMany')
+    addrs = numpy.asarray(addrs, dtype=numpy.int64).ravel()
+    maskLens = numpy.asarray(maskLens, dtype=numpy.int64).ravel()
+    if len(maskLens) and (maskLens.min() < 0 or maskLens.max() > 32):
+        raise ValueError('Invalid Network Mask length in expandMany()')
+    hostMasks = (numpy.int64(1) << (32 - maskLens)) - 1
+    starts = addrs & ~hostMasks & 0xFFFFFFFF
+    return (starts.astype(numpy.uint32), (starts | hostMasks).astype(numpy.uint32))
+
+
+def _intervalOf(item):
+    ''' the first and last address of a network, or of a (first, last) range, as ints;
+    IPv6 addresses are moved above the IPv4 space so the families never overlap '''
+    if isinstance(item, AddressSpace):
+        start = item._addr & item._masks[item._maskLen]
+        end = start | (item._masks[item._maxNetMaskLen] ^ item._masks[item._maskLen])
+        if item._maxNetMaskLen == 128:
+            return (start | (1 << 128), end | (1 << 128))
+        return (start, end)
+    (first, last) = item
+    (start, end) = (PrefixTable._toInt(first), PrefixTable._toInt(last))
+    if not 0 <= start <= end <= 0xFFFFFFFF:
+        raise ValueError('Invalid IPv4 address range: %s - %s' % (first, last))
+    return (start, end)
+
+def findConflicts(items):
+    '''
+    Find every pair of overlapping entries in an inventory of networks and address
+    ranges. The entries are sorted once by first address (largest first for equal
+    first addresses) and swept in order, keeping a heap of the entries whose last
+    address has not been passed yet; every entry still on the heap overlaps the
+    current one. The cost is O(n log n) plus one step per reported pair.
+
+    Args:
+        items: A sequence of AddressSpace() objects, IPv4 or IPv6, and (first, last)
+               IPv4 address ranges given as ints or in dotted decimal format
+    Yields:
+        (relation, outer, inner) for each overlapping pair; the relation is
+        CONFLICT_DUPLICATE, CONFLICT_CONTAINS (outer contains inner) or
+        CONFLICT_OVERLAP (outer starts first and ends inside inner), and outer and
+        inner are positions in items. Pairs are yielded in the order of the inner
+        entries' first addresses.
+
+    for (relation, outer, inner) in findConflicts(inventory):
+        print(conflictNames[relation], inventory[outer], inventory[inner])
+    '''
+    starts = []
+    ends = []
+    for item in items:
+        (start, end) = _intervalOf(item)
+        starts.append(start)
+        ends.append(end)
+    if not starts:
+        return
+    # sort on one packed int per entry; first address, then last address descending,
+    # then position
+    width = max(ends).bit_length()
+    top = (1 << width) - 1
+    indexBits = len(starts).bit_length()
+    indexMask = (1 << indexBits) - 1
+    keys = sorted((((start << width) | (top ^ end)) << indexBits) | index
+                  for (index, (start, end)) in enumerate(zip(starts, ends)))
+    # (last address, position) of the entries that may overlap later ones
+    active = []
+    for key in keys:
+        index = key & indexMask
+        start = starts[index]
+        end = ends[index]
+        while active and active[0][0] < start:
+            heapq.heappop(active)
+        for (otherEnd, other) in active:
+            if otherEnd < end:
+                yield (CONFLICT_OVERLAP, other, index)
+            elif otherEnd == end and starts[other] == start:
+                yield (CONFLICT_DUPLICATE, other, index)
+            else:
+                yield (CONFLICT_CONTAINS, other, index)
+        heapq.heappush(active, (end, index))
+
+
+class IPSet(object):
+
+    '''
+    Set of IPv4 addresses built from AddressSpace() networks. The addresses are held
+    as sorted, merged and non adjacent ranges in two parallel arrays of start and end
+    (inclusive) addresses, so membership is a binary search and union, intersection
+    and difference are a single merge of the two range lists.
+    '''
+
+    version = '0.1'
+
+    def __init__(self, networks=()):
+        networks = list(networks)
+        for network in networks:
+            _requireIPv4(network, 'IPSet()')
+        ranges = sorted((network._addr & _ipv4Masks[network._maskLen],
+                         network._addr | (0xFFFFFFFF ^ _ipv4Masks[network._maskLen])) for network in networks)
+        (self._starts, self._ends) = self._merge(ranges)
+
+    @staticmethod
+    def _merge(ranges):
+        ''' coalesce (start, end) tuples sorted by start into start and end arrays '''
+        starts = array.array('I')
+        ends = array.array('I')
+        for (start, end) in ranges:
+            if ends and start <= ends[-1] + 1:
+                if end > ends[-1]:
+                    ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+        return (starts, ends)
+
+    @classmethod
+    def _fromArrays(cls, starts, ends):
+        ipset = cls.__new__(cls)
+        ipset._starts = starts
+        ipset._ends = ends
+        return ipset
+
+    def _ranges(self):
+        return zip(self._starts, self._ends)
+
+    def union(self, other):
+        ''' return a new IPSet with the addresses in either set '''
+        # both range lists are already sorted, so one linear merge orders them
+        return self._fromArrays(*self._merge(heapq.merge(self._ranges(), other._ranges())))
+
+    def intersection(self, other):
+        ''' return a new IPSet with the addresses in both sets '''
+        starts = array.array('I')
+        ends = array.array('I')
+        (starts1, ends1, starts2, ends2) = (self._starts, self._ends, other._starts, other._ends)
+        (a, b) = (0, 0)
+        while a < len(starts1) and b < len(starts2):
+            start = max(starts1[a], starts2[b])
+            end = min(ends1[a], ends2[b])
+            if start <= end:
+                starts.append(start)
+                ends.append(end)
+            # move past whichever range finishes first
+            if ends1[a] < ends2[b]:
+                a += 1
+            else:
+                b += 1
+        return self._fromArrays(starts, ends)
+
+    def difference(self, other):
+        ''' return a new IPSet with the addresses in this set but not in other '''
+        starts = array.array('I')
+        ends = array.array('I')
+        (otherStarts, otherEnds) = (other._starts, other._ends)
+        b = 0
+        for (start, end) in self._ranges():
+            # skip ranges of other that end before this range starts
+            while b < len(otherStarts) and otherEnds[b] < start:
+                b += 1
+            position = b
+            while start <= end and position < len(otherStarts) and otherStarts[position] <= end:
+                if otherStarts[position] > start:
+                    starts.append(start)
+                    ends.append(otherStarts[position] - 1)
+                start = otherEnds[position] + 1
+                position += 1
+            if start <= end:
+                starts.append(start)
+                ends.append(end)
+        return self._fromArrays(starts, ends)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def __contains__(self, prefix):
+        ''' True if an address, or every address of an AddressSpace() network, is in the set '''
+        if isinstance(prefix, AddressSpace):
+            if prefix._maxNetMaskLen != 32:
+                # the set holds IPv4 addresses only
+                return False
+            start = prefix._addr & _ipv4Masks[prefix._maskLen]
+            end = prefix._addr | (0xFFFFFFFF ^ _ipv4Masks[prefix._maskLen])
+        else:
+            start = end = IPv4Utils.addr2Int(prefix)
+        position = bisect.bisect_right(self._starts, start) - 1
+        return position >= 0 and self._ends[position] >= end
+
+    def __eq__(self, other):
+        return isinstance(other, IPSet) and self._starts == other._starts and self._ends == other._ends
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __nonzero__(self):
+        return len(self._starts) > 0
+
+    __bool__ = __nonzero__
+
+    @property
+    def addrCount(self):
+        ''' the total number of addresses in the set '''
+        return sum(self._ends) - sum(self._starts) + len(self._starts)
+
+    @property
+    def rangeCount(self):
+        ''' the number of separate address ranges in the set '''
+        return len(self._starts)
+
+    def cidrs(self):
+        ''' yield the fewest AddressSpace() CIDR blocks that exactly cover the set, in address order '''
+        for (start, end) in self._ranges():
+            for (addr, maskLen) in _rangeToCidrs(start, end):
+                yield AddressSpace.fromInt(addr, maskLen)
+
+    __iter__ = cidrs
+
+
+class Instrumentation(object):
+
+    '''
+    Opt in call counters and timers for the IPv4Utils helpers, _parseNotation(),
+    _validateArgs(), ipv4Addr() and the AddressSpace properties. While disabled the
+    original functions are in place and nothing is measured; enable() swaps counting
+    wrappers in at runtime and disable() puts the originals back, so it can be
+    turned on in a running process.
+
+    For every instrumented name the number of calls, the cumulative seconds spent in
+    it (including nested instrumented calls) and the number of cache hits are kept.
+    A property hit is a read of an already computed value, an ipv4Addr() hit is a
+    parseCache hit.
+
+    instrumentation.enable()
+    ipv4Addr(addr='192.168.1.0/24').endHostAddr
+    instrumentation.snapshot()['AddressSpace.endHostAddr']
+    > {'calls': 1, 'hits': 0, 'seconds': 4.1e-06}
+    '''
+
+    _functions = ('_parseNotation', '_validateArgs', 'ipv4Addr')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        # (owner, name, original) of every replaced attribute while enabled
+        self._originals = None
+
+    @property
+    def enabled(self):
+        return self._originals is not None
+
+    def _record(self, name, seconds, hit):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = [0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += hit
+
+    def _wrapFunction(self, name, func, hitCount=None):
+        ''' a wrapper recording the calls of func; hitCount() returns the calling thread's
+        cache hit counter, which is read before and after each call '''
+        record = self._record
+        timer = timeit.default_timer
+
+        def wrapper(*args, **kwargs):
+            hits = hitCount() if hitCount is not None else 0
+            start = timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = timer() - start
+                record(name, elapsed, (hitCount() if hitCount is not None else 0) != hits)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+    def _wrapProperty(self, name, prop, slot):
+        ''' a property recording the reads of prop; reads with slot already set are hits '''
+        record = self._record
+        timer = timeit.default_timer
+        fget = prop.fget
+
+        def wrapper(space):
+            hit = slot is not None and hasattr(space, slot)
+            start = timer()
+            try:
+                return fget(space)
+            finally:
+                record(name, timer() - start, hit)
+
+        return property(wrapper, doc=prop.__doc__)
+
+    @staticmethod
+    def _countingGet(get, local):
+        ''' a ParseCache.get() counting the hits of each thread in local.hits '''
+        def wrapper(key):
+            value = get(key)
+            if value is not None:
+                local.hits = getattr(local, 'hits', 0) + 1
+            return value
+        return wrapper
+
+    def enable(self):
+        ''' replace the instrumented functions and properties with counting wrappers '''
+        if self._originals is not None:
+            return
+        namespace = globals()
+        originals = []
+        replacements = []
+        for (name, attr) in sorted(vars(IPv4Utils).items()):
+            if isinstance(attr, staticmethod):
+                wrapper = self._wrapFunction('IPv4Utils.' + name, attr.__func__)
+                replacements.append((IPv4Utils, name, attr, staticmethod(wrapper)))
+        slots = set(AddressSpace.__slots__)
+        for (name, attr) in sorted(vars(AddressSpace).items()):
+            if isinstance(attr, property):
+                slot = '_' + name if '_' + name in slots else None
+                replacements.append((AddressSpace, name, attr, self._wrapProperty('AddressSpace.' + name, attr, slot)))
+        # the shared parseCache.hits moves with every thread's lookups, so ipv4Addr()
+        # hits are told apart with a per thread counter kept by a shadowing get()
+        cache = namespace['parseCache']
+        local = threading.local()
+        replacements.append((cache, 'get', None, self._countingGet(cache.get, local)))
+        for name in self._functions:
+            hitCount = (lambda: getattr(local, 'hits', 0)) if name == 'ipv4Addr' else None
+            replacements.append((None, name, namespace[name], self._wrapFunction(name, namespace[name], hitCount)))
+        for (owner, name, original, wrapper) in replacements:
+            if owner is None:
+                namespace[name] = wrapper
+            else:
+                setattr(owner, name, wrapper)
+            originals.append((owner, name, original))
+        self._originals = originals
+
+    def disable(self):
+        ''' put the original functions and properties back; the counters are kept '''
+        if self._originals is None:
+            return
+        namespace = globals()
+        for (owner, name, original) in self._originals:
+            if owner is None:
+                namespace[name] = original
+            elif original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._originals = None
+
+    def reset(self):
+        ''' zero all counters '''
+        with self._lock:
+            self._stats = {}
+
+    def snapshot(self):
+        ''' return the counters as a dictionary of name to {'calls', 'seconds', 'hits'} '''
+        with self._lock:
+            return dict((name, {'calls': calls, 'seconds': seconds, 'hits': hits})
+                        for (name, (calls, seconds, hits)) in self._stats.items())
+
+# ipaddr.instrumentation.enable() starts counting
+instrumentation = Instrumentation()
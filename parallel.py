@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+    # IPV4 Address and Network subnetting library
+    # Copyright (C) 2013  Jason Carnevale
+
+    # This program is free software: you can redistribute it and/or modify
+    # it under the terms of the GNU General Public License as published by
+    # the Free Software Foundation, either version 3 of the License, or
+    # (at your option) any later version.
+
+    # This program is distributed in the hope that it will be useful,
+    # but WITHOUT ANY WARRANTY; without even the implied warranty of
+    # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    # GNU General Public License for more details.
+
+    # You should have received a copy of the GNU General Public License
+    # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+Parallel bulk classification of address files.
+
+The input file is split into byte ranges aligned to line boundaries. Each range is
+read and classified by a worker process of a multiprocessing pool; only the byte
+offsets go to the workers and only compact per line results come back, so the work
+scales with the number of cores. Results are merged back in file order.
+
+    for code, label in classifyFile('addrs.txt', networks=['10.0.0.0/8 corp'], workers=8):
+        ...
+'''
+
+import array
+import multiprocessing
+import os
+
+import annotate
+import ipaddr
+
+# per process network table, built once by _initWorker()
+_table = None
+
+def splitFile(path, chunkSize=1 << 24):
+    '''
+    Split a file into byte ranges of about chunkSize bytes, each ending just after
+    a newline or at the end of the file.
+
+    Returns:
+        A list of (start, end) byte offsets covering the whole file
+    '''
+    size = os.path.getsize(path)
+    chunks = []
+    start = 0
+    with open(path, 'rb') as stream:
+        while start < size:
+            stream.seek(min(start + chunkSize, size) - 1)
+            # finish the line the chunk boundary falls in
+            stream.readline()
+            end = min(stream.tell(), size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+def _initWorker(networks):
+    global _table
+    _table = annotate.loadNetworks(networks) if networks else None
+
+def classifyChunk(path, start, end, table=None):
+    '''
+    Classify the address on each line of a byte range of a file. The address is the
+    first whitespace separated field of the line in dotted decimal or 0x prefixed
+    hexadecimal notation.
+
+    Returns:
+        (codes, labels); an array('b') of ADDR_* category codes, -1 for lines without
+        a valid address, and a list with the label of the network from table holding
+        each address or None
+    '''
+    with open(path, 'rb') as stream:
+        stream.seek(start)
+        data = stream.read(end - start)
+    if str is not bytes:
+        data = data.decode('latin-1')
+    lines = data.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    codes = array.array('b', [-1]) * len(lines)
+    labels = [None] * len(lines)
+    parseAddr = ipaddr._parseAddr
+    classifyAddr = ipaddr.IPv4Utils.classifyAddr
+    for i, line in enumerate(lines):
+        fields = line.split(None, 1)
+        if not fields:
+            continue
+        try:
+            addr = parseAddr(fields[0])
+        except ValueError:
+            continue
+        codes[i] = classifyAddr(addr)
+        if table is not None:
+            match = table.longestMatch(addr)
+            if match is not None:
+                labels[i] = match[1]
+    return codes, labels
+
+def _classifyChunk(chunk):
+    return classifyChunk(chunk[0], chunk[1], chunk[2], _table)
+
+def classifyFile(path, networks=(), workers=None, chunkSize=1 << 24):
+    '''
+    Classify every line of an address file, one address per line, in parallel
+
+    Args:
+        path: the file to classify
+        networks: (optional) network definition lines as read by annotate.loadNetworks()
+        workers: the number of worker processes, default is the number of cores;
+                 1 classifies in the calling process
+        chunkSize: the approximate size in bytes of the file ranges handed to workers
+    Returns:
+        A generator of (code, label) for each line in file order; code is an ADDR_*
+        category code or None if the line holds no valid address, label is the label
+        of the matching network or None
+    '''
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers < 1:
+        raise ValueError('Worker count must be at least 1: %s' % workers)
+    chunks = [(path, start, end) for start, end in splitFile(path, chunkSize)]
+    networks = list(networks)
+    if workers == 1:
+        _initWorker(networks)
+        results = (_classifyChunk(chunk) for chunk in chunks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, _initWorker, (networks,))
+        # imap returns chunk results in submission order while workers run ahead
+        results = pool.imap(_classifyChunk, chunks)
+    try:
+        for codes, labels in results:
+            for code, label in zip(codes, labels):
+                yield (code if code >= 0 else None), label
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+def countFile(path, networks=(), workers=None, chunkSize=1 << 24):
+    '''
+    Count the addresses of an address file per category and per network label
+
+    Returns:
+        (categories, labels); dictionaries of category name to count and of network
+        label to count. Lines without a valid address are counted as 'invalid'.
+    '''
+    categories = {}
+    labels = {}
+    for code, label in classifyFile(path, networks, workers, chunkSize):
+        name = ipaddr.addrCategoryNames[code] if code is not None else 'invalid'
+        categories[name] = categories.get(name, 0) + 1
+        if label is not None:
+            labels[label] = labels.get(label, 0) + 1
+    return categories, labels
@@ -6,7 +6,7 @@ setup(
 	author='Jason Carnevale',
 	author_email='jason@bean-networks.org',
 	packages=['ipaddr', 'ipaddr.test'],
-	scripts=[''],
+	scripts=['annotate.py'],
 	#url='http://pypi.python.org/pypi/TowelStuff/',
 	license='LICENSE.txt',
 	description='IPv4 Network/Subnet and Address Manipulation Library',